@@ -141,3 +141,51 @@ QUESTION_PARAMS = {
     "top_p": 0.9,
     "max_tokens": 1500
 }
+
+# HTTP连接池参数（所有AI调用共享，见 modules/ai_client.py）
+AI_HTTP_POOL_CONNECTIONS = int(get_secret("AI_HTTP_POOL_CONNECTIONS", 10))  # 保持的keep-alive连接数
+AI_HTTP_POOL_MAXSIZE = int(get_secret("AI_HTTP_POOL_MAXSIZE", 20))  # 同时打开的最大连接数
+AI_HTTP_CONNECT_TIMEOUT = float(get_secret("AI_HTTP_CONNECT_TIMEOUT", 10))  # 建立连接超时（秒）
+AI_HTTP_READ_TIMEOUT = float(get_secret("AI_HTTP_READ_TIMEOUT", 60))  # 等待响应超时（秒）
+AI_HTTP_KEEPALIVE_EXPIRY = float(get_secret("AI_HTTP_KEEPALIVE_EXPIRY", 30))  # 空闲连接保留时间（秒）
+
+# 上游并发与限流参数（见 modules/ai_limiter.py）
+AI_MAX_CONCURRENCY = int(get_secret("AI_MAX_CONCURRENCY", 8))  # 同时进行的上游请求数上限
+AI_RATE_PER_SECOND = float(get_secret("AI_RATE_PER_SECOND", 5))  # 令牌桶补充速率（请求/秒），0表示不限速
+AI_RATE_BURST = int(get_secret("AI_RATE_BURST", 10))  # 令牌桶容量（允许的突发请求数）
+
+# 重试策略参数（见 modules/ai_retry.py）
+AI_RETRY_MAX_ATTEMPTS = int(get_secret("AI_RETRY_MAX_ATTEMPTS", 4))  # 最多尝试次数（含首次）
+AI_RETRY_BASE_DELAY = float(get_secret("AI_RETRY_BASE_DELAY", 0.5))  # 指数退避基准延迟（秒）
+AI_RETRY_MAX_DELAY = float(get_secret("AI_RETRY_MAX_DELAY", 8))  # 单次退避上限（秒）
+AI_RETRY_DEADLINE = float(get_secret("AI_RETRY_DEADLINE", 90))  # 一次调用的总时间预算（秒）
+AI_HEDGE_PERCENTILE = float(get_secret("AI_HEDGE_PERCENTILE", 0))  # 超过该延迟分位数时发起对冲请求，0表示关闭
+AI_HEDGE_MIN_SAMPLES = int(get_secret("AI_HEDGE_MIN_SAMPLES", 20))  # 启用对冲所需的最少延迟样本数
+
+# 批量生成参数（见 modules/ai_batch.py）
+AI_BATCH_MAX_WORKERS = int(get_secret("AI_BATCH_MAX_WORKERS", 4))  # 单次批量生成的并发请求数
+AI_BATCH_QUESTIONS_PER_CALL = int(get_secret("AI_BATCH_QUESTIONS_PER_CALL", 2))  # 每个请求生成的题目数
+
+# 预生成内容库（见 modules/ai_content_store.py 和 scripts/pregenerate_ai_content.py）
+AI_CONTENT_DIR = get_secret("AI_CONTENT_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ai_content"))
+AI_CONTENT_VERSION = get_secret("AI_CONTENT_VERSION", "v1")  # 提示词或数据变化时升级版本号
+
+# 对话上下文预算（见 modules/chat_context.py）
+AI_CHAT_HISTORY_TOKENS = int(get_secret("AI_CHAT_HISTORY_TOKENS", 1200))  # 每轮携带的近期对话token上限
+AI_CHAT_SUMMARY_TOKENS = int(get_secret("AI_CHAT_SUMMARY_TOKENS", 300))  # 早期对话滚动摘要的长度上限
+
+# 相似问题答案缓存（见 modules/answer_cache.py）
+AI_ANSWER_CACHE_ENABLED = str(get_secret("AI_ANSWER_CACHE_ENABLED", "true")).lower() in ("1", "true", "yes")
+AI_ANSWER_CACHE_THRESHOLD = float(get_secret("AI_ANSWER_CACHE_THRESHOLD", 0.8))  # 相似度（Jaccard）达到该值且区别字只有语气词时命中（0.7会让"美国对中国的影响"命中"中国对美国的影响"）
+AI_ANSWER_CACHE_SIZE = int(get_secret("AI_ANSWER_CACHE_SIZE", 2000))  # 最多缓存的问题数
+AI_ANSWER_CACHE_TTL = float(get_secret("AI_ANSWER_CACHE_TTL", 7 * 24 * 3600))  # 缓存有效期（秒）
+
+# 后台任务（见 modules/ai_jobs.py）
+AI_JOB_DIR = get_secret("AI_JOB_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ai_jobs"))
+AI_JOB_MAX_WORKERS = int(get_secret("AI_JOB_MAX_WORKERS", 2))  # 同时执行的长任务数
+AI_JOB_RESULT_TTL = float(get_secret("AI_JOB_RESULT_TTL", 24 * 3600))  # 相同任务的结果复用期限（秒），过期的任务文件会被删除，0表示永久保留
+AI_JOB_POLL_INTERVAL = float(get_secret("AI_JOB_POLL_INTERVAL", 2))  # 页面轮询任务状态的间隔（秒）
+
+# AI调用监控（见 modules/ai_telemetry.py）
+AI_TELEMETRY_FILE = get_secret("AI_TELEMETRY_FILE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ai_telemetry.json"))
+AI_TELEMETRY_FLUSH_INTERVAL = float(get_secret("AI_TELEMETRY_FLUSH_INTERVAL", 10))  # 导出文件的最短间隔（秒），0表示只在退出时导出
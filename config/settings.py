@@ -48,6 +48,10 @@ ELASTICSEARCH_CLOUD_ID = get_secret("ELASTICSEARCH_CLOUD_ID", None)
 ELASTICSEARCH_USERNAME = get_secret("ELASTICSEARCH_USERNAME", None)
 ELASTICSEARCH_PASSWORD = get_secret("ELASTICSEARCH_PASSWORD", None)
 
+# 数据导入脚本的批量写入参数（见 scripts/import_to_elasticsearch.py）
+ES_BULK_CHUNK_SIZE = int(get_secret("ES_BULK_CHUNK_SIZE", 500))  # 每个 _bulk 请求的文档数
+ES_BULK_THREADS = int(get_secret("ES_BULK_THREADS", 4))  # 并行发送 _bulk 请求的线程数，1为单线程流式写入
+
 # DeepSeek API配置
 # 注意：生产环境必须通过 Streamlit Secrets 或环境变量配置
 DEEPSEEK_API_KEY = get_secret("DEEPSEEK_API_KEY", None)
@@ -65,3 +69,30 @@ NEO4J_LABEL_KNOWLEDGE_GFZ = "gfz_KnowledgePoint"
 NEO4J_LABEL_STUDENT_GFZ = "gfz_Student"
 NEO4J_LABEL_ACTIVITY_GFZ = "gfz_SearchLog"  # 学习活动日志
 NEO4J_LABEL_DANMU_GFZ = "gfz_Log_Danmu"  # 弹幕日志
+
+# 数据导入脚本每批写入的行数（见 scripts/neo4j_batch.py）
+NEO4J_IMPORT_BATCH_SIZE = int(get_secret("NEO4J_IMPORT_BATCH_SIZE", 1000))
+
+# 知识图谱数据缓存（见 modules/graph_render.py）
+GRAPH_CACHE_SIZE = int(get_secret("GRAPH_CACHE_SIZE", 64))  # 缓存的图谱个数
+GRAPH_CACHE_TTL = float(get_secret("GRAPH_CACHE_TTL", 600))  # 数据库图谱的缓存时间（秒），静态数据图谱不过期
+
+# 知识图谱服务端布局（见 modules/graph_layout.py）
+# 开启后图谱在服务端算好坐标、关闭浏览器端物理模拟，打开即显示
+GRAPH_LAYOUT_ENABLED = str(get_secret("GRAPH_LAYOUT_ENABLED", "true")).lower() in ("1", "true", "yes")
+GRAPH_LAYOUT_ITERATIONS = int(get_secret("GRAPH_LAYOUT_ITERATIONS", 300))  # 力导向迭代次数
+GRAPH_LAYOUT_SPRING_LENGTH = float(get_secret("GRAPH_LAYOUT_SPRING_LENGTH", 220))  # 理想边长（像素）
+GRAPH_LAYOUT_CACHE_SIZE = int(get_secret("GRAPH_LAYOUT_CACHE_SIZE", 128))  # 缓存的布局个数
+# 力导向布局每轮是 O(节点数²)：计算量（迭代次数 × 节点数²）超过上限时自动减少迭代次数，
+# 节点数超过上限时不再做力导向，改用按度数排列的螺旋布局（O(节点数)）
+GRAPH_LAYOUT_WORK_BUDGET = int(get_secret("GRAPH_LAYOUT_WORK_BUDGET", 6_000_000))
+GRAPH_LAYOUT_MAX_NODES = int(get_secret("GRAPH_LAYOUT_MAX_NODES", 400))
+
+# 知识图谱节点预算（见 modules/graph_clustering.py）
+# 完整图谱的节点数超过预算时，把事件按年代/课程、人物按时期收拢为聚类节点，点击聚类节点再展开
+GRAPH_NODE_BUDGET = int(get_secret("GRAPH_NODE_BUDGET", 60))
+GRAPH_LPA_MAX_ITERATIONS = int(get_secret("GRAPH_LPA_MAX_ITERATIONS", 20))  # 标签传播社区发现的最大迭代轮数
+
+# 会话内学习记录（见 modules/learning_tracker.py）
+# 页面访问、做题、搜索等原始事件每类只保留最近的条数（环形缓冲区），统计数字单独累加，会话内存不随使用时长增长
+LEARNING_RECORDS_CAPACITY = int(get_secret("LEARNING_RECORDS_CAPACITY", 200))
@@ -146,54 +146,250 @@ def get_relationships():
     """获取所有关系"""
     return GFZ_KNOWLEDGE_GRAPH_NODES.get("relationships", [])
 
+# ==================== 图索引 ====================
+# 包含关系（模块 -> 章节 -> 知识点），用于取模块子图
+CONTAINS_TYPES = ("包含", "教学")
+
+
+def _build_csr(node_count, pairs):
+    """
+    由 (起点下标, 终点下标, 关系下标) 构建CSR邻接数组（计数排序，保持原关系顺序）
+
+    Returns:
+        (offsets, neighbors, rel_indexes)：节点i的邻居为 neighbors[offsets[i]:offsets[i+1]]
+    """
+    offsets = [0] * (node_count + 1)
+    for source, _, _ in pairs:
+        offsets[source + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    cursor = offsets[:-1]
+    neighbors = [0] * len(pairs)
+    rel_indexes = [0] * len(pairs)
+    for source, target, rel_index in pairs:
+        position = cursor[source]
+        neighbors[position] = target
+        rel_indexes[position] = rel_index
+        cursor[source] = position + 1
+    return offsets, neighbors, rel_indexes
+
+
+class GraphIndex:
+    """
+    知识图谱的内存索引（导入时构建一次）
+
+    - id -> 下标映射
+    - 出边/入边的CSR邻接数组
+    - 按分类的节点桶
+    - 前置关系（来自 GFZ_KNOWLEDGE_GRAPH["prerequisites"]）的CSR邻接数组
+
+    邻居、子图、分类查询的耗时与结果规模成正比，不再扫描全部节点和关系
+    """
+
+    def __init__(self, nodes, relationships, prerequisites=()):
+        self.nodes = nodes
+        self.relationships = relationships
+        self.id_to_index = {node["id"]: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+
+        edges = []
+        for rel_index, rel in enumerate(relationships):
+            source = self.id_to_index.get(rel["source"])
+            target = self.id_to_index.get(rel["target"])
+            if source is not None and target is not None:
+                edges.append((source, target, rel_index))
+        self.out_offsets, self.out_targets, self.out_rels = _build_csr(n, edges)
+        self.in_offsets, self.in_sources, self.in_rels = _build_csr(n, [(t, s, r) for s, t, r in edges])
+
+        prereq_edges = []
+        for i, pre in enumerate(prerequisites):
+            source = self.id_to_index.get(pre["from"])
+            target = self.id_to_index.get(pre["to"])
+            if source is not None and target is not None:
+                prereq_edges.append((target, source, i))
+        # 节点i的前置知识点为 prereq_sources[prereq_offsets[i]:prereq_offsets[i+1]]
+        self.prereq_offsets, self.prereq_sources, _ = _build_csr(n, prereq_edges)
+
+        self.category_buckets = {}
+        for i, node in enumerate(nodes):
+            self.category_buckets.setdefault(node["category"], []).append(i)
+
+    def index_of(self, node_id):
+        return self.id_to_index.get(node_id)
+
+    def node(self, node_id):
+        index = self.id_to_index.get(node_id)
+        return self.nodes[index] if index is not None else None
+
+    def _out(self, index):
+        for k in range(self.out_offsets[index], self.out_offsets[index + 1]):
+            yield self.out_targets[k], self.relationships[self.out_rels[k]]
+
+    def _in(self, index):
+        for k in range(self.in_offsets[index], self.in_offsets[index + 1]):
+            yield self.in_sources[k], self.relationships[self.in_rels[k]]
+
+    def _neighbors(self, index, direction, rel_types):
+        if direction in ("out", "both"):
+            for target, rel in self._out(index):
+                if rel_types is None or rel["type"] in rel_types:
+                    yield target
+        if direction in ("in", "both"):
+            for source, rel in self._in(index):
+                if rel_types is None or rel["type"] in rel_types:
+                    yield source
+
+    def related(self, node_id):
+        """出边和入边的相邻节点（格式同 get_related_nodes）"""
+        related = {"outgoing": [], "incoming": []}
+        index = self.id_to_index.get(node_id)
+        if index is None:
+            return related
+        for target, rel in self._out(index):
+            related["outgoing"].append({"node": self.nodes[target], "relationship": rel})
+        for source, rel in self._in(index):
+            related["incoming"].append({"node": self.nodes[source], "relationship": rel})
+        return related
+
+    def by_category(self, category):
+        return [self.nodes[i] for i in self.category_buckets.get(category, [])]
+
+    def subgraph(self, root_id, rel_types=CONTAINS_TYPES):
+        """root_id 及沿包含关系可达的全部节点，以及这些节点之间的关系"""
+        root = self.id_to_index.get(root_id)
+        if root is None:
+            return {"nodes": [], "relationships": []}
+        members = [root]
+        member_set = {root}
+        for index in members:
+            for target in self._neighbors(index, "out", rel_types):
+                if target not in member_set:
+                    member_set.add(target)
+                    members.append(target)
+        relationships = [
+            rel for index in members for target, rel in self._out(index) if target in member_set
+        ]
+        return {"nodes": [self.nodes[i] for i in members], "relationships": relationships}
+
+    def k_hop(self, node_id, k, direction="both", rel_types=None):
+        """
+        k跳以内的节点（广度优先，不含起点）
+
+        Args:
+            direction: "out" / "in" / "both"
+            rel_types: 只沿这些关系类型走，None表示全部
+
+        Returns:
+            [(节点, 距离), ...]，按距离排序
+        """
+        start = self.id_to_index.get(node_id)
+        if start is None:
+            return []
+        distance = {start: 0}
+        frontier = [start]
+        result = []
+        for depth in range(1, k + 1):
+            next_frontier = []
+            for index in frontier:
+                for neighbor in self._neighbors(index, direction, rel_types):
+                    if neighbor not in distance:
+                        distance[neighbor] = depth
+                        next_frontier.append(neighbor)
+                        result.append((self.nodes[neighbor], depth))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return result
+
+    def shortest_path(self, source_id, target_id, direction="both", rel_types=None):
+        """最短路径（无权，广度优先），返回节点列表（含两端）；不可达时返回None"""
+        source = self.id_to_index.get(source_id)
+        target = self.id_to_index.get(target_id)
+        if source is None or target is None:
+            return None
+        previous = {source: None}
+        frontier = [source]
+        while frontier and target not in previous:
+            next_frontier = []
+            for index in frontier:
+                for neighbor in self._neighbors(index, direction, rel_types):
+                    if neighbor not in previous:
+                        previous[neighbor] = index
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        if target not in previous:
+            return None
+        path = []
+        index = target
+        while index is not None:
+            path.append(self.nodes[index])
+            index = previous[index]
+        return path[::-1]
+
+    def prerequisite_chain(self, node_id):
+        """
+        学习某知识点前需要掌握的全部前置知识点（递归），按学习顺序排列（最基础的在前，不含自身）
+        """
+        start = self.id_to_index.get(node_id)
+        if start is None:
+            return []
+        order = []
+        visited = {start}
+
+        # 后序深度优先：先输出前置的前置
+        stack = [(start, iter(self.prereq_sources[self.prereq_offsets[start]:self.prereq_offsets[start + 1]]))]
+        while stack:
+            index, pending = stack[-1]
+            for pre in pending:
+                if pre not in visited:
+                    visited.add(pre)
+                    stack.append((pre, iter(self.prereq_sources[self.prereq_offsets[pre]:self.prereq_offsets[pre + 1]])))
+                    break
+            else:
+                stack.pop()
+                if index != start:
+                    order.append(self.nodes[index])
+        return order
+
+
+GFZ_GRAPH_INDEX = GraphIndex(
+    GFZ_KNOWLEDGE_GRAPH_NODES["nodes"],
+    GFZ_KNOWLEDGE_GRAPH_NODES["relationships"],
+    GFZ_KNOWLEDGE_GRAPH.get("prerequisites", []),
+)
+
+
+def get_graph_index():
+    """获取图索引"""
+    return GFZ_GRAPH_INDEX
+
 def get_node_by_id(node_id):
     """根据ID获取节点"""
-    for node in GFZ_KNOWLEDGE_GRAPH_NODES.get("nodes", []):
-        if node["id"] == node_id:
-            return node
-    return None
+    return GFZ_GRAPH_INDEX.node(node_id)
 
 def get_related_nodes(node_id):
     """获取与某个节点相关的所有节点"""
-    related = {"outgoing": [], "incoming": []}
-    
-    for rel in GFZ_KNOWLEDGE_GRAPH_NODES.get("relationships", []):
-        if rel["source"] == node_id:
-            target_node = get_node_by_id(rel["target"])
-            if target_node:
-                related["outgoing"].append({
-                    "node": target_node,
-                    "relationship": rel
-                })
-        elif rel["target"] == node_id:
-            source_node = get_node_by_id(rel["source"])
-            if source_node:
-                related["incoming"].append({
-                    "node": source_node,
-                    "relationship": rel
-                })
-    
-    return related
+    return GFZ_GRAPH_INDEX.related(node_id)
 
 def get_nodes_by_category(category):
     """根据分类获取节点"""
-    return [node for node in GFZ_KNOWLEDGE_GRAPH_NODES.get("nodes", []) 
-            if node["category"] == category]
+    return GFZ_GRAPH_INDEX.by_category(category)
 
 def get_module_subgraph(module_id):
-    """获取特定模块的子图（只包含该模块及其内容）"""
-    module_nodes = [n for n in GFZ_KNOWLEDGE_GRAPH_NODES.get("nodes", []) 
-                    if n["id"] == module_id or n.get("properties", {}).get("parent_module") == module_id]
-    
-    module_node_ids = set(n["id"] for n in module_nodes)
-    
-    module_rels = [r for r in GFZ_KNOWLEDGE_GRAPH_NODES.get("relationships", [])
-                   if r["source"] in module_node_ids and r["target"] in module_node_ids]
-    
-    return {
-        "nodes": module_nodes,
-        "relationships": module_rels
-    }
+    """获取特定模块的子图（只包含该模块及其内容：章节和知识点）"""
+    return GFZ_GRAPH_INDEX.subgraph(module_id)
+
+def get_k_hop_nodes(node_id, k=2, direction="both", rel_types=None):
+    """获取k跳以内的节点 [(节点, 距离), ...]"""
+    return GFZ_GRAPH_INDEX.k_hop(node_id, k, direction, rel_types)
+
+def get_shortest_path(source_id, target_id, direction="both", rel_types=None):
+    """获取两个节点之间的最短路径（节点列表），不可达返回None"""
+    return GFZ_GRAPH_INDEX.shortest_path(source_id, target_id, direction, rel_types)
+
+def get_prerequisite_chain(node_id):
+    """获取知识点的前置知识链（按学习顺序）"""
+    return GFZ_GRAPH_INDEX.prerequisite_chain(node_id)
 
 # 测试用：打印图谱统计
 if __name__ == "__main__":
@@ -4,7 +4,7 @@
 """
 
 import streamlit as st
-from openai import OpenAI
+from modules.ai_client import create_chat_completion
 from config.settings import *
 
 
@@ -175,21 +175,6 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
     
     # 使用DeepSeek AI生成推荐
     try:
-        import httpx
-        
-        # 创建不使用代理的httpx客户端，解决Streamlit Cloud部署问题
-        http_client = httpx.Client(
-            base_url=DEEPSEEK_BASE_URL,
-            timeout=60.0,
-            follow_redirects=True
-        )
-        
-        client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url=DEEPSEEK_BASE_URL,
-            http_client=http_client
-        )
-        
         prompt = f"""
 你是一位高分子物理教学专家。学生对以下知识点的当前掌握情况如下：
 
@@ -207,15 +192,13 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
 请用简洁、友好的语言，给出实用且有针对性的学习建议。
 """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            site="ability_recommender.analyze_learning_path",
             model="deepseek-chat",
             messages=[{"role": "user", "content": prompt}],
             stream=False
         )
         
-        # 关闭httpx客户端
-        http_client.close()
-        
         return response.choices[0].message.content
     except Exception as e:
         import traceback
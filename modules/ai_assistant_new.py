@@ -5,6 +5,7 @@ AI助手模块 - 升级版
 
 import streamlit as st
 from modules.ai_service import get_ai_service
+from modules.chat_context import get_conversation_context, render_summary_error
 from data.history_knowledge_graph import search_knowledge_by_keyword
 
 def render_ai_assistant():
@@ -109,6 +110,7 @@ def render_ai_assistant():
     
     # 用户输入
     st.markdown("---")
+    render_summary_error("ai_assistant")
     col1, col2 = st.columns([4, 1])
     
     with col1:
@@ -141,18 +143,12 @@ def render_ai_assistant():
         
         # 生成AI回复
         with st.spinner("🤔 史老师正在思考..."):
-            # 准备对话历史（最近5轮）
-            recent_history = []
-            for msg in st.session_state.chat_history[-10:]:  # 最近5轮对话
-                recent_history.append({
-                    "role": msg['role'],
-                    "content": msg['content']
-                })
-            
+            # 对话历史按token预算截取，早期对话折叠为摘要
             response = ai_service.chat_with_teacher(
                 user_message=user_input,
-                chat_history=recent_history[:-1],  # 不包括当前消息
-                context=context_info
+                chat_history=st.session_state.chat_history[:-1],  # 不包括当前消息
+                context=context_info,
+                conversation=get_conversation_context("ai_assistant")
             )
             
             if response:
@@ -180,6 +176,7 @@ def render_ai_assistant():
     
     if clear_btn:
         st.session_state.chat_history = []
+        get_conversation_context("ai_assistant").reset()
         st.session_state.student_context = {
             'weak_points': [],
             'recent_topics': [],
@@ -0,0 +1,79 @@
+"""
+AI批量生成模块
+把多道题目的生成拆分为按知识点/题目槽位的小请求并发执行，
+所有请求仍受进程级限流器约束（见 modules/ai_limiter.py），
+结果按完成顺序逐个返回，界面可以边生成边显示
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config.ai_config import AI_BATCH_MAX_WORKERS, AI_BATCH_QUESTIONS_PER_CALL
+
+# 命题角度：让拆分后的各个请求内容不同，减少重复题目（也避免被请求合并为同一次调用）
+QUESTION_FOCUS_ANGLES = [
+    "背景与原因",
+    "主要内容与过程",
+    "历史影响与意义",
+    "相关人物与事件",
+    "比较与联系",
+    "史料理解与辨析",
+]
+
+
+def split_question_slots(count, knowledge_points=None, per_call=AI_BATCH_QUESTIONS_PER_CALL):
+    """
+    把count道题分配到若干个生成请求上
+
+    Args:
+        count: 题目总数
+        knowledge_points: 知识点列表，依次轮流分配给各个请求
+        per_call: 每个请求生成的题目数
+
+    Returns:
+        [(知识点, 题目数, 命题角度), ...]
+    """
+    kps = list(knowledge_points) if knowledge_points else [None]
+    per_call = max(1, int(per_call))
+    slots = []
+    remaining = count
+    index = 0
+    while remaining > 0:
+        n = min(per_call, remaining)
+        angle = QUESTION_FOCUS_ANGLES[index % len(QUESTION_FOCUS_ANGLES)]
+        focus = f"{angle}（第{index + 1}组，与其他组题目不重复）"
+        slots.append((kps[index % len(kps)], n, focus))
+        remaining -= n
+        index += 1
+    return slots
+
+
+def iter_completed(fn, tasks, max_workers=AI_BATCH_MAX_WORKERS):
+    """
+    并发执行 fn(*task)，按完成顺序产出结果
+
+    Args:
+        fn: 单个任务的处理函数
+        tasks: 参数元组列表
+        max_workers: 最大并发数
+
+    Yields:
+        (task, result)；任务抛出异常时result为None
+    """
+    if not tasks:
+        return
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(tasks))),
+        thread_name_prefix="ai-batch"
+    )
+    try:
+        futures = {executor.submit(fn, *task): task for task in tasks}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+            yield futures[future], result
+    finally:
+        # 页面重跑中断迭代时不再等待剩余请求
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,140 @@
+"""
+AI HTTP客户端模块
+进程级共享的连接池，所有AI调用复用keep-alive连接
+- requests会话：AIService.call_api 使用
+- OpenAI客户端（底层httpx连接池）：教学设计、报告生成、课中互动、学习路径推荐使用
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.ai_config import (
+    DEEPSEEK_API_KEY,
+    DEEPSEEK_API_BASE,
+    AI_HTTP_POOL_CONNECTIONS,
+    AI_HTTP_POOL_MAXSIZE,
+    AI_HTTP_CONNECT_TIMEOUT,
+    AI_HTTP_READ_TIMEOUT,
+    AI_HTTP_KEEPALIVE_EXPIRY,
+)
+from modules.ai_limiter import run_upstream, run_limited
+from modules.ai_retry import call_with_retry
+from modules.ai_telemetry import track_ai_call, caller_site
+
+_lock = threading.Lock()
+_session = None
+_httpx_client = None
+_openai_client = None
+
+
+def get_request_timeout(read_timeout=None):
+    """requests使用的超时参数：(连接超时, 读取超时)，read_timeout可按剩余时间预算缩短"""
+    if read_timeout is None:
+        read_timeout = AI_HTTP_READ_TIMEOUT
+    return (min(AI_HTTP_CONNECT_TIMEOUT, read_timeout), read_timeout)
+
+
+def get_requests_session():
+    """
+    获取共享的requests会话
+
+    连接池满时阻塞等待空闲连接，而不是临时新建连接再丢弃
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=AI_HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=AI_HTTP_POOL_MAXSIZE,
+                    pool_block=True
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_httpx_client():
+    """获取共享的httpx客户端（OpenAI SDK的底层连接池）"""
+    global _httpx_client
+    if _httpx_client is None:
+        import httpx
+
+        with _lock:
+            if _httpx_client is None:
+                # 显式传入http_client，避免openai与新版httpx的proxies参数不兼容（Streamlit Cloud部署问题）
+                _httpx_client = httpx.Client(
+                    timeout=httpx.Timeout(AI_HTTP_READ_TIMEOUT, connect=AI_HTTP_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=AI_HTTP_POOL_MAXSIZE,
+                        max_keepalive_connections=AI_HTTP_POOL_CONNECTIONS,
+                        keepalive_expiry=AI_HTTP_KEEPALIVE_EXPIRY
+                    ),
+                    follow_redirects=True
+                )
+    return _httpx_client
+
+
+def get_openai_client():
+    """获取共享的OpenAI客户端（指向DeepSeek API）"""
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+
+        http_client = get_httpx_client()
+        with _lock:
+            if _openai_client is None:
+                # SDK自带重试关闭，统一使用 modules/ai_retry.py 的重试策略
+                _openai_client = OpenAI(
+                    api_key=DEEPSEEK_API_KEY,
+                    base_url=DEEPSEEK_API_BASE,
+                    http_client=http_client,
+                    max_retries=0
+                )
+    return _openai_client
+
+
+def close_clients():
+    """关闭所有共享连接（脚本退出或测试时使用）"""
+    global _session, _httpx_client, _openai_client
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        if _httpx_client is not None:
+            _httpx_client.close()
+            _httpx_client = None
+        _openai_client = None
+
+
+def create_chat_completion(site=None, **kwargs):
+    """
+    通过共享OpenAI客户端创建对话补全
+
+    相同的进行中请求会被合并，所有请求受进程级限流器约束（见 modules/ai_limiter.py），
+    429/5xx/超时按 modules/ai_retry.py 的策略退避重试，延迟、token用量和重试按调用点统计（见 modules/ai_telemetry.py）
+
+    Args:
+        site: 调用点名称（默认取调用方的 模块名.函数名）
+        **kwargs: 传给 chat.completions.create 的参数（model、messages、temperature等）
+
+    Returns:
+        ChatCompletion 响应对象
+    """
+    site = site or caller_site()
+
+    with track_ai_call(site) as call:
+        def send(timeout):
+            response = get_openai_client().chat.completions.create(timeout=timeout, **kwargs)
+            call.upstream(getattr(response, 'usage', None))
+            return response
+
+        return call_with_retry(
+            lambda timeout: run_upstream(kwargs, lambda: send(timeout)),
+            hedge_fn=lambda timeout: run_limited(lambda: send(timeout)),
+            on_retry=lambda *args: call.retry()
+        )
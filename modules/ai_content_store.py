@@ -0,0 +1,165 @@
+"""
+AI预生成内容库
+由 scripts/pregenerate_ai_content.py 离线生成，界面优先从这里读取，没有时再实时调用AI
+
+存储结构（按版本隔离，升级提示词时改 AI_CONTENT_VERSION 即可整体切换）：
+    data/ai_content/<version>/<kind>.jsonl   每行一条 {"key", "content", "model", "created_at"}
+    data/ai_content/<version>/manifest.json  生成信息
+
+内容种类（kind）：
+- flashcard_explanation：闪卡深度讲解（key为卡片ID）
+- flashcard_memory_tips：闪卡记忆技巧（key为卡片ID）
+- kp_explanation：高分子物理知识点讲解（key为知识点ID）
+- teaching_design：章节教学方案（key为 "章节ID|教学方法"）
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from config.ai_config import AI_CONTENT_DIR, AI_CONTENT_VERSION, DEEPSEEK_MODEL
+from modules.ai_telemetry import record_cache_hit
+
+CONTENT_KINDS = [
+    "flashcard_explanation",
+    "flashcard_memory_tips",
+    "kp_explanation",
+    "teaching_design",
+]
+
+
+def teaching_design_key(chapter_id, method_key):
+    """教学方案的存储键"""
+    return f"{chapter_id}|{method_key}"
+
+
+class ContentStore:
+    """按版本存放的本地内容库（追加写入，支持断点续跑）"""
+
+    def __init__(self, root=AI_CONTENT_DIR, version=AI_CONTENT_VERSION):
+        self.root = root
+        self.version = version
+        self.path = os.path.join(root, version)
+        self._lock = threading.Lock()
+        self._data = {}    # kind -> {key: record}
+        self._mtimes = {}  # kind -> 加载时的文件修改时间
+
+    def _kind_file(self, kind):
+        return os.path.join(self.path, f"{kind}.jsonl")
+
+    def _load(self, kind):
+        """加载某类内容；文件被离线任务更新后自动重新加载"""
+        path = self._kind_file(kind)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._data.setdefault(kind, {})
+            return self._data[kind]
+
+        if self._mtimes.get(kind) != mtime:
+            records = {}
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 任务中断时最后一行可能不完整，跳过即可
+                        continue
+                    records[record['key']] = record
+            self._data[kind] = records
+            self._mtimes[kind] = mtime
+        return self._data[kind]
+
+    def get(self, kind, key):
+        """读取内容，不存在时返回None"""
+        with self._lock:
+            record = self._load(kind).get(key)
+        return record['content'] if record else None
+
+    def keys(self, kind):
+        with self._lock:
+            return set(self._load(kind).keys())
+
+    def put(self, kind, key, content, model=DEEPSEEK_MODEL):
+        """写入一条内容（立即落盘，中断后已完成的部分不会丢失）"""
+        record = {
+            'key': key,
+            'content': content,
+            'model': model,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            records = self._load(kind)
+            path = self._kind_file(kind)
+            # 上次中断可能留下不完整的最后一行，先补换行，避免和新记录粘在一起
+            needs_newline = False
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b'\n'
+            with open(path, 'a', encoding='utf-8') as f:
+                if needs_newline:
+                    f.write('\n')
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            records[key] = record
+            self._mtimes[kind] = os.path.getmtime(path)
+
+    def write_manifest(self, **info):
+        """更新生成信息（各类内容数量等）"""
+        with self._lock:
+            counts = {kind: len(self._load(kind)) for kind in CONTENT_KINDS}
+        manifest = {
+            'version': self.version,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'counts': counts,
+            **info,
+        }
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_content_store():
+    """获取当前版本的共享内容库"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ContentStore()
+    return _store
+
+
+def get_pregenerated(kind, key):
+    """读取预生成内容，不存在时返回None（命中计入监控统计）"""
+    try:
+        content = get_content_store().get(kind, key)
+    except OSError:
+        return None
+    if content:
+        record_cache_hit(f"pregenerated.{kind}")
+    return content
+
+
+def get_or_generate(kind, key, generate):
+    """
+    优先返回预生成内容，没有时调用generate()实时生成
+
+    Args:
+        kind: 内容种类
+        key: 内容键
+        generate: 实时生成函数（无参）
+    """
+    content = get_pregenerated(kind, key)
+    if content:
+        return content
+    return generate()
@@ -0,0 +1,304 @@
+"""
+AI后台任务模块
+教学方案、学习报告、班级诊断等耗时较长的生成放到进程级线程池中执行，
+页面只保存任务ID并轮询状态，控件交互导致的页面重跑不会中断生成
+
+- 任务ID由任务种类和输入参数的哈希得到：相同输入重复提交会复用同一个任务（进行中或已完成），
+  不会重复调用大模型
+- 任务状态和结果写入 data/ai_jobs/<任务ID>.json，进程重启后已完成的结果仍可直接读取；
+  结果含学生学情数据，超过复用期限的任务文件在启动和提交任务时删除
+- 取消：未开始的任务直接取消；已开始的任务无法中断上游请求，完成后结果被丢弃
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config.ai_config import AI_JOB_DIR, AI_JOB_MAX_WORKERS, AI_JOB_RESULT_TTL, AI_JOB_POLL_INTERVAL
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+
+def make_job_id(kind, params):
+    """由任务种类和参数计算任务ID（参数需可JSON序列化，其他类型按字符串处理）"""
+    raw = json.dumps({'kind': kind, 'params': params}, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{kind}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+class JobRunner:
+    """进程级后台任务执行器"""
+
+    def __init__(self, root=AI_JOB_DIR, max_workers=AI_JOB_MAX_WORKERS, result_ttl=AI_JOB_RESULT_TTL):
+        self.root = root
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ai-job")
+        self._lock = threading.Lock()
+        self._jobs = {}     # job_id -> 任务记录
+        self._futures = {}  # job_id -> Future
+        self._purge_expired()
+
+    def _job_file(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def _save(self, job):
+        """落盘（先写临时文件再替换，避免读到写了一半的文件）"""
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            path = self._job_file(job['id'])
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _load(self, job_id):
+        """从内存或磁盘读取任务记录"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            with open(self._job_file(job_id), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if job.get('status') not in FINISHED_STATUSES:
+            # 磁盘上未完成但内存中没有：上次进程退出时中断了
+            job['status'] = FAILED
+            job['error'] = "任务因服务重启中断"
+        self._jobs[job_id] = job
+        return job
+
+    def _purge_expired(self):
+        """删除超过结果复用期限的任务文件和内存记录（调用方持有锁或尚未共享本对象），返回删除的文件数"""
+        if not self.result_ttl:
+            return 0
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job['status'] in FINISHED_STATUSES and job.get('finished_ts', 0) < cutoff:
+                del self._jobs[job_id]
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return 0
+        removed = 0
+        for name in names:
+            job_id = name.split('.json', 1)[0]
+            if job_id in self._futures:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                # 任务文件在每次状态变化时重写，修改时间即最后一次更新时间
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    self._jobs.pop(job_id, None)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _reusable(self, job):
+        if job is None:
+            return False
+        if job['status'] in (PENDING, RUNNING):
+            return True
+        if job['status'] == DONE:
+            return not self.result_ttl or time.time() - job.get('finished_ts', 0) <= self.result_ttl
+        return False
+
+    def submit(self, kind, params, fn, label=None, force=False):
+        """
+        提交任务
+
+        Args:
+            kind: 任务种类（如 "teaching_design"）
+            params: 决定生成结果的输入参数，用于计算任务ID
+            fn: 执行函数（无参），返回结果文本；失败时抛出异常
+            label: 显示用的任务说明
+            force: 忽略已完成的结果重新生成
+
+        Returns:
+            任务ID
+        """
+        job_id = make_job_id(kind, params)
+        with self._lock:
+            self._purge_expired()
+            job = self._load(job_id)
+            if job is not None and job['status'] in (PENDING, RUNNING):
+                return job_id
+            if not force and self._reusable(job):
+                return job_id
+
+            job = {
+                'id': job_id,
+                'kind': kind,
+                'label': label or kind,
+                'status': PENDING,
+                'result': None,
+                'error': None,
+                'cancel_requested': False,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'started_at': None,
+                'finished_at': None,
+                'finished_ts': 0,
+            }
+            self._jobs[job_id] = job
+            self._save(job)
+            self._futures[job_id] = self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job['cancel_requested'] and status == DONE:
+                status, result = CANCELLED, None
+            job.update({
+                'status': status,
+                'result': result,
+                'error': error,
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+                'finished_ts': time.time(),
+            })
+            self._futures.pop(job_id, None)
+            self._save(job)
+
+    def _run(self, job_id, fn):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job['cancel_requested']:
+                job['status'] = CANCELLED
+                self._futures.pop(job_id, None)
+                self._save(job)
+                return
+            job['status'] = RUNNING
+            job['started_at'] = datetime.now().isoformat(timespec='seconds')
+            self._save(job)
+
+        try:
+            result = fn()
+        except Exception as e:
+            self._finish(job_id, FAILED, error=str(e))
+            return
+        if not result:
+            self._finish(job_id, FAILED, error="AI未返回内容")
+        else:
+            self._finish(job_id, DONE, result=result)
+
+    def get(self, job_id):
+        """读取任务状态（返回副本），不存在时返回None"""
+        if not job_id:
+            return None
+        with self._lock:
+            job = self._load(job_id)
+            return dict(job) if job else None
+
+    def cancel(self, job_id):
+        """取消任务，返回是否已受理"""
+        with self._lock:
+            job = self._load(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return False
+            job['cancel_requested'] = True
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                job['status'] = CANCELLED
+                job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+                job['finished_ts'] = time.time()
+                self._futures.pop(job_id, None)
+            self._save(job)
+            return True
+
+    def list(self, kind=None):
+        """列出本进程内的任务（按创建时间倒序）"""
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if kind is None or job['kind'] == kind]
+        return sorted(jobs, key=lambda job: job['created_at'], reverse=True)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """获取进程级共享的任务执行器"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
+
+
+def submit_job(kind, params, fn, label=None, force=False):
+    return get_job_runner().submit(kind, params, fn, label=label, force=force)
+
+
+def get_job(job_id):
+    return get_job_runner().get(job_id)
+
+
+def cancel_job(job_id):
+    return get_job_runner().cancel(job_id)
+
+
+def render_job(state_key, running_text="AI正在后台生成，可以继续浏览其他内容"):
+    """
+    在页面上显示 st.session_state[state_key] 中保存的任务
+
+    进行中时显示状态和取消按钮并定时轮询（只刷新状态区域，不阻塞页面其余部分）；
+    结束后返回任务记录，由调用方展示结果
+
+    Returns:
+        已结束的任务记录；没有任务或任务仍在进行时返回None
+    """
+    import streamlit as st
+
+    job = get_job(st.session_state.get(state_key))
+    if job is None:
+        return None
+
+    if job['status'] in (PENDING, RUNNING):
+        _render_progress(st, state_key, job['id'], running_text)
+        return None
+
+    if job['status'] == FAILED:
+        st.error(f"{job['label']}失败：{job['error']}")
+    elif job['status'] == CANCELLED:
+        st.warning(f"{job['label']}已取消")
+    return job
+
+
+def _render_progress(st, state_key, job_id, running_text):
+    """任务进行中的状态区域；支持 st.fragment 的版本自动轮询，否则提供刷新按钮"""
+    can_poll = hasattr(st, 'fragment')
+
+    def show():
+        job = get_job(job_id)
+        if job is None or job['status'] in FINISHED_STATUSES:
+            st.rerun()
+        status_text = "排队中" if job['status'] == PENDING else "生成中"
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.info(f"⏳ {job['label']}：{status_text}（{running_text}）")
+        with col2:
+            if st.button("取消", key=f"cancel_{state_key}"):
+                cancel_job(job_id)
+                st.session_state.pop(state_key, None)
+                st.rerun()
+            if not can_poll:
+                st.button("刷新", key=f"refresh_{state_key}")
+
+    if can_poll:
+        st.fragment(run_every=AI_JOB_POLL_INTERVAL)(show)()
+    else:
+        show()
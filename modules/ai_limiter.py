@@ -0,0 +1,206 @@
+"""
+AI请求合并与限流模块
+- SingleFlight：相同的进行中请求只向上游发送一次，其余调用者等待并共享结果
+- ConcurrencyLimiter：进程级并发上限 + 令牌桶限速，超出时排队等待而不是报错
+并记录排队深度和等待时间，供监控使用
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from config.ai_config import AI_MAX_CONCURRENCY, AI_RATE_PER_SECOND, AI_RATE_BURST
+
+
+def make_request_key(payload):
+    """根据请求内容生成合并用的键（相同模型、消息和参数视为同一请求）"""
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    """一次进行中的上游调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """合并相同键的并发调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leader_count = 0
+        self.coalesced_count = 0
+
+    def do(self, key, fn):
+        """
+        执行fn；如果相同key的调用正在进行，则等待其结果
+
+        Returns:
+            fn的返回值（异常同样会传递给所有等待者）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced_count += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leader_count += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'inflight_keys': len(self._calls),
+                'leader_count': self.leader_count,
+                'coalesced_count': self.coalesced_count,
+            }
+
+
+class ConcurrencyLimiter:
+    """并发信号量 + 令牌桶，超限时阻塞排队"""
+
+    def __init__(self, max_concurrency, rate_per_second=0, burst=1):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.rate = float(rate_per_second)
+        self.burst = max(1, int(burst))
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        # 监控指标
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._in_flight = 0
+        self._acquired_count = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _take_token(self):
+        """从令牌桶取一个令牌，不足时睡眠到下一个令牌可用"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                sleep_for = (1 - self._tokens) / self.rate
+            time.sleep(sleep_for)
+
+    def acquire(self):
+        """排队获取一个上游请求名额，返回等待秒数"""
+        start = time.monotonic()
+        with self._lock:
+            self._queue_depth += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+        try:
+            self._semaphore.acquire()
+            try:
+                self._take_token()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            with self._lock:
+                self._queue_depth -= 1
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._in_flight += 1
+            self._acquired_count += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return waited
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._semaphore.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'rate_per_second': self.rate,
+                'queue_depth': self._queue_depth,
+                'max_queue_depth': self._max_queue_depth,
+                'in_flight': self._in_flight,
+                'acquired_count': self._acquired_count,
+                'avg_wait_seconds': self._total_wait / self._acquired_count if self._acquired_count else 0.0,
+                'max_wait_seconds': self._max_wait,
+            }
+
+
+# 进程级共享实例
+_singleflight = SingleFlight()
+_limiter = ConcurrencyLimiter(AI_MAX_CONCURRENCY, AI_RATE_PER_SECOND, AI_RATE_BURST)
+
+
+def get_limiter():
+    """获取进程级上游限流器"""
+    return _limiter
+
+
+def run_limited(fn):
+    """在限流器下执行一次上游调用（不参与请求合并，用于对冲请求）"""
+    with _limiter:
+        return fn()
+
+
+def run_upstream(payload, fn):
+    """
+    合并相同请求并在限流器下执行一次上游调用
+
+    Args:
+        payload: 请求内容（用于生成合并键）
+        fn: 实际发起请求的无参函数
+
+    Returns:
+        fn的返回值
+    """
+    return _singleflight.do(make_request_key(payload), lambda: run_limited(fn))
+
+
+def get_limiter_stats():
+    """限流与合并的监控指标"""
+    stats = _limiter.stats()
+    stats.update(_singleflight.stats())
+    return stats
@@ -0,0 +1,237 @@
+"""
+AI请求重试策略模块
+- 指数退避 + 全抖动（full jitter），避免大量客户端同时重试
+- 支持服务端 Retry-After 响应头
+- 总时间预算（deadline）：每次尝试的超时与退避都不会超过剩余预算
+- 可选对冲请求：首个请求超过历史延迟分位数仍未返回时，再并行发送一个，取先返回者
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+
+from config.ai_config import (
+    AI_RETRY_MAX_ATTEMPTS,
+    AI_RETRY_BASE_DELAY,
+    AI_RETRY_MAX_DELAY,
+    AI_RETRY_DEADLINE,
+    AI_HEDGE_PERCENTILE,
+    AI_HEDGE_MIN_SAMPLES,
+    AI_HTTP_READ_TIMEOUT,
+    AI_MAX_CONCURRENCY,
+)
+
+# 可重试的HTTP状态码：限流和服务端临时错误
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LatencyTracker:
+    """记录最近的成功请求延迟，用于计算对冲阈值"""
+
+    def __init__(self, maxlen=200):
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, min_samples=1):
+        """返回第pct百分位延迟；样本不足时返回None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+
+
+class RetryPolicy:
+    """重试策略配置"""
+
+    def __init__(self, max_attempts=AI_RETRY_MAX_ATTEMPTS, base_delay=AI_RETRY_BASE_DELAY,
+                 max_delay=AI_RETRY_MAX_DELAY, deadline=AI_RETRY_DEADLINE,
+                 attempt_timeout=AI_HTTP_READ_TIMEOUT, hedge_percentile=AI_HEDGE_PERCENTILE,
+                 hedge_min_samples=AI_HEDGE_MIN_SAMPLES):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """
+        第attempt次失败后的等待时间（attempt从0开始）
+
+        有 Retry-After 时以服务端要求为准，否则使用全抖动指数退避
+        """
+        if retry_after is not None:
+            return max(0.0, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def hedge_delay(self):
+        """对冲请求的触发延迟；未开启或样本不足时返回None"""
+        if not self.hedge_percentile:
+            return None
+        return self.latency.percentile(self.hedge_percentile, self.hedge_min_samples)
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+class RetryError(Exception):
+    """预算耗尽前没有可用结果时抛出（保留最后一次异常）"""
+
+    def __init__(self, message, last_error=None):
+        super().__init__(message)
+        self.last_error = last_error
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _transient_error_types():
+    """超时/连接类异常类型（requests、httpx、openai均可能出现）"""
+    types = []
+    try:
+        import requests
+        types += [requests.exceptions.Timeout, requests.exceptions.ConnectionError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        types.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import openai
+        types.append(openai.APIConnectionError)
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+_TRANSIENT_ERRORS = None
+
+
+def classify_error(error):
+    """
+    判断异常是否可重试
+
+    Returns:
+        (是否可重试, Retry-After秒数或None)
+    """
+    global _TRANSIENT_ERRORS
+    if _TRANSIENT_ERRORS is None:
+        _TRANSIENT_ERRORS = _transient_error_types()
+
+    if _TRANSIENT_ERRORS and isinstance(error, _TRANSIENT_ERRORS):
+        return True, None
+
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status in RETRY_STATUS_CODES:
+        headers = getattr(response, 'headers', None) or {}
+        return True, parse_retry_after(headers.get('Retry-After') or headers.get('retry-after'))
+    return False, None
+
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=AI_MAX_CONCURRENCY * 2,
+                    thread_name_prefix="ai-hedge"
+                )
+    return _hedge_executor
+
+
+def _run_hedged(fn, hedge_fn, timeout, hedge_delay):
+    """先发送fn，超过hedge_delay仍未完成则并行发送hedge_fn，返回先成功的结果"""
+    executor = _get_hedge_executor()
+    first = executor.submit(fn, timeout)
+    done, _ = wait([first], timeout=hedge_delay)
+    if done:
+        return first.result()
+
+    pending = {first, executor.submit(hedge_fn, max(0.1, timeout - hedge_delay))}
+    last_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            last_error = future.exception()
+    raise last_error
+
+
+def call_with_retry(fn, policy=None, hedge_fn=None, on_retry=None):
+    """
+    按重试策略执行一次AI调用
+
+    Args:
+        fn: 发起单次请求的函数，参数为本次尝试的超时秒数
+        policy: 重试策略（默认 DEFAULT_POLICY）
+        hedge_fn: 对冲请求使用的函数（默认与fn相同）；对冲需要绕过请求合并时单独传入
+        on_retry: 每次重试前的回调 on_retry(attempt, max_attempts, error, delay)
+
+    Returns:
+        fn的返回值
+
+    Raises:
+        不可重试的异常原样抛出；重试次数或时间预算耗尽时抛出最后一次异常
+    """
+    policy = policy or DEFAULT_POLICY
+    hedge_fn = hedge_fn or fn
+    deadline = time.monotonic() + policy.deadline
+
+    for attempt in range(policy.max_attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RetryError("AI请求超出时间预算")
+        timeout = min(policy.attempt_timeout, remaining)
+
+        start = time.monotonic()
+        try:
+            hedge_delay = policy.hedge_delay()
+            if hedge_delay is not None and hedge_delay < timeout:
+                result = _run_hedged(fn, hedge_fn, timeout, hedge_delay)
+            else:
+                result = fn(timeout)
+            policy.latency.record(time.monotonic() - start)
+            return result
+        except Exception as e:
+            retryable, retry_after = classify_error(e)
+            if not retryable or attempt == policy.max_attempts - 1:
+                raise
+            delay = policy.backoff_delay(attempt, retry_after)
+            if time.monotonic() + delay >= deadline:
+                raise
+            if on_retry:
+                on_retry(attempt + 1, policy.max_attempts, e, delay)
+            time.sleep(delay)
+
+    raise RetryError("AI请求重试次数已用尽")
@@ -8,6 +8,47 @@ import json
 import streamlit as st
 import time
 from config.ai_config import *
+from modules.ai_client import get_requests_session, get_request_timeout
+from modules.ai_limiter import run_upstream, run_limited
+from modules.ai_retry import call_with_retry, RetryPolicy, RetryError, DEFAULT_POLICY
+from modules.ai_batch import split_question_slots, iter_completed
+from modules.chat_context import ConversationContext
+from modules.answer_cache import cached_answer
+from modules.ai_telemetry import track_ai_call, caller_site
+
+class AIServiceError(Exception):
+    """AI调用失败（异常信息为可直接展示给用户的提示）"""
+
+
+class QuestionParseError(Exception):
+    """AI返回的题目无法解析（raw 为AI的原始回复）"""
+
+    def __init__(self, message, raw):
+        super().__init__(message)
+        self.raw = raw
+
+
+def show_question_failures(failures, generated):
+    """
+    在页面脚本线程中显示并发出题的失败原因（同样的原因只显示一次）
+    
+    Args:
+        failures: 失败请求的异常列表（AIServiceError / QuestionParseError / None）
+        generated: 已成功生成的题目数量
+    """
+    if not failures:
+        return
+    st.warning(f"⚠️ 有{len(failures)}组题目生成失败，已保留成功生成的{generated}道题目")
+    shown = set()
+    for error in failures:
+        message = str(error) if error else "AI没有返回题目"
+        if message in shown:
+            continue
+        shown.add(message)
+        st.error(message)
+        if isinstance(error, QuestionParseError) and error.raw:
+            st.code(error.raw)
+
 
 class AIService:
     """AI服务封装类"""
@@ -21,20 +62,60 @@ class AIService:
             "Content-Type": "application/json"
         }
     
-    def call_api(self, messages, params=None, max_retries=3):
+    def _post(self, url, payload, read_timeout=None):
+        """发送一次请求并返回解析后的JSON（HTTP错误以异常抛出）"""
+        # 复用共享连接池（keep-alive），超时见 AI_HTTP_*_TIMEOUT
+        response = get_requests_session().post(
+            url,
+            headers=self.headers,
+            json=payload,
+            timeout=get_request_timeout(read_timeout)
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def call_api(self, messages, params=None, max_retries=None, site=None):
         """
-        调用DeepSeek API（带重试机制）
+        调用DeepSeek API（带重试机制），重试提示和错误直接显示在页面上
+        
+        只能在页面脚本线程调用：后台线程中的 st.warning / st.error 不会显示，后台线程请使用 complete
         
         Args:
             messages: 对话消息列表
             params: API参数（可选）
-            max_retries: 最大重试次数
+            max_retries: 最大尝试次数（可选，默认使用 AI_RETRY_MAX_ATTEMPTS）
+            site: 调用点名称，用于监控统计（可选，默认取调用方的 模块名.函数名）
+        
+        Returns:
+            API响应内容，失败时返回None
+        """
+        try:
+            return self.complete(messages, params, max_retries, site or caller_site(),
+                                 on_retry=lambda message: st.warning(message))
+        except AIServiceError as e:
+            st.error(str(e))
+            return None
+    
+    def complete(self, messages, params=None, max_retries=None, site=None, on_retry=None):
+        """
+        调用DeepSeek API（带重试机制），不调用任何 st.* 函数，可在后台线程中使用
+        
+        Args:
+            messages: 对话消息列表
+            params: API参数（可选）
+            max_retries: 最大尝试次数（可选，默认使用 AI_RETRY_MAX_ATTEMPTS）
+            site: 调用点名称，用于监控统计（可选，默认取调用方的 模块名.函数名）
+            on_retry: 重试前以提示文字调用（可选）
         
         Returns:
             API响应内容
+        
+        Raises:
+            AIServiceError: 调用失败，异常信息为可直接展示给用户的提示
         """
         if params is None:
             params = API_PARAMS
+        site = site or caller_site()
         
         url = f"{self.api_base}/chat/completions"
         
@@ -44,87 +125,130 @@ class AIService:
             **params
         }
         
-        # 重试机制
-        for attempt in range(max_retries):
-            try:
-                # 增加超时时间到60秒
-                response = requests.post(
-                    url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=60
+        policy = DEFAULT_POLICY
+        if max_retries is not None and max_retries != policy.max_attempts:
+            policy = RetryPolicy(max_attempts=max_retries)
+            policy.latency = DEFAULT_POLICY.latency
+        
+        def notify_retry(attempt, max_attempts, error, delay):
+            call.retry()
+            if on_retry:
+                on_retry(f"⏰ AI服务暂时不可用，{delay:.1f}秒后重试 ({attempt}/{max_attempts - 1})...")
+        
+        def send(timeout):
+            result = self._post(url, payload, timeout)
+            call.upstream(result.get('usage'))
+            return result
+        
+        try:
+            # 重试机制：指数退避+抖动，遵循Retry-After，总耗时不超过 AI_RETRY_DEADLINE
+            # 相同的进行中请求合并为一次上游调用，并受进程级限流器约束（排队而不是失败）
+            # 对冲请求绕过合并，否则会直接并入仍在进行的首个请求
+            with track_ai_call(site) as call:
+                result = call_with_retry(
+                    lambda timeout: run_upstream(payload, lambda: send(timeout)),
+                    policy=policy,
+                    hedge_fn=lambda timeout: run_limited(lambda: send(timeout)),
+                    on_retry=notify_retry
                 )
-                response.raise_for_status()
-                
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            
-            except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    st.warning(f"⏰ 请求超时，正在重试 ({attempt + 1}/{max_retries})...")
-                    continue
-                else:
-                    st.error("❌ API请求超时。可能原因：\n- 网络连接不稳定\n- API服务器响应慢\n\n建议：请稍后重试或检查网络连接")
-                    return None
-            
-            except requests.exceptions.ConnectionError:
-                if attempt < max_retries - 1:
-                    st.warning(f"🔌 网络连接失败，正在重试 ({attempt + 1}/{max_retries})...")
-                    continue
-                else:
-                    st.error("❌ 无法连接到API服务器。请检查：\n- 网络连接是否正常\n- 是否可以访问 api.deepseek.com")
-                    return None
-            
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:
-                    st.error("⚠️ API调用频率超限，请稍后再试")
-                elif e.response.status_code == 401:
-                    st.error("❌ API Key无效，请检查配置")
-                elif e.response.status_code == 500:
-                    st.error("❌ API服务器错误，请稍后重试")
-                else:
-                    st.error(f"❌ HTTP错误 {e.response.status_code}: {str(e)}")
-                return None
-            
-            except requests.exceptions.RequestException as e:
-                st.error(f"❌ API调用失败: {str(e)}")
-                return None
-            
-            except Exception as e:
-                st.error(f"❌ 处理响应失败: {str(e)}")
-                return None
-        
-        return None
+            return result['choices'][0]['message']['content']
+        
+        except (requests.exceptions.Timeout, RetryError) as e:
+            raise AIServiceError("❌ API请求超时。可能原因：\n- 网络连接不稳定\n- API服务器响应慢\n\n建议：请稍后重试或检查网络连接") from e
+        
+        except requests.exceptions.ConnectionError as e:
+            raise AIServiceError("❌ 无法连接到API服务器。请检查：\n- 网络连接是否正常\n- 是否可以访问 api.deepseek.com") from e
+        
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 429:
+                message = "⚠️ API调用频率超限，请稍后再试"
+            elif e.response.status_code == 401:
+                message = "❌ API Key无效，请检查配置"
+            elif e.response.status_code >= 500:
+                message = "❌ API服务器错误，请稍后重试"
+            else:
+                message = f"❌ HTTP错误 {e.response.status_code}: {str(e)}"
+            raise AIServiceError(message) from e
+        
+        except requests.exceptions.RequestException as e:
+            raise AIServiceError(f"❌ API调用失败: {str(e)}") from e
+        
+        except Exception as e:
+            raise AIServiceError(f"❌ 处理响应失败: {str(e)}") from e
     
-    def chat_with_teacher(self, user_message, chat_history=None, context=None):
+    def chat_with_teacher(self, user_message, chat_history=None, context=None, conversation=None):
         """
         与AI历史老师对话
         
         Args:
             user_message: 用户消息
-            chat_history: 对话历史
+            chat_history: 对话历史（可传完整历史，按token预算截取）
             context: 上下文信息（知识点、学生历史记录等）
+            conversation: 会话上下文（ConversationContext，可选）；提供时早期对话会折叠为滚动摘要
         
         Returns:
             AI回复
         """
-        messages = [
+        system_messages = [
             {"role": "system", "content": HISTORY_TEACHER_PROMPT}
         ]
         
         # 添加上下文
         if context:
             context_msg = f"学生背景信息：{context}"
-            messages.append({"role": "system", "content": context_msg})
+            system_messages.append({"role": "system", "content": context_msg})
+        
+        # 近期对话按token预算保留，更早的对话使用摘要，每轮请求大小不随对话变长
+        if conversation is None:
+            messages = ConversationContext().build_messages(system_messages, chat_history, user_message)
+        else:
+            messages = conversation.build_messages(
+                system_messages, chat_history, user_message, summarizer=self.summarize_conversation
+            )
+        
+        # 独立提问（之前没有学生发言）与对话历史无关，相似问题直接复用之前的回答（背景信息不同则分开缓存）
+        if not any(msg.get('role') == 'user' for msg in (chat_history or [])):
+            return cached_answer(
+                f"chat|{context or ''}", user_message,
+                lambda: self.call_api(messages, CHAT_PARAMS, site="AIService.chat_with_teacher"),
+                site="AIService.chat_with_teacher"
+            )
+        
+        return self.call_api(messages, CHAT_PARAMS, site="AIService.chat_with_teacher")
+    
+    def summarize_conversation(self, previous_summary, turns):
+        """
+        把较早的对话折叠进滚动摘要（后台线程调用）
         
-        # 添加历史对话
-        if chat_history:
-            messages.extend(chat_history)
+        Args:
+            previous_summary: 之前的摘要
+            turns: 需要折叠的对话消息
+        
+        Returns:
+            新摘要
         
-        # 添加当前消息
-        messages.append({"role": "user", "content": user_message})
+        Raises:
+            AIServiceError: 调用失败（在后台线程中执行，不在页面上显示错误）
+        """
+        dialogue = "\n".join(
+            f"{'学生' if t['role'] == 'user' else '老师'}：{t['content']}" for t in turns
+        )
+        prompt = f"""请把下面的师生对话压缩为一段简短摘要，供老师继续辅导时参考。
+
+{"【已有摘要】" + chr(10) + previous_summary + chr(10) if previous_summary else ""}
+【新增对话】
+{dialogue}
+
+要求：
+- 保留学生问过的知识点、暴露的误区和老师已讲过的要点
+- 不超过200字，只输出摘要正文
+"""
+        messages = [
+            {"role": "system", "content": "你擅长准确、简洁地总结教学对话。"},
+            {"role": "user", "content": prompt}
+        ]
         
-        return self.call_api(messages, CHAT_PARAMS)
+        return self.complete(messages, {"temperature": 0.3, "max_tokens": AI_CHAT_SUMMARY_TOKENS}, site="AIService.summarize_conversation")
     
     def grade_essay(self, question, student_answer, reference_answer=None, history_records=None):
         """
@@ -177,9 +301,9 @@ class AIService:
             {"role": "user", "content": prompt}
         ]
         
-        return self.call_api(messages, GRADING_PARAMS)
+        return self.call_api(messages, GRADING_PARAMS, site="AIService.grade_essay")
     
-    def generate_questions(self, knowledge_points=None, difficulty='medium', weak_points=None, count=3, question_type='选择题'):
+    def generate_questions(self, knowledge_points=None, difficulty='medium', weak_points=None, count=3, question_type='选择题', focus=None):
         """
         生成练习题（优先生成选择题）
         
@@ -189,10 +313,26 @@ class AIService:
             weak_points: 学生薄弱点
             count: 生成题目数量
             question_type: 题型（'选择题'/'材料题'/'混合'）
+            focus: 命题角度（可选，批量生成时区分各组题目）
         
         Returns:
             题目列表（JSON格式）
         """
+        messages = self._question_messages(knowledge_points, difficulty, weak_points, count, question_type, focus)
+        
+        response = self.call_api(messages, QUESTION_PARAMS, site="AIService.generate_questions")
+        
+        if response:
+            try:
+                return self._parse_questions(response)
+            except QuestionParseError:
+                st.error("AI生成的题目格式有误，请重试")
+                return None
+        
+        return None
+    
+    def _question_messages(self, knowledge_points, difficulty, weak_points, count, question_type, focus):
+        """构造出题请求的消息列表（参数同 generate_questions）"""
         difficulty_map = {
             'easy': '简单（基础记忆）',
             'medium': '中等（理解分析）',
@@ -215,6 +355,7 @@ class AIService:
 - 难度等级：{difficulty_map.get(difficulty, '中等')}
 - 题型：{type_desc}
 {"- 重点考查：" + weak_points if weak_points else ""}
+{"- 命题角度：" + focus if focus else ""}
 
 【输出格式】（必须是有效的JSON数组）
 ```json
@@ -258,27 +399,60 @@ class AIService:
 5. 选项要有干扰性，不能一眼看出答案
 """
         
-        messages = [
+        return [
             {"role": "system", "content": QUESTION_GENERATOR_PROMPT},
             {"role": "user", "content": prompt}
         ]
+    
+    @staticmethod
+    def _parse_questions(response):
+        """
+        从AI回复中提取题目JSON数组
         
-        response = self.call_api(messages, QUESTION_PARAMS)
+        Raises:
+            QuestionParseError: 回复中没有可解析的题目数组
+        """
+        # 提取JSON部分
+        json_start = response.find('[')
+        json_end = response.rfind(']') + 1
+        if json_start == -1 or json_end <= json_start:
+            raise QuestionParseError("AI生成的题目格式有误，请重试", response)
+        try:
+            return json.loads(response[json_start:json_end])
+        except json.JSONDecodeError as e:
+            raise QuestionParseError(f"AI生成的题目格式有误，请重试（{e}）", response) from e
+    
+    def iter_generate_questions(self, knowledge_points=None, difficulty='medium', weak_points=None, count=3, question_type='选择题'):
+        """
+        批量生成练习题：按知识点/题目槽位拆分为多个小请求并发执行
         
-        if response:
-            try:
-                # 提取JSON部分
-                json_start = response.find('[')
-                json_end = response.rfind(']') + 1
-                if json_start != -1 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    questions = json.loads(json_str)
-                    return questions
-            except json.JSONDecodeError:
-                st.error("AI生成的题目格式有误，请重试")
-                return None
+        参数同 generate_questions。每个请求完成后立即产出其结果，
+        界面可以边生成边显示，首题等待时间和总耗时都更短。
+        请求在工作线程中执行，不调用 st.*：失败原因随结果返回，
+        由调用方在页面脚本线程中显示（见 show_question_failures）
         
-        return None
+        Yields:
+            (题目列表, None) 或 (None, 异常)，每个请求一项
+        """
+        slots = split_question_slots(count, knowledge_points)
+        
+        def generate_slot(kp, n, focus):
+            messages = self._question_messages(
+                [kp] if kp else knowledge_points,
+                difficulty, weak_points, n, question_type, focus
+            )
+            try:
+                response = self.complete(messages, QUESTION_PARAMS, site="AIService.iter_generate_questions")
+                return self._parse_questions(response), None
+            except (AIServiceError, QuestionParseError) as e:
+                return None, e
+        
+        for _, result in iter_completed(generate_slot, slots):
+            questions, error = result or (None, None)
+            if questions:
+                yield questions, None
+            else:
+                yield None, error
     
     def explain_concept(self, concept, level='detailed', related_concepts=None):
         """
@@ -333,7 +507,13 @@ class AIService:
             {"role": "user", "content": prompt}
         ]
         
-        return self.call_api(messages, CHAT_PARAMS)
+        # 相似的概念/问题复用已有讲解（讲解深度和关联概念不同则分开缓存）
+        scope = f"explain|{level}|{'、'.join(related_concepts or [])}"
+        return cached_answer(
+            scope, concept,
+            lambda: self.call_api(messages, CHAT_PARAMS, site="AIService.explain_concept"),
+            site="AIService.explain_concept"
+        )
     
     def analyze_learning_data(self, student_records):
         """
@@ -376,7 +556,7 @@ class AIService:
             {"role": "user", "content": prompt}
         ]
         
-        return self.call_api(messages, CHAT_PARAMS)
+        return self.call_api(messages, CHAT_PARAMS, site="AIService.analyze_learning_data")
     
     def generate_memory_tips(self, content, student_confusion=None):
         """
@@ -415,7 +595,7 @@ class AIService:
             {"role": "user", "content": prompt}
         ]
         
-        return self.call_api(messages, CHAT_PARAMS)
+        return self.call_api(messages, CHAT_PARAMS, site="AIService.generate_memory_tips")
 
 
 # 创建全局AI服务实例
@@ -0,0 +1,261 @@
+"""
+AI调用监控模块
+按调用点（如 "AIService.chat_with_teacher"、"teaching_design.request_teaching_design"）统计：
+- 调用次数、错误数（按错误类型）、重试次数
+- 延迟直方图（固定分桶，可估算P50/P95/P99）
+- 上游实际消耗的token数（来自响应的 usage 字段，合并的请求不重复计数）
+- 缓存命中数（相似问题缓存、预生成内容、合并到进行中的相同请求）
+
+统计数据定期导出到 data/ai_telemetry.json，教师端"AI调用监控"页面读取展示
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config.ai_config import AI_TELEMETRY_FILE, AI_TELEMETRY_FLUSH_INTERVAL
+
+# 延迟分桶上界（秒），最后一个桶收纳更慢的请求
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120]
+
+
+def bucket_label(index):
+    """分桶的显示名称"""
+    if index >= len(LATENCY_BUCKETS):
+        return f">{LATENCY_BUCKETS[-1]:g}s"
+    return f"≤{LATENCY_BUCKETS[index]:g}s"
+
+
+def histogram_percentile(histogram, q):
+    """根据直方图估算分位数（返回所在分桶的上界，最后一个桶返回None）"""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None
+    return None
+
+
+def _new_site():
+    return {
+        'calls': 0,
+        'errors': 0,
+        'error_types': {},
+        'last_error': None,
+        'retries': 0,
+        'upstream_requests': 0,
+        'cache_hits': 0,
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+        'latency_sum': 0.0,
+        'latency_max': 0.0,
+        'histogram': [0] * (len(LATENCY_BUCKETS) + 1),
+    }
+
+
+class AITelemetry:
+    """进程内的调用统计"""
+
+    def __init__(self, path=AI_TELEMETRY_FILE, flush_interval=AI_TELEMETRY_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._lock = threading.Lock()
+        # 导出锁：间隔判断和文件写入都在锁内，多个线程不会同时写同一个临时文件
+        self._flush_lock = threading.Lock()
+        self._sites = {}
+        self._last_flush = 0.0
+
+    def _site(self, site):
+        if site not in self._sites:
+            self._sites[site] = _new_site()
+        return self._sites[site]
+
+    def record_call(self, site, latency, error=None):
+        """记录一次完整调用（含重试）的延迟和结果"""
+        index = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                index = i
+                break
+        with self._lock:
+            stats = self._site(site)
+            stats['calls'] += 1
+            stats['latency_sum'] += latency
+            stats['latency_max'] = max(stats['latency_max'], latency)
+            stats['histogram'][index] += 1
+            if error is not None:
+                error_type = type(error).__name__
+                stats['errors'] += 1
+                stats['error_types'][error_type] = stats['error_types'].get(error_type, 0) + 1
+                stats['last_error'] = f"{error_type}: {str(error)[:200]}"
+        self._maybe_flush()
+
+    def record_upstream(self, site, usage=None):
+        """记录一次实际发往上游的请求及其token用量"""
+        prompt_tokens, completion_tokens = _usage_tokens(usage)
+        with self._lock:
+            stats = self._site(site)
+            stats['upstream_requests'] += 1
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+
+    def record_retry(self, site):
+        with self._lock:
+            self._site(site)['retries'] += 1
+
+    def record_cache_hit(self, site):
+        with self._lock:
+            self._site(site)['cache_hits'] += 1
+        self._maybe_flush()
+
+    def snapshot(self):
+        """当前统计（附带估算的分位数和平均值）"""
+        with self._lock:
+            sites = json.loads(json.dumps(self._sites))
+        for stats in sites.values():
+            calls = stats['calls']
+            stats['latency_avg'] = stats['latency_sum'] / calls if calls else 0.0
+            stats['p50'] = histogram_percentile(stats['histogram'], 0.50)
+            stats['p95'] = histogram_percentile(stats['histogram'], 0.95)
+            stats['p99'] = histogram_percentile(stats['histogram'], 0.99)
+        return {
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'latency_buckets': LATENCY_BUCKETS,
+            'sites': sites,
+        }
+
+    def _maybe_flush(self):
+        if self.flush_interval <= 0:
+            return
+        # 其他线程正在导出时直接跳过，请求路径上不等待磁盘写入
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._write()
+        finally:
+            self._flush_lock.release()
+
+    def flush(self):
+        """导出到文件（先写临时文件再替换）"""
+        with self._flush_lock:
+            self._write()
+
+    def _write(self):
+        """实际的导出（调用方须持有 _flush_lock）"""
+        self._last_flush = time.monotonic()
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+        self.flush()
+
+
+def _usage_tokens(usage):
+    """从响应usage中取 (prompt_tokens, completion_tokens)，兼容dict和OpenAI对象"""
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0
+    return getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0
+
+
+class CallRecorder:
+    """单次调用的记录器（由 track_ai_call 创建）"""
+
+    def __init__(self, telemetry, site):
+        self.telemetry = telemetry
+        self.site = site
+        self.upstream_requests = 0
+
+    def upstream(self, usage=None):
+        """本调用实际发送了一次上游请求"""
+        self.upstream_requests += 1
+        self.telemetry.record_upstream(self.site, usage)
+
+    def retry(self):
+        self.telemetry.record_retry(self.site)
+
+
+_telemetry = AITelemetry()
+atexit.register(_telemetry.flush)
+
+
+def get_telemetry():
+    """获取进程级共享的调用统计"""
+    return _telemetry
+
+
+def caller_site(depth=2):
+    """
+    推断调用点名称（模块名.函数名），跳过lambda等匿名帧
+
+    Args:
+        depth: 从本函数往上跳过的帧数
+    """
+    frame = sys._getframe(depth)
+    while frame is not None and frame.f_code.co_name.startswith('<'):
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    module = frame.f_globals.get('__name__', '').rsplit('.', 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+@contextmanager
+def track_ai_call(site):
+    """
+    统计一次AI调用
+
+    用法：
+        with track_ai_call("AIService.call_api") as call:
+            ...  # 每次实际发送上游请求后调用 call.upstream(usage)，重试前调用 call.retry()
+
+    成功返回但没有发送过上游请求，说明结果来自合并的相同请求，计为一次缓存命中
+    """
+    call = CallRecorder(_telemetry, site)
+    start = time.monotonic()
+    try:
+        yield call
+    except BaseException as e:
+        _telemetry.record_call(site, time.monotonic() - start, error=e)
+        raise
+    _telemetry.record_call(site, time.monotonic() - start)
+    if call.upstream_requests == 0:
+        _telemetry.record_cache_hit(site)
+
+
+def record_cache_hit(site):
+    """记录一次缓存命中（未调用AI）"""
+    _telemetry.record_cache_hit(site)
+
+
+def load_exported_telemetry(path=AI_TELEMETRY_FILE):
+    """读取导出文件，不存在时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,267 @@
+"""
+相似问题答案缓存
+学生会用很多种说法问同一个问题（"辛亥革命的意义" / "辛亥革命有什么历史意义？"），
+这里在AI对话和知识点讲解前做一层近似匹配：
+1. 规范化：全半角统一、去标点空白，去掉开头的"请问/帮我"和结尾的"是什么/吗"等提问虚词，
+   再去掉句中的"有什么/是什么"、结构助词"的"（"目的""的确"除外）和修饰"意义/影响"等的"历史"
+   （不按单字删：删掉所有"历史"会把"历史唯物主义"拆成"唯物主义"）
+2. 字符二元组（bigram）集合 → MinHash签名 → LSH分桶快速找候选
+3. 对候选计算精确Jaccard相似度，达到阈值且两个问题的区别字（只在一方出现的字）只有语气词时才命中：
+   "第一次/第二次世界大战""秦朝/隋朝灭亡的原因"字面相似度都在0.7以上，但问的是不同的事，区别字不一致就不命中
+不依赖外部向量服务，全部在进程内完成
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config.ai_config import (
+    AI_ANSWER_CACHE_ENABLED,
+    AI_ANSWER_CACHE_THRESHOLD,
+    AI_ANSWER_CACHE_SIZE,
+    AI_ANSWER_CACHE_TTL,
+)
+from modules.ai_telemetry import record_cache_hit
+
+# 提问虚词：不影响问题含义，只在问题开头 / 结尾反复删除
+QUESTION_PREFIXES = [
+    "请问", "请你", "请", "帮我", "能不能", "可不可以", "可以", "老师", "讲讲", "说说", "介绍", "分析", "一下", "什么是",
+]
+QUESTION_SUFFIXES = [
+    "是什么", "有什么", "有哪些", "是哪些", "是谁", "吗", "呢", "呀", "啊", "吧",
+]
+
+
+def _affix_pattern(words, template):
+    alternatives = '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(template.format(alternatives))
+
+
+_PREFIX_PATTERN = _affix_pattern(QUESTION_PREFIXES, r'^(?:{})+')
+_SUFFIX_PATTERN = _affix_pattern(QUESTION_SUFFIXES, r'(?:{})+$')
+
+# 句中可以删除的虚词：提问短语、结构助词"的"（不拆"目的""的确"）、修饰评价类名词的"历史"（"历史意义"即"意义"）
+_INFIX_PATTERN = re.compile(
+    r'有什么|有哪些|是什么|是哪些|有何'
+    r'|(?<!目)的(?!确)'
+    r'|历史(?=意义|作用|地位|影响|背景|原因|教训|经验|特点|价值)'
+)
+
+# 区别字中允许出现的语气词，其他任何字（数字、序数、朝代、人名地名等）不一致都不命中
+PARTICLE_CHARS = frozenset("了吗呢吧啊呀嘛哦")
+
+_PUNCT_PATTERN = re.compile(r'[\s\W_]+', re.UNICODE)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+
+
+def _make_permutations():
+    """固定种子的哈希置换参数（各进程一致）"""
+    params = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'big') % (_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], 'big') % _PRIME
+        params.append((a, b))
+    return params
+
+
+_PERMUTATIONS = _make_permutations()
+
+
+def normalize_question(text):
+    """规范化问题文本"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = _PUNCT_PATTERN.sub('', text)
+    # 整句都是虚词（如"什么是"）时保留原文
+    text = _SUFFIX_PATTERN.sub('', _PREFIX_PATTERN.sub('', text)) or text
+    return _INFIX_PATTERN.sub('', text) or text
+
+
+def same_subject(a, b):
+    """两个规范化后的问题是否问的是同一件事：只在一方出现的字只能是语气词"""
+    return not (set(a) ^ set(b)) - PARTICLE_CHARS
+
+
+def shingles(text, n=2):
+    """字符n元组集合（文本短于n时退化为整体）"""
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def minhash_signature(shingle_set):
+    """计算MinHash签名"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+        for s in shingle_set
+    ]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Entry:
+    def __init__(self, scope, normalized, shingle_set, signature, answer):
+        self.scope = scope
+        self.normalized = normalized
+        self.shingles = shingle_set
+        self.signature = signature
+        self.answer = answer
+        self.created_at = time.time()
+        self.hits = 0
+
+
+class AnswerCache:
+    """近似问题答案缓存（LRU + 过期时间）"""
+
+    def __init__(self, threshold=AI_ANSWER_CACHE_THRESHOLD, max_size=AI_ANSWER_CACHE_SIZE, ttl=AI_ANSWER_CACHE_TTL):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry_id -> _Entry（按最近使用排序）
+        self._buckets = {}             # (scope, band, band_hash) -> {entry_id}
+        self._next_id = 0
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def _band_keys(self, scope, signature):
+        return [(scope, band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry.scope, entry.signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def lookup(self, scope, question):
+        """
+        查找相似问题的答案
+
+        Args:
+            scope: 命名空间（如 "chat"、"explain|detailed"），不同用途互不命中
+            question: 学生问题
+
+        Returns:
+            (答案, 相似度)；未命中返回 (None, 0.0)
+        """
+        normalized = normalize_question(question)
+        shingle_set = shingles(normalized)
+        if not shingle_set:
+            return None, 0.0
+        signature = minhash_signature(shingle_set)
+
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(scope, signature):
+                candidates |= self._buckets.get(key, set())
+
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries.get(entry_id)
+                if entry is None:
+                    continue
+                if self.ttl and now - entry.created_at > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                if entry.normalized == normalized:
+                    score = 1.0
+                elif same_subject(entry.normalized, normalized):
+                    score = jaccard(shingle_set, entry.shingles)
+                else:
+                    continue
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is not None and best_score >= self.threshold:
+                entry = self._entries[best_id]
+                entry.hits += 1
+                self._entries.move_to_end(best_id)
+                self.hit_count += 1
+                return entry.answer, best_score
+
+            self.miss_count += 1
+            return None, best_score
+
+    def store(self, scope, question, answer):
+        """缓存问题的答案"""
+        normalized = normalize_question(question)
+        shingle_set = shingles(normalized)
+        if not shingle_set or not answer:
+            return
+        signature = minhash_signature(shingle_set)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(scope, normalized, shingle_set, signature, answer)
+            for key in self._band_keys(scope, signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def get_or_compute(self, scope, question, compute, site=None):
+        """命中则返回缓存答案，否则调用compute()并缓存其非空结果"""
+        answer, _ = self.lookup(scope, question)
+        if answer is not None:
+            record_cache_hit(site or f"answer_cache.{scope.split('|')[0]}")
+            return answer
+        answer = compute()
+        if answer:
+            self.store(scope, question, answer)
+        return answer
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hit_count + self.miss_count
+            return {
+                'entries': len(self._entries),
+                'hits': self.hit_count,
+                'misses': self.miss_count,
+                'hit_rate': self.hit_count / total if total else 0.0,
+            }
+
+
+_answer_cache = AnswerCache()
+
+
+def get_answer_cache():
+    """获取进程级共享的答案缓存"""
+    return _answer_cache
+
+
+def cached_answer(scope, question, compute, site=None):
+    """
+    相似问题缓存入口（可通过 AI_ANSWER_CACHE_ENABLED 关闭）
+
+    Args:
+        scope: 命名空间
+        question: 学生问题
+        compute: 未命中时生成答案的函数（无参）
+        site: 监控统计中记录缓存命中的调用点名称（默认按命名空间）
+    """
+    if not AI_ANSWER_CACHE_ENABLED:
+        return compute()
+    return _answer_cache.get_or_compute(scope, question, compute, site=site)
@@ -0,0 +1,174 @@
+"""
+对话上下文管理模块
+按token预算保留最近若干轮对话（滑动窗口），更早的对话折叠为滚动摘要，
+摘要在后台线程中刷新，不阻塞当前回复。每轮请求大小与对话长度无关
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config.ai_config import AI_CHAT_HISTORY_TOKENS, AI_CHAT_SUMMARY_TOKENS
+
+# 每条消息的固定开销（角色标记等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """
+    粗略估计文本token数
+
+    中文字符和全角标点按每字1个token计，其余字符按每4个字符1个token计（偏保守）
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_message_tokens(message):
+    """估计单条消息的token数"""
+    return estimate_tokens(message.get('content', '')) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text, max_tokens):
+    """把文本截断到大约max_tokens个token（保留开头）"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + "…"
+
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+
+class ConversationContext:
+    """单个会话的上下文窗口和滚动摘要"""
+
+    def __init__(self, history_budget=AI_CHAT_HISTORY_TOKENS, summary_tokens=AI_CHAT_SUMMARY_TOKENS):
+        self.history_budget = history_budget
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self.summarized_upto = 0  # 已折叠进摘要的历史消息数
+        self.last_prompt_tokens = 0
+        self.summary_error = None  # 最近一次后台摘要失败的原因（后台线程不能调用 st.*，由页面取出显示）
+        self._generation = 0  # 每次清空加1，用于丢弃过期的后台摘要结果
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """清空摘要（对话被清空时调用）"""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.summary = ""
+        self.summarized_upto = 0
+        self.summary_error = None
+        self._generation += 1
+        self._pending = None
+
+    def _window_start(self, history):
+        """在预算内从最新消息往前取，返回窗口起始下标"""
+        used = 0
+        start = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            cost = estimate_message_tokens(history[i])
+            if used + cost > self.history_budget:
+                break
+            used += cost
+            start = i
+        return start
+
+    def _schedule_summary(self, turns, upto, summarizer):
+        """后台把turns折叠进摘要；已有任务在进行时跳过，下一轮再补"""
+        if self._pending is not None and not self._pending.done():
+            return
+        previous = self.summary
+        generation = self._generation
+
+        def refresh():
+            try:
+                new_summary = summarizer(previous, turns)
+                error = None if new_summary else "AI未返回摘要"
+            except Exception as e:
+                new_summary, error = None, str(e) or type(e).__name__
+            with self._lock:
+                # 对话在此期间被清空则丢弃结果
+                if generation != self._generation:
+                    return
+                self.summary_error = error
+                if new_summary and upto > self.summarized_upto:
+                    self.summary = truncate_to_tokens(new_summary.strip(), self.summary_tokens)
+                    self.summarized_upto = upto
+
+        self._pending = _summary_executor.submit(refresh)
+
+    def build_messages(self, system_messages, history, user_message, summarizer=None):
+        """
+        构建本轮请求的消息列表
+
+        Args:
+            system_messages: 系统消息（人设、背景信息等）
+            history: 完整对话历史（不含本轮用户消息），元素需包含role和content
+            user_message: 本轮用户消息
+            summarizer: 摘要函数 summarizer(旧摘要, 待折叠消息) -> 新摘要；为None时只做窗口截断
+
+        Returns:
+            消息列表：系统消息 + 早期对话摘要 + 预算内的近期对话 + 本轮消息
+        """
+        history = [
+            {"role": msg['role'], "content": truncate_to_tokens(str(msg.get('content', '')), self.history_budget // 2)}
+            for msg in (history or [])
+            if msg.get('role') in ('user', 'assistant')
+        ]
+
+        with self._lock:
+            if len(history) < self.summarized_upto:
+                self._clear()
+            start = self._window_start(history)
+            if summarizer and start > self.summarized_upto:
+                self._schedule_summary(history[self.summarized_upto:start], start, summarizer)
+            summary = self.summary
+
+        messages = list(system_messages)
+        if summary:
+            messages.append({"role": "system", "content": f"此前对话摘要：{summary}"})
+        messages.extend(history[start:])
+        messages.append({"role": "user", "content": user_message})
+
+        self.last_prompt_tokens = sum(estimate_message_tokens(m) for m in messages)
+        return messages
+
+    def pop_summary_error(self):
+        """取出并清除最近一次后台摘要失败的原因（没有失败时返回None）"""
+        with self._lock:
+            error, self.summary_error = self.summary_error, None
+        return error
+
+
+def get_conversation_context(name):
+    """获取当前用户会话中名为name的对话上下文（保存在 st.session_state）"""
+    import streamlit as st
+
+    key = f"conversation_context_{name}"
+    if key not in st.session_state:
+        st.session_state[key] = ConversationContext()
+    return st.session_state[key]
+
+
+def render_summary_error(name):
+    """在页面上显示对话name的后台摘要失败原因（每次失败只显示一次）"""
+    import streamlit as st
+
+    error = get_conversation_context(name).pop_summary_error()
+    if error:
+        st.warning(f"⚠️ 早期对话摘要更新失败，AI老师暂时只参考最近的对话：{error}")
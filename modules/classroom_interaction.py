@@ -5,7 +5,7 @@
 
 import streamlit as st
 from datetime import datetime
-from openai import OpenAI
+from modules.ai_client import create_chat_completion
 from streamlit_autorefresh import st_autorefresh
 from config.settings import *
 
@@ -138,11 +138,6 @@ def get_recent_replies(question_id, limit=20):
 
 def summarize_replies_with_ai(question_text, replies):
     """使用AI总结学生回复"""
-    client = OpenAI(
-        api_key=DEEPSEEK_API_KEY,
-        base_url=DEEPSEEK_BASE_URL
-    )
-    
     replies_text = '\n'.join([f"- {r['content']}" for r in replies])
     
     prompt = f"""
@@ -160,7 +155,8 @@ def summarize_replies_with_ai(question_text, replies):
 请用简洁、专业的语言，帮助教师快速掌握学生的学习情况。
 """
     
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        site="classroom_interaction.summarize_replies",
         model="deepseek-chat",
         messages=[{"role": "user", "content": prompt}],
         stream=False
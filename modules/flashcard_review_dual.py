@@ -5,7 +5,8 @@
 
 import streamlit as st
 import random
-from modules.ai_service import get_ai_service
+from modules.ai_service import get_ai_service, show_question_failures
+from modules.ai_content_store import get_or_generate
 from data.history_flashcards import get_all_flashcards
 
 def render_flashcard_review():
@@ -262,10 +263,11 @@ def show_ai_explanation(ai_service, card):
     st.markdown("## 🤖 AI深度讲解")
     
     with st.spinner("💭 AI老师正在准备详细讲解..."):
-        explanation = ai_service.explain_concept(
+        # 优先使用离线预生成的讲解（scripts/pregenerate_ai_content.py）
+        explanation = get_or_generate("flashcard_explanation", card['id'], lambda: ai_service.explain_concept(
             f"知识点：{card['title']}\n问题：{card['question']}\n答案：{card['answer']}",
             level='detailed'
-        )
+        ))
         
         if explanation:
             st.markdown(explanation)
@@ -279,10 +281,10 @@ def show_ai_memory_tips(ai_service, card):
     st.markdown("## 💡 AI记忆技巧")
     
     with st.spinner("🧠 AI正在生成记忆技巧..."):
-        tips = ai_service.generate_memory_tips(
+        tips = get_or_generate("flashcard_memory_tips", card['id'], lambda: ai_service.generate_memory_tips(
             card['title'],
             card['answer']
-        )
+        ))
         
         if tips:
             st.markdown(tips)
@@ -298,15 +300,20 @@ def generate_practice_questions(ai_service, card, difficulty, count):
     difficulty_map = {"简单": "easy", "中等": "medium", "困难": "hard"}
     
     with st.spinner("正在生成练习题..."):
-        questions = ai_service.generate_questions(
+        # 并发分批生成，每批完成后立即显示
+        i = 0
+        failures = []
+        for batch, error in ai_service.iter_generate_questions(
             knowledge_points=[card['title']],
             difficulty=difficulty_map[difficulty],
             count=count,
             question_type="选择题"  # 默认生成选择题
-        )
-        
-        if questions:
-            for i, q in enumerate(questions, 1):
+        ):
+            if not batch:
+                failures.append(error)
+                continue
+            for q in batch:
+                i += 1
                 with st.expander(f"📝 题目 {i}", expanded=(i==1)):
                     st.markdown(f"**{q.get('question', '')}**")
                     
@@ -320,8 +327,10 @@ def generate_practice_questions(ai_service, card, difficulty, count):
                         st.success(f"✅ 答案：{q.get('answer', '')}")
                         if 'explanation' in q:
                             st.info(f"💡 解析：{q['explanation']}")
-        else:
+        
+        if i == 0 and not failures:
             st.warning("生成失败，请稍后重试")
+        show_question_failures(failures, i)
 
 
 def get_mastery_color(mastery_level):
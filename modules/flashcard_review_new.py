@@ -6,6 +6,7 @@
 import streamlit as st
 from data.history_flashcards import HISTORY_FLASHCARDS
 from modules.ai_service import get_ai_service
+from modules.ai_content_store import get_or_generate
 import random
 from datetime import datetime, timedelta
 
@@ -170,10 +171,10 @@ def render_flashcard_with_ai(card, ai_service):
         # AI深度讲解按钮
         if st.button("🤖 AI深度讲解", key=f"ai_explain_{card['id']}"):
             with st.spinner("AI老师正在准备讲解..."):
-                explanation = ai_service.explain_concept(
+                explanation = get_or_generate("flashcard_explanation", card['id'], lambda: ai_service.explain_concept(
                     card['front'],
                     level='detailed'
-                )
+                ))
                 
                 if explanation:
                     st.markdown("### 👨‍🏫 AI老师的深度讲解")
@@ -186,10 +187,10 @@ def render_flashcard_with_ai(card, ai_service):
         # AI生成记忆技巧
         if st.button("🎯 AI生成记忆技巧", key=f"memory_{card['id']}"):
             with st.spinner("AI正在生成记忆方法..."):
-                memory_tips = ai_service.generate_memory_tips(
+                memory_tips = get_or_generate("flashcard_memory_tips", card['id'], lambda: ai_service.generate_memory_tips(
                     content=f"{card['front']}\n{card['back']}",
                     student_confusion=None
-                )
+                ))
                 
                 if memory_tips:
                     st.markdown("### 💡 记忆技巧")
@@ -0,0 +1,331 @@
+"""
+知识图谱聚类与节点预算
+"经济发展"这类宽泛专题会拉出十几课、二十个事件、十几个人物，大一点的教材单元更多，
+几百个节点一次画出来既慢又看不清。这里在服务端按节点预算收拢图谱：
+- 事件按年代（缺少年份时按所属课程）分组，人物按时期分组，课文按教材分组
+- 节点数超过预算时，从最大的分组开始收拢为一个聚类节点，直到满足预算
+- 聚类节点在逐级展开组件中点击展开其成员（见 modules/graph_explorer.py 的 show_clustered_graph）
+
+人物没有年份，其时期优先取所在课文的单元时期（按时间编排的必修教材，单元标题写明了朝代/时期），
+同名人物在各课的出现合并判断；都没有时再用全语料的共现图（同课出现、事件描述中提到人物）做标签传播社区发现，
+所在社区事件年份的时期足够一致时才采用，证据不足或相互矛盾时归入"未知时期"，不猜测
+"""
+
+import datetime
+import random
+import re
+from collections import Counter
+
+from config.settings import GRAPH_NODE_BUDGET, GRAPH_LPA_MAX_ITERATIONS, GRAPH_LAYOUT_ENABLED
+from modules.graph_layout import layout_graph
+from modules.graph_render import node_detail
+
+# 时期划分（与专题定义中的 periods 一致）：(截止年份, 名称)
+ERAS = [(1840, "古代"), (1949, "近代"), (None, "现代")]
+UNKNOWN_ERA = "未知时期"
+
+# 年份的合理范围下限（教材涉及的最早年代约为公元前3000年），上限为今年
+MIN_YEAR = -3000
+
+# 单元标题中的时期关键词：只收录时期没有歧义的（"明清"在1840年前、"晚清"在其后），专题式单元不标注时期
+ERA_KEYWORDS = [
+    ("古代", ("文明起源", "秦汉", "三国", "两晋", "南北朝", "隋唐", "辽宋夏金", "元朝", "明清", "古代文明", "中古")),
+    ("近代", ("晚清", "辛亥革命", "中华民国", "新民主主义", "抗日战争", "解放战争", "工业革命", "资本主义制度",
+              "两次世界大战", "十月革命")),
+    ("现代", ("中华人民共和国", "社会主义革命与建设", "改革开放", "新时代", "20世纪下半叶", "当代")),
+]
+
+# 社区事件年份中同一时期的占比达到该值才采用社区时期
+ERA_MAJORITY = 2 / 3
+
+# 人物名后接这些字时指地名或事件（"林肯城""华盛顿会议"），不作为人物时期的证据
+NAME_COMPOUND_SUFFIXES = ("城", "会议")
+
+_YEAR_PATTERN = re.compile(r'(公元前|前)?(?<!\d)(\d{1,4})(?!\d)')
+
+
+def parse_year(value):
+    """解析事件年份（字符串或数字，"公元前"/"前"开头为负数），无法解析或超出合理范围时返回None"""
+    match = _YEAR_PATTERN.search(str(value or ''))
+    if not match:
+        return None
+    year = int(match.group(2))
+    if match.group(1):
+        year = -year
+    if year == 0 or year < MIN_YEAR or year > datetime.date.today().year:
+        return None
+    return year
+
+
+def era_of(year):
+    """年份所属时期"""
+    if year is None:
+        return UNKNOWN_ERA
+    for end, name in ERAS:
+        if end is None or year < end:
+            return name
+    return UNKNOWN_ERA
+
+
+def period_of(year):
+    """
+    事件分组用的时间段：1800年以后按年代，更早的按世纪（古代事件稀疏，按年代分组几乎每组一个）
+
+    Returns:
+        (分组键, 显示名称)
+    """
+    if year >= 1800:
+        decade = year // 10 * 10
+        return f"decade:{decade}", f"{decade}年代"
+    if year < 0:
+        century = (-year - 1) // 100 + 1
+        return f"century:-{century}", f"公元前{century}世纪"
+    century = (year - 1) // 100 + 1
+    return f"century:{century}", f"{century}世纪"
+
+
+def title_era(title):
+    """按单元标题中的关键词判断时期，没有关键词或关键词属于不同时期时返回None"""
+    title = re.sub(r'\s+', '', title or '')
+    eras = {era for era, keywords in ERA_KEYWORDS if any(keyword in title for keyword in keywords)}
+    return eras.pop() if len(eras) == 1 else None
+
+
+def lesson_eras(lessons, units):
+    """
+    课文所属时期（按所在单元的标题）
+
+    Returns:
+        {课文ID: 时期名称}，只包含能确定时期的课文
+    """
+    unit_titles = {unit.get('id'): unit.get('title') for unit in units}
+    eras = {}
+    for lesson in lessons:
+        era = title_era(unit_titles.get(lesson.get('unit_id')))
+        if era:
+            eras[lesson.get('id')] = era
+    return eras
+
+
+def majority_era(eras, min_count=1):
+    """多数时期：数量不少于min_count且占比达到 ERA_MAJORITY 时返回该时期，否则返回None"""
+    eras = [era for era in eras if era]
+    if len(eras) < min_count:
+        return None
+    era, count = Counter(eras).most_common(1)[0]
+    return era if count >= ERA_MAJORITY * len(eras) else None
+
+
+def label_propagation(node_ids, weighted_edges, max_iter=GRAPH_LPA_MAX_ITERATIONS, seed=0):
+    """
+    标签传播社区发现（异步更新、带权重；平票时取编号最小的标签，相同输入得到相同结果）
+
+    Args:
+        node_ids: 节点ID列表
+        weighted_edges: [(节点ID, 节点ID, 权重), ...]，不存在的端点忽略，重复的边权重累加
+        max_iter: 最大迭代轮数（一轮内没有标签变化时提前结束）
+        seed: 节点更新顺序的随机种子
+
+    Returns:
+        {节点ID: 社区编号}，社区编号从0开始连续编号；孤立节点各自成为一个社区
+    """
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    neighbors = [{} for _ in node_ids]
+    for source, target, weight in weighted_edges:
+        i, j = index.get(source), index.get(target)
+        if i is None or j is None or i == j:
+            continue
+        neighbors[i][j] = neighbors[i].get(j, 0) + weight
+        neighbors[j][i] = neighbors[j].get(i, 0) + weight
+
+    labels = list(range(len(node_ids)))
+    order = list(range(len(node_ids)))
+    rng = random.Random(seed)
+    for _ in range(max_iter):
+        rng.shuffle(order)
+        changed = False
+        for i in order:
+            if not neighbors[i]:
+                continue
+            scores = {}
+            for j, weight in neighbors[i].items():
+                scores[labels[j]] = scores.get(labels[j], 0) + weight
+            best = max(scores.values())
+            candidates = [label for label, score in scores.items() if score == best]
+            if labels[i] not in candidates:
+                labels[i] = min(candidates)
+                changed = True
+        if not changed:
+            break
+
+    renumber = {}
+    return {node_id: renumber.setdefault(labels[i], len(renumber)) for i, node_id in enumerate(node_ids)}
+
+
+def cooccurrence_graph(events, figures):
+    """
+    语料共现图
+
+    - 同一课中的人物与事件相连（权重1），事件描述中提到人物名字时再加权（权重2，可跨课）
+    - 同一课中的事件按年份顺序串联（权重1），使没有人物的事件也能聚在一起
+
+    Returns:
+        (节点ID列表, [(节点ID, 节点ID, 权重), ...])；节点ID为 "event:<ID>" / "figure:<ID>"
+    """
+    node_ids = [f"event:{e.get('id')}" for e in events] + [f"figure:{f.get('id')}" for f in figures]
+    edges = []
+
+    events_by_lesson = {}
+    for event in events:
+        events_by_lesson.setdefault(event.get('lesson_id'), []).append(event)
+    for lesson_events in events_by_lesson.values():
+        lesson_events = sorted(lesson_events, key=lambda e: parse_year(e.get('year')) or 0)
+        for a, b in zip(lesson_events, lesson_events[1:]):
+            edges.append((f"event:{a.get('id')}", f"event:{b.get('id')}", 1))
+
+    for figure in figures:
+        figure_id = f"figure:{figure.get('id')}"
+        for event in events_by_lesson.get(figure.get('lesson_id'), []):
+            edges.append((figure_id, f"event:{event.get('id')}", 1))
+        name = figure.get('name', '')
+        if len(name) >= 2:
+            for event in events:
+                if name in event.get('description', ''):
+                    edges.append((figure_id, f"event:{event.get('id')}", 2))
+    return node_ids, edges
+
+
+def names_person(figure):
+    """人物记录的简介是否在说这个人（名字只以"林肯城""华盛顿会议"这类地名/事件出现时为否）"""
+    name = figure.get('name', '')
+    description = figure.get('description', '')
+    positions = [m.start() for m in re.finditer(re.escape(name), description)] if name else []
+    if not positions:
+        return True
+    return any(not description.startswith(NAME_COMPOUND_SUFFIXES, i + len(name)) for i in positions)
+
+
+def figure_eras(events, figures, lesson_era=None):
+    """
+    推断人物所属时期，同名人物（各教材中的多条记录）合并判断：
+    1. 所在课文的单元时期（lesson_era），各条记录的时期足够一致时采用
+    2. 没有单元时期时，取所在共现社区内事件年份的时期，社区内至少2个事件且时期足够一致时采用
+    3. 否则为 UNKNOWN_ERA
+
+    Args:
+        events: 事件列表
+        figures: 人物列表
+        lesson_era: {课文ID: 时期名称}（见 lesson_eras），为None时只用社区
+
+    Returns:
+        {人物ID: 时期名称}
+    """
+    lesson_era = lesson_era or {}
+    node_ids, edges = cooccurrence_graph(events, figures)
+    communities = label_propagation(node_ids, edges)
+
+    eras_by_community = {}
+    for event in events:
+        year = parse_year(event.get('year'))
+        if year is not None:
+            eras_by_community.setdefault(communities[f"event:{event.get('id')}"], []).append(era_of(year))
+
+    by_name = {}
+    for figure in figures:
+        by_name.setdefault(figure.get('name') or figure.get('id'), []).append(figure)
+
+    eras = {}
+    for records in by_name.values():
+        evidence = [figure for figure in records if names_person(figure)]
+        era = majority_era([lesson_era.get(figure.get('lesson_id')) for figure in evidence])
+        if era is None and not any(figure.get('lesson_id') in lesson_era for figure in evidence):
+            era = majority_era([
+                majority_era(eras_by_community.get(communities[f"figure:{figure.get('id')}"], []), min_count=2)
+                for figure in evidence
+            ])
+        for figure in records:
+            eras[figure.get('id')] = era or UNKNOWN_ERA
+    return eras
+
+
+def budget_graph(graph, groups, max_nodes=GRAPH_NODE_BUDGET, layout=GRAPH_LAYOUT_ENABLED):
+    """
+    按节点预算收拢图数据（network_to_data 的结果，可带 details）
+
+    节点数超过预算时，从成员最多的分组开始，把分组内的节点替换为一个聚类节点
+    （连到成员的边改连聚类节点，重复的边合并、分组内部的边去掉），直到节点数不超过预算。
+    结果写入 graph['clusters']：{聚类节点ID: {'nodes': 成员节点, 'edges': 聚类节点到成员的边和成员之间的边,
+    'external_edges': 成员与聚类外节点之间的原始边（展开后连回成员）}}；
+    没有收拢时为空，并按 layout 计算服务端布局（有聚类时由逐级展开组件对顶层节点布局）
+
+    Args:
+        graph: 图数据，原地修改
+        groups: {节点ID: (分组键, 分组名称)}，不在其中的节点始终显示
+        max_nodes: 节点预算
+        layout: 未收拢时是否计算服务端布局
+    """
+    members = {}
+    for node in graph['nodes']:
+        group = groups.get(node['id'])
+        if group:
+            members.setdefault(group, []).append(node)
+
+    excess = len(graph['nodes']) - max_nodes
+    collapse = {}
+    for group, nodes in sorted(members.items(), key=lambda item: -len(item[1])):
+        if excess <= 0 or len(nodes) < 2:
+            break
+        collapse[group] = nodes
+        excess -= len(nodes) - 1
+
+    graph['clusters'] = {}
+    if not collapse:
+        if layout:
+            layout_graph(graph)
+        return graph
+
+    cluster_of = {}
+    details = graph.setdefault('details', {})
+    for (key, name), nodes in collapse.items():
+        cluster_id = f"cluster:{key}"
+        for node in nodes:
+            cluster_of[node['id']] = cluster_id
+        color = nodes[0].get('color', "#999999")
+        graph['clusters'][cluster_id] = {
+            'node': {
+                "id": cluster_id,
+                "label": f"{name}\n({len(nodes)}项)",
+                "color": color,
+                "size": min(30 + 2 * len(nodes), 60),
+                "shape": "dot",
+                "title": f"{name}：{len(nodes)}项，点击展开",
+                "font": {"size": 16, "bold": True},
+            },
+            'nodes': nodes,
+            'edges': [{"from": cluster_id, "to": node['id'], "color": "#cccccc", "width": 1} for node in nodes],
+            'external_edges': [],
+        }
+        details[cluster_id] = node_detail("分组", name, color, [
+            ("📋 包含：", "、".join(str(node.get('label', node['id'])).strip() for node in nodes)),
+        ])
+
+    edges = []
+    seen = set()
+    for edge in graph['edges']:
+        source = cluster_of.get(edge['from'], edge['from'])
+        target = cluster_of.get(edge['to'], edge['to'])
+        if source == target:
+            if source in graph['clusters']:
+                graph['clusters'][source]['edges'].append(edge)
+            continue
+        for cluster_id in {source, target} & graph['clusters'].keys():
+            graph['clusters'][cluster_id]['external_edges'].append(edge)
+        if (source, target) in seen:
+            continue
+        seen.add((source, target))
+        edges.append(dict(edge, **{'from': source, 'to': target}))
+
+    graph['nodes'] = ([n for n in graph['nodes'] if n['id'] not in cluster_of]
+                      + [cluster['node'] for cluster in graph['clusters'].values()])
+    graph['edges'] = edges
+    return graph
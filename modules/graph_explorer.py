@@ -0,0 +1,150 @@
+"""
+知识图谱逐级展开浏览
+一次性把整本教材的课程、事件、人物都画出来，数据量大、首屏慢；
+这里先只显示顶层节点，点击节点时再取它的下一级节点追加到已有网络中（再次点击收起）。
+
+前端是 lib/index.html 中的 vis-network 组件（见 modules/graph_render.py）：同一张图的后续渲染只增删差异节点，不重建网络，
+因此每次渲染的数据量和绘制时间只与当前可见的节点数有关，与整本教材的规模无关
+"""
+
+import streamlit as st
+
+from modules.graph_layout import apply_layout
+from modules.graph_render import vis_graph, show_graph
+
+# 服务端已算好顶层坐标，展开的节点由前端放在父节点周围，全程不开物理引擎
+EXPLORER_OPTIONS = {
+    "physics": {"enabled": False},
+    "nodes": {"font": {"face": "Microsoft YaHei, SimHei, sans-serif"}},
+    "edges": {"smooth": False},
+    "interaction": {"hover": True, "keyboard": True, "dragNodes": True, "dragView": True, "zoomView": True},
+}
+
+
+def _public(node):
+    """去掉以下划线开头的服务端字段（如 _detail），不下发到前端"""
+    return {k: v for k, v in node.items() if not k.startswith('_')}
+
+
+class GraphExplorer:
+    """
+    逐级展开的图谱（展开状态保存在 st.session_state[state_key]）
+
+    Args:
+        state_key: session_state 键
+        graph_id: 图谱标识（如 "textbook:<教材ID>"），变化时展开状态清空
+        roots: 无参函数，返回顶层 (nodes, edges)
+        expand: expand(node_id) 返回该节点的下一级 (nodes, edges)，叶子节点返回空列表
+        details: {节点ID: node_detail(...)}，点击节点时在图上显示详情卡片（见 modules/graph_render.py）
+        highlight: 点击有详情的节点时高亮相邻节点和边
+    """
+
+    def __init__(self, state_key, graph_id, roots, expand, details=None, highlight=False):
+        self.state_key = state_key
+        self.graph_id = graph_id
+        self.roots = roots
+        self.expand = expand
+        self.details = details
+        self.highlight = highlight
+
+    def _state(self):
+        state = st.session_state.get(self.state_key)
+        if state is None or state['graph_id'] != self.graph_id:
+            state = {'graph_id': self.graph_id, 'expanded': [], 'selected': None, 'last_event': None}
+            st.session_state[self.state_key] = state
+        return state
+
+    def visible(self, expanded):
+        """
+        当前可见的节点和边：顶层节点 + 按展开顺序追加各展开节点的下一级
+
+        顶层节点带服务端布局坐标；父节点已被收起的展开记录跳过；端点不可见的边不下发
+        """
+        root_nodes, root_edges = self.roots()
+        nodes = [dict(n) for n in root_nodes]
+        apply_layout(nodes, root_edges)
+        edges = list(root_edges)
+        seen = {n['id'] for n in nodes}
+        # 同一对节点间关系不同的边都保留，只去掉重复下发的同一条边
+        edge_ids = {(e['from'], e['to'], e.get('label')) for e in edges}
+
+        for node_id in expanded:
+            if node_id not in seen:
+                continue
+            child_nodes, child_edges = self.expand(node_id)
+            for node in child_nodes:
+                if node['id'] not in seen:
+                    seen.add(node['id'])
+                    nodes.append(dict(node, parent=node_id))
+            for edge in child_edges:
+                key = (edge['from'], edge['to'], edge.get('label'))
+                if key not in edge_ids:
+                    edge_ids.add(key)
+                    edges.append(edge)
+        return nodes, [e for e in edges if e['from'] in seen and e['to'] in seen]
+
+    def render(self, height=800):
+        """
+        显示图谱并处理节点点击（未展开的展开，已展开的收起）
+
+        Returns:
+            最近点击的节点（含 _detail 等服务端字段），没有时返回None
+        """
+        state = self._state()
+        nodes, edges = self.visible(state['expanded'])
+        event = vis_graph(
+            [_public(n) for n in nodes],
+            edges,
+            self.graph_id,
+            options=EXPLORER_OPTIONS,
+            details=self.details,
+            highlight=self.highlight,
+            emit_clicks=True,
+            height=height,
+            key=f"{self.state_key}_component",
+        )
+
+        if event and event != state['last_event'] and event.get('graph_id') == self.graph_id:
+            state['last_event'] = event
+            node_id = event['node']
+            if node_id in state['expanded']:
+                state['expanded'].remove(node_id)
+            else:
+                state['expanded'].append(node_id)
+            state['selected'] = node_id
+            # 组件已按旧的可见节点渲染，重跑一次把新节点发给前端
+            st.rerun()
+
+        return next((n for n in nodes if n['id'] == state['selected']), None)
+
+    def reset(self):
+        """收起全部节点"""
+        st.session_state.pop(self.state_key, None)
+
+
+def show_clustered_graph(graph, state_key, height=800):
+    """
+    显示经过节点预算收拢的图数据（见 modules/graph_clustering.py 的 budget_graph）
+
+    没有聚类节点时直接显示；有聚类节点时用逐级展开组件显示，点击聚类节点展开其成员
+    """
+    clusters = graph.get('clusters')
+    if not clusters:
+        return show_graph(graph, height=height, key=state_key)
+
+    def expand(node_id):
+        cluster = clusters.get(node_id)
+        if not cluster:
+            return [], []
+        # 收拢时改连到聚类节点的边，展开后按原始端点连回成员（另一端在未展开的聚类中时不显示）
+        return cluster['nodes'], cluster['edges'] + cluster.get('external_edges', [])
+
+    explorer = GraphExplorer(
+        state_key,
+        graph['graph_id'],
+        lambda: (graph['nodes'], graph['edges']),
+        expand,
+        details=graph.get('details'),
+        highlight=graph.get('highlight', False),
+    )
+    return explorer.render(height=height)
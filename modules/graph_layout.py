@@ -0,0 +1,231 @@
+"""
+知识图谱服务端布局模块
+原来每个图谱都开着 Barnes-Hut 物理引擎（稳定化迭代200~300次、avoidOverlap），
+每个浏览器打开时都要重新模拟一遍，大的教材图谱在学生笔记本/Chromebook上要卡好几秒。
+这里用 NumPy 在服务端做一次力导向布局（Fruchterman-Reingold + 向心力 + 去重叠），
+把坐标写进节点、关闭物理引擎，浏览器直接按坐标绘制。
+
+力导向每轮迭代要计算所有节点对，耗时随节点数平方增长（未限制时300节点约2秒、600节点约9秒）。
+因此计算量（迭代次数 × 节点数²）受 GRAPH_LAYOUT_WORK_BUDGET 限制，节点多时自动减少迭代次数；
+节点数超过 GRAPH_LAYOUT_MAX_NODES 时改用螺旋布局（度数高的节点在中心）。
+大图谱应先经 modules/graph_clustering.py 的 budget_graph 收拢再布局。
+
+布局结果按图结构（节点、边、节点大小）的指纹缓存；
+最终的图数据又由 modules/graph_render.py 缓存，同一图谱只计算一次
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config.settings import (
+    GRAPH_LAYOUT_ITERATIONS,
+    GRAPH_LAYOUT_SPRING_LENGTH,
+    GRAPH_LAYOUT_CACHE_SIZE,
+    GRAPH_LAYOUT_WORK_BUDGET,
+    GRAPH_LAYOUT_MAX_NODES,
+)
+
+# 未设置size的节点按此半径计算去重叠（vis-network默认25）
+DEFAULT_NODE_SIZE = 25
+# 节点之间至少保留的空隙（像素）
+NODE_PADDING = 20
+# 向心力系数：把不连通的子图拉在一起，与斥力平衡后整体半径约为 spring_length·√(n/GRAVITY)
+GRAVITY = 1.0
+# 计算量受限时至少保留的迭代次数 / 去重叠轮数
+MIN_ITERATIONS = 30
+MIN_OVERLAP_ROUNDS = 5
+# 黄金角（弧度），螺旋布局相邻节点的角度间隔
+GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+
+
+def structure_fingerprint(nodes, edges):
+    """图结构指纹：节点ID和大小、边的端点"""
+    raw = json.dumps(
+        {
+            'nodes': [[str(n['id']), n.get('size', DEFAULT_NODE_SIZE)] for n in nodes],
+            'edges': [[str(e['from']), str(e['to'])] for e in edges],
+        },
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def force_directed_layout(node_ids, edge_pairs, sizes=None, iterations=GRAPH_LAYOUT_ITERATIONS,
+                          spring_length=GRAPH_LAYOUT_SPRING_LENGTH, seed=0,
+                          work_budget=GRAPH_LAYOUT_WORK_BUDGET, max_nodes=GRAPH_LAYOUT_MAX_NODES):
+    """
+    力导向布局（向量化的 Fruchterman-Reingold）
+
+    Args:
+        node_ids: 节点ID列表
+        edge_pairs: [(起点ID, 终点ID), ...]，不存在的端点忽略
+        sizes: 各节点半径（像素），用于最后的去重叠
+        iterations: 迭代次数（上限，计算量超过 work_budget 时减少，至少 MIN_ITERATIONS）
+        spring_length: 理想边长（像素）
+        seed: 初始位置的随机种子（相同输入得到相同布局）
+        work_budget: 计算量上限（迭代次数 × 节点数²）
+        max_nodes: 节点数超过此值时改用 spiral_layout
+
+    Returns:
+        {节点ID: (x, y)}，以(0, 0)为中心
+    """
+    n = len(node_ids)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {node_ids[0]: (0.0, 0.0)}
+    if n > max_nodes:
+        return spiral_layout(node_ids, edge_pairs, sizes)
+
+    iterations = min(iterations, max(MIN_ITERATIONS, work_budget // (n * n)))
+
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    adjacency = np.zeros((n, n))
+    for source, target in edge_pairs:
+        i, j = index.get(source), index.get(target)
+        if i is None or j is None or i == j:
+            continue
+        adjacency[i, j] = adjacency[j, i] = 1.0
+
+    k = float(spring_length)
+    rng = np.random.default_rng(seed)
+    pos = (rng.random((n, 2)) - 0.5) * k * np.sqrt(n)
+    temperature = k * np.sqrt(n) / 5
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distance = np.linalg.norm(delta, axis=-1)
+        np.fill_diagonal(distance, 1.0)
+        distance = np.maximum(distance, 0.01)
+        # 斥力 k²/d（所有节点对），引力 d²/k（相连节点对）
+        force = k * k / distance - adjacency * distance * distance / k
+        np.fill_diagonal(force, 0.0)
+        displacement = np.einsum('ij,ijk->ik', force / distance, delta)
+        displacement -= GRAVITY * pos
+        length = np.maximum(np.linalg.norm(displacement, axis=-1), 0.01)
+        pos += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature -= cooling
+
+    if sizes is not None:
+        rounds = min(50, max(MIN_OVERLAP_ROUNDS, work_budget // (n * n)))
+        pos = _remove_overlaps(pos, np.asarray(sizes, dtype=float), rounds)
+
+    pos -= pos.mean(axis=0)
+    return {node_id: (float(pos[i, 0]), float(pos[i, 1])) for i, node_id in enumerate(node_ids)}
+
+
+def spiral_layout(node_ids, edge_pairs, sizes=None):
+    """
+    螺旋布局（向日葵排列，O(节点数)）：度数高的节点在中心，按黄金角向外排开
+
+    参数和返回值同 force_directed_layout；相邻节点间距不小于最大节点直径加空隙，不会重叠
+    """
+    degree = dict.fromkeys(node_ids, 0)
+    for source, target in edge_pairs:
+        if source in degree and target in degree and source != target:
+            degree[source] += 1
+            degree[target] += 1
+    order = sorted(range(len(node_ids)), key=lambda i: -degree[node_ids[i]])
+
+    radius = max(sizes) if sizes else DEFAULT_NODE_SIZE
+    spacing = 2 * radius + NODE_PADDING
+    rank = np.arange(len(node_ids))
+    r = spacing * np.sqrt(rank + 0.5)
+    theta = rank * GOLDEN_ANGLE
+    return {
+        node_ids[i]: (float(r[k] * np.cos(theta[k])), float(r[k] * np.sin(theta[k])))
+        for k, i in enumerate(order)
+    }
+
+
+def _remove_overlaps(pos, radii, rounds=50):
+    """把距离小于半径之和（加空隙）的节点对各自推开一半"""
+    min_distance = radii[:, None] + radii[None, :] + NODE_PADDING
+    for _ in range(rounds):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distance = np.linalg.norm(delta, axis=-1)
+        overlap = min_distance - distance
+        np.fill_diagonal(overlap, 0.0)
+        overlap = np.maximum(overlap, 0.0)
+        if not overlap.any():
+            break
+        distance = np.maximum(distance, 0.01)
+        pos = pos + 0.5 * np.einsum('ij,ijk->ik', overlap / distance, delta)
+    return pos
+
+
+class LayoutCache:
+    """布局坐标的LRU缓存（按图结构指纹）"""
+
+    def __init__(self, max_size=GRAPH_LAYOUT_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_or_compute(self, nodes, edges):
+        key = structure_fingerprint(nodes, edges)
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is not None:
+                self._entries.move_to_end(key)
+                return positions
+
+        positions = force_directed_layout(
+            [n['id'] for n in nodes],
+            [(e['from'], e['to']) for e in edges],
+            sizes=[n.get('size', DEFAULT_NODE_SIZE) for n in nodes],
+            seed=int(key[:8], 16),
+        )
+        with self._lock:
+            self._entries[key] = positions
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return positions
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_layout_cache = LayoutCache()
+
+
+def apply_layout(nodes, edges):
+    """
+    计算布局并把坐标写入节点（vis-network 的节点/边字典）
+
+    Args:
+        nodes: [{'id':..., 'size':...}, ...]，原地加上 x、y
+        edges: [{'from':..., 'to':...}, ...]
+    """
+    positions = _layout_cache.get_or_compute(nodes, edges)
+    for node in nodes:
+        node['x'], node['y'] = positions[node['id']]
+    return nodes
+
+
+def layout_network(net):
+    """给pyvis图谱写入服务端布局坐标并关闭物理引擎"""
+    apply_layout(net.nodes, net.edges)
+    disable_physics(net)
+    return net
+
+
+def layout_graph(graph):
+    """给 network_to_data 取出的图数据写入服务端布局坐标并关闭物理引擎"""
+    apply_layout(graph['nodes'], graph['edges'])
+    graph['options'].setdefault('physics', {})['enabled'] = False
+    return graph
+
+
+def disable_physics(net):
+    """关闭pyvis图谱的物理引擎（兼容 set_options 后 options 变为dict的情况）"""
+    if isinstance(net.options, dict):
+        net.options.setdefault('physics', {})['enabled'] = False
+    else:
+        net.toggle_physics(False)
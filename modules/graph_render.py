@@ -0,0 +1,210 @@
+"""
+知识图谱渲染模块
+图谱统一通过 lib/index.html 中的 vis-network 前端组件显示：
+- vis-network 的JS/CSS作为组件静态文件从 lib/ 加载，浏览器缓存后不再随每次渲染下发，
+  每次渲染只发送图数据（节点、边、选项、节点详情），不再把整页HTML（含几百KB的库代码）塞进 components.html
+- pyvis 只用来组织节点和边，经服务端布局（见 modules/graph_layout.py）后取出数据
+- 图数据按视图参数（视图, 教材, 单元, 课程, 专题）缓存：同一图谱再次显示时既不重建图、也不重算布局
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+from config.settings import GRAPH_CACHE_SIZE, GRAPH_LAYOUT_ENABLED
+from modules.graph_layout import layout_network
+
+_FRONTEND_DIR = Path(__file__).parent.parent / "lib"
+_vis_graph = components.declare_component("vis_graph", path=str(_FRONTEND_DIR))
+
+
+def vis_graph(nodes, edges, graph_id, options=None, details=None, highlight=False, emit_clicks=False,
+              background="#ffffff", height=800, key=None):
+    """
+    显示vis-network图谱组件
+
+    Args:
+        nodes, edges: vis-network 的节点/边字典；逐级展开出的节点带 parent 字段，前端据此放置
+        graph_id: 图谱标识，变化时前端重建网络，否则只增删差异部分
+        options: vis-network 选项
+        details: {节点ID: node_detail(...)}，点击节点时显示详情卡片
+        highlight: 点击有详情的节点时高亮相邻节点和边
+        emit_clicks: 点击节点时回传点击事件（会触发页面重跑）
+        background: 背景色
+        height: 高度（像素）
+        key: 组件key
+
+    Returns:
+        最近一次节点点击 {'node': 节点ID, 'graph_id':..., 'seq':...}；未开启 emit_clicks 或没有点击时为None
+    """
+    return _vis_graph(
+        nodes=nodes,
+        edges=edges,
+        graph_id=graph_id,
+        options=options or {},
+        details=details or {},
+        highlight=highlight,
+        emit_clicks=emit_clicks,
+        background=background,
+        height=height,
+        key=key,
+        default=None,
+    )
+
+
+def show_graph(graph, height=800, key=None):
+    """显示 network_to_data 生成（并补充了 details / highlight）的图数据"""
+    return vis_graph(
+        graph['nodes'],
+        graph['edges'],
+        graph.get('graph_id', ''),
+        options=graph.get('options'),
+        details=graph.get('details'),
+        highlight=graph.get('highlight', False),
+        background=graph.get('background', "#ffffff"),
+        height=height,
+        key=key,
+    )
+
+
+def network_to_data(net, layout=GRAPH_LAYOUT_ENABLED):
+    """
+    取出pyvis图谱的节点、边和选项
+
+    Args:
+        layout: 是否先在服务端计算布局（写入坐标并关闭浏览器端物理模拟），见 modules/graph_layout.py
+
+    Returns:
+        {'nodes': [...], 'edges': [...], 'options': {...}, 'background': 背景色}
+    """
+    if layout:
+        layout_network(net)
+    nodes, edges, _, _, _, options = net.get_network_data()
+    return {
+        'nodes': nodes,
+        'edges': edges,
+        'options': json.loads(options) if isinstance(options, str) else options,
+        'background': getattr(net, 'bgcolor', "#ffffff"),
+    }
+
+
+def node_detail(node_type, title, color=None, rows=()):
+    """
+    节点详情卡片数据（空内容的行不显示）
+
+    Args:
+        node_type: 类型标签（如 "课程"）
+        title: 标题
+        color: 类型标签颜色
+        rows: [(标签, 内容), ...]
+    """
+    return {
+        'type': node_type,
+        'title': title,
+        'color': color,
+        'rows': [[label, value] for label, value in rows if value not in (None, '')],
+    }
+
+
+def content_fingerprint(data):
+    """数据内容指纹（用于以动态数据为输入的图谱缓存键）"""
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def make_graph_key(view, book_id=None, unit_id=None, lesson_id=None, topic=None, **options):
+    """
+    图谱缓存键
+
+    Args:
+        view: 视图名称（如 "textbook"、"topic"）
+        book_id, unit_id, lesson_id, topic: 图谱范围
+        **options: 其他影响图谱内容的参数（如关系深度）
+    """
+    return (view, book_id, unit_id, lesson_id, topic, tuple(sorted(options.items())))
+
+
+def graph_id_of(key):
+    """由缓存键得到前端组件的 graph_id"""
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+
+
+class GraphCache:
+    """图数据的LRU缓存（进程内共享，条目可设置过期时间）"""
+
+    def __init__(self, max_size=GRAPH_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (图数据, 过期时间或None)
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.miss_count += 1
+                return None
+            graph, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                del self._entries[key]
+                self.miss_count += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hit_count += 1
+            return graph
+
+    def put(self, key, graph, ttl=None):
+        with self._lock:
+            self._entries[key] = (graph, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, key, build, ttl=None):
+        """
+        读取缓存的图数据，没有时调用build()生成并缓存
+
+        Args:
+            key: make_graph_key 生成的键
+            build: 生成图数据的函数（无参），返回 network_to_data 的结果（可补充 details / highlight），
+                   没有可显示的内容时返回None
+            ttl: 过期时间（秒），None表示不过期（基于静态数据的图谱）
+        """
+        graph = self.get(key)
+        if graph is None:
+            graph = build()
+            if graph:
+                graph['graph_id'] = graph_id_of(key)
+                self.put(key, graph, ttl)
+        return graph
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hit_count,
+                'misses': self.miss_count,
+            }
+
+
+_graph_cache = GraphCache()
+
+
+def get_graph_cache():
+    """获取进程级共享的图数据缓存"""
+    return _graph_cache
+
+
+def get_cached_graph(key, build, ttl=None):
+    """按键读取或生成图数据（见 GraphCache.get_or_build）"""
+    return _graph_cache.get_or_build(key, build, ttl)
@@ -4,9 +4,9 @@
 """
 
 import streamlit as st
-import streamlit.components.v1 as components
 from pyvis.network import Network
 from config.settings import *
+from modules.graph_render import network_to_data, make_graph_key, get_cached_graph, show_graph
 
 def check_neo4j_available():
     """检查Neo4j是否可用"""
@@ -509,14 +509,8 @@ def create_knowledge_graph_viz(module_id=None):
                                width=2.5,
                                smooth=False)
     
-    # 保存并返回HTML
-    try:
-        net.save_graph("temp_graph.html")
-        with open("temp_graph.html", 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        return html_content
-    except Exception:
-        return "<div style='padding:20px;text-align:center;'>知识图谱生成中...</div>"
+    # 只取图数据，由前端组件绘制
+    return network_to_data(net)
 
 def render_knowledge_graph():
     """渲染知识图谱页面"""
@@ -563,8 +557,18 @@ def render_knowledge_graph():
     
     # 生成并显示图谱
     with st.spinner("生成知识图谱中..."):
-        html_content = create_knowledge_graph_viz(module_id)
-        components.html(html_content, height=1200)
+        try:
+            graph = get_cached_graph(
+                make_graph_key("gfz_modules", book_id=module_id),
+                lambda: create_knowledge_graph_viz(module_id),
+                ttl=GRAPH_CACHE_TTL
+            )
+        except Exception:
+            graph = None
+    if graph:
+        show_graph(graph, height=1100)
+    else:
+        st.info("知识图谱生成中...")
     
     # 学习进度标记
     st.sidebar.title("📊 学习进度")
@@ -6,10 +6,17 @@ import streamlit as st
 import json
 from pathlib import Path
 from pyvis.network import Network
-import streamlit.components.v1 as components
-import tempfile
-import os
 import re
+from modules.graph_render import network_to_data, node_detail, make_graph_key, get_cached_graph
+from modules.graph_explorer import GraphExplorer, show_clustered_graph
+from modules.graph_clustering import budget_graph, figure_eras, lesson_eras, parse_year, period_of, UNKNOWN_ERA
+
+# 专题图谱的类别：(search_by_topic结果键, 显示名称, 颜色)
+TOPIC_CATEGORIES = [
+    ('lessons', '📚 相关课文', '#4ECDC4'),
+    ('events', '⚡ 相关事件', '#FFA07A'),
+    ('figures', '👤 相关人物', '#96CEB4'),
+]
 
 
 def extract_event_name(description, year=None):
@@ -117,6 +124,12 @@ class KnowledgeGraphBrowser:
             self.events = []
             self.figures = []
     
+    def get_figure_eras(self):
+        """人物所属时期（优先按单元时期，其次按全语料共现图社区，见 modules/graph_clustering.py），首次调用时计算"""
+        if getattr(self, '_figure_eras', None) is None:
+            self._figure_eras = figure_eras(self.events, self.figures, lesson_eras(self.lessons, self.units))
+        return self._figure_eras
+    
     def _load_json(self, filename):
         """加载JSON文件"""
         file_path = self.data_dir / filename
@@ -512,6 +525,250 @@ class KnowledgeGraphBrowser:
         """)
         
         return net
+    
+    # ---------- 逐级展开浏览（见 modules/graph_explorer.py） ----------
+    
+    def explore_textbook_roots(self, book_id):
+        """逐级展开的顶层：教科书 + 各单元"""
+        book = next((b for b in self.get_books() if b['id'] == book_id), None)
+        if not book:
+            return [], []
+        root_id = f"book:{book_id}"
+        nodes = [{
+            "id": root_id,
+            "label": f"📚 {book['name'][:18]}",
+            "color": "#FF6B6B",
+            "size": 60,
+            "title": f"教科书：{book['name']}",
+            "font": {"size": 26, "bold": True},
+            "_detail": {"type": "教科书", "title": book['name']}
+        }]
+        edges = []
+        for unit in self.get_units_by_book(book_id):
+            unit_node_id = f"unit:{unit.get('id')}"
+            nodes.append({
+                "id": unit_node_id,
+                "label": f"📂 {unit.get('title', '')[:15]}",
+                "color": "#4ECDC4",
+                "size": 42,
+                "title": f"单元：{unit.get('title')}\n点击展开课程",
+                "font": {"size": 18, "bold": True},
+                "_detail": {"type": "单元", "title": unit.get('title', ''), "description": unit.get('description', '')}
+            })
+            edges.append({"from": root_id, "to": unit_node_id, "color": "#4ECDC4", "width": 3})
+        return nodes, edges
+    
+    def explore_topic_roots(self, topic_name):
+        """逐级展开的顶层：专题 + 类别（课文/事件/人物）"""
+        results = self.search_by_topic(topic_name)
+        root_id = f"topic:{topic_name}"
+        nodes = [{
+            "id": root_id,
+            "label": f"🎯 {topic_name}",
+            "color": "#FF6B6B",
+            "size": 60,
+            "font": {"size": 26, "bold": True},
+            "_detail": {"type": "专题", "title": topic_name,
+                        "description": self.topics.get(topic_name, {}).get('description', '')}
+        }]
+        edges = []
+        for cat_id, cat_label, cat_color in TOPIC_CATEGORIES:
+            if not results[cat_id]:
+                continue
+            cat_node_id = f"cat:{topic_name}:{cat_id}"
+            nodes.append({
+                "id": cat_node_id,
+                "label": f"{cat_label}\n({len(results[cat_id])}项)",
+                "color": cat_color,
+                "size": 45,
+                "title": "点击展开",
+                "font": {"size": 18, "bold": True},
+                "_detail": {"type": "类别", "title": f"{topic_name} · {cat_label}"}
+            })
+            edges.append({"from": root_id, "to": cat_node_id, "color": "#999999", "width": 2, "arrows": "to"})
+        return nodes, edges
+    
+    def expand_explore_node(self, node_id):
+        """
+        取节点的下一级 (nodes, edges)
+        
+        单元 → 课程；课程 → 事件（最多8个）和人物（最多5个）；专题类别 → 该类别的知识点；事件、人物为叶子节点
+        """
+        kind, _, rest = node_id.partition(':')
+        if kind == 'unit':
+            return self._explore_children(node_id, [self._lesson_node(l) for l in self.get_lessons_by_unit(rest)])
+        if kind == 'lesson':
+            events = self.get_events_by_lesson(rest)[:8]
+            figures = self.get_figures_by_lesson(rest)[:5]
+            children = [self._event_node(f"event:{rest}:{i}", e) for i, e in enumerate(events)]
+            children += [self._figure_node(f"figure:{rest}:{i}", f) for i, f in enumerate(figures)]
+            return self._explore_children(node_id, children)
+        if kind == 'cat':
+            topic_name, _, cat_id = rest.rpartition(':')
+            items = self.search_by_topic(topic_name).get(cat_id, [])
+            if cat_id == 'lessons':
+                children = [self._lesson_node(item) for item in items]
+            elif cat_id == 'events':
+                children = [self._event_node(f"event:{item.get('id', i)}", item) for i, item in enumerate(items)]
+            else:
+                children = [self._figure_node(f"figure:{item.get('id', i)}", item) for i, item in enumerate(items)]
+            return self._explore_children(node_id, children)
+        return [], []
+    
+    @staticmethod
+    def _explore_children(parent_id, children):
+        edges = [{"from": parent_id, "to": child['id'], "color": "#cccccc", "width": 1.5} for child in children]
+        return children, edges
+    
+    @staticmethod
+    def _lesson_node(lesson):
+        return {
+            "id": f"lesson:{lesson.get('id')}",
+            "label": f"📖 {lesson.get('title', '')[:15]}",
+            "color": "#45B7D1",
+            "size": 32,
+            "title": f"课程：{lesson.get('title')}\n点击展开事件和人物",
+            "font": {"size": 15},
+            "_detail": {"type": "课程", "title": lesson.get('title', ''), "book_name": lesson.get('book_name', ''),
+                        "content": lesson.get('content', '')}
+        }
+    
+    @staticmethod
+    def _event_node(node_id, event):
+        event_desc = event.get('description', '')
+        event_year = event.get('year', '')
+        event_name = extract_event_name(event_desc, event_year)
+        return {
+            "id": node_id,
+            "label": f"⚡ {event_name[:15]}",
+            "color": "#FFA07A",
+            "size": 24,
+            "title": f"事件：{event_name}\n年份：{event_year}年",
+            "font": {"size": 13},
+            "_detail": {"type": "事件", "title": event_name, "year": event_year, "description": event_desc}
+        }
+    
+    @staticmethod
+    def _figure_node(node_id, figure):
+        return {
+            "id": node_id,
+            "label": f"👤 {figure.get('name', '')[:8]}",
+            "color": "#96CEB4",
+            "size": 22,
+            "title": f"人物：{figure.get('name')}",
+            "font": {"size": 12},
+            "_detail": {"type": "人物", "title": figure.get('name', ''), "description": figure.get('description', '')}
+        }
+
+
+# 节点详情卡片的类型颜色
+DETAIL_COLORS = {"课程": "#4ECDC4", "事件": "#FFA07A", "人物": "#96CEB4"}
+
+
+def _lesson_detail(lesson, title_prefix=""):
+    return node_detail("课程", f"{title_prefix}{lesson.get('title', '') or '课程'}", DETAIL_COLORS["课程"], [
+        ("📚 教材：", lesson.get('book_name', '')),
+        ("📝 内容：", lesson.get('content', '')),
+    ])
+
+
+def _event_detail(event):
+    event_desc = event.get('description', '')
+    event_year = event.get('year', '未知')
+    event_name = extract_event_name(event_desc, event_year)
+    year_text = str(event_year) if event_year else ''
+    if year_text and '年' not in year_text:
+        year_text += '年'
+    return node_detail("事件", f"⚡ {event_name}", DETAIL_COLORS["事件"], [
+        ("⏰ 时间：", year_text),
+        ("💡 描述：", event_desc),
+    ])
+
+
+def _figure_detail(figure):
+    return node_detail("人物", f"👤 {figure.get('name', '') or '历史人物'}", DETAIL_COLORS["人物"], [
+        ("📝 简介：", figure.get('description', '')),
+    ])
+
+
+def _event_group(event, lesson_titles):
+    """事件分组：有年份的按年代/世纪，否则按所属课程"""
+    year = parse_year(event.get('year'))
+    if year is not None:
+        key, name = period_of(year)
+        return key, f"⚡ {name}事件"
+    lesson_id = event.get('lesson_id')
+    return f"lesson:{lesson_id}", f"⚡ {lesson_titles.get(lesson_id, '')[:12]}·事件"
+
+
+def _figure_group(figure, eras):
+    era = eras.get(figure.get('id'), UNKNOWN_ERA)
+    return f"era:{era}", f"👤 {era}人物"
+
+
+def textbook_cluster_groups(browser, unit_id):
+    """按课本模式图谱的节点分组：事件按课程，人物按时期"""
+    eras = browser.get_figure_eras()
+    groups = {}
+    for lesson in browser.get_lessons_by_unit(unit_id):
+        lesson_id = lesson.get('id')
+        for i, _ in enumerate(browser.get_events_by_lesson(lesson_id)[:8]):
+            groups[f"event_{lesson_id}_{i}"] = (f"lesson:{lesson_id}", f"⚡ {lesson.get('title', '')[:12]}·事件")
+        for i, figure in enumerate(browser.get_figures_by_lesson(lesson_id)[:5]):
+            groups[f"figure_{lesson_id}_{i}"] = _figure_group(figure, eras)
+    return groups
+
+
+def topic_cluster_groups(browser, topic_name):
+    """按专题模式图谱的节点分组：课文按教材，事件按年代（无年份时按课程），人物按时期"""
+    results = browser.search_by_topic(topic_name)
+    lesson_titles = {l.get('id'): l.get('title', '') for l in browser.lessons}
+    eras = browser.get_figure_eras()
+    groups = {}
+    for i, lesson in enumerate(results['lessons']):
+        groups[f"lessons_{i}"] = (f"book:{lesson.get('book_id')}", f"📚 {lesson.get('book_name', '')}")
+    for i, event in enumerate(results['events']):
+        groups[f"events_{i}"] = _event_group(event, lesson_titles)
+    for i, figure in enumerate(results['figures']):
+        groups[f"figures_{i}"] = _figure_group(figure, eras)
+    return groups
+
+
+def build_textbook_graph(browser, book_id, unit_id):
+    """生成按课本模式的图谱数据（节点、边、选项和节点详情卡片），超出节点预算时收拢为聚类节点"""
+    net = browser.create_textbook_graph(book_id, unit_id)
+    graph = network_to_data(net, layout=False)
+    
+    details = {}
+    for lesson in browser.get_lessons_by_unit(unit_id):
+        details[f"lesson_{lesson.get('id')}"] = _lesson_detail(lesson)
+        for i, event in enumerate(browser.get_events_by_lesson(lesson.get('id'))[:8]):
+            details[f"event_{lesson.get('id')}_{i}"] = _event_detail(event)
+        for i, figure in enumerate(browser.get_figures_by_lesson(lesson.get('id'))[:5]):
+            details[f"figure_{lesson.get('id')}_{i}"] = _figure_detail(figure)
+    
+    graph['details'] = details
+    graph['highlight'] = True
+    return budget_graph(graph, textbook_cluster_groups(browser, unit_id))
+
+
+def build_topic_graph(browser, topic_name):
+    """生成按专题模式的图谱数据（节点、边、选项和节点详情卡片），超出节点预算时收拢为聚类节点"""
+    net = browser.create_topic_graph(topic_name)
+    graph = network_to_data(net, layout=False)
+    results = browser.search_by_topic(topic_name)
+    
+    details = {}
+    for i, lesson in enumerate(results['lessons']):
+        details[f"lessons_{i}"] = _lesson_detail(lesson, "📖 ")
+    for i, event in enumerate(results['events']):
+        details[f"events_{i}"] = _event_detail(event)
+    for i, figure in enumerate(results['figures']):
+        details[f"figures_{i}"] = _figure_detail(figure)
+    
+    graph['details'] = details
+    graph['highlight'] = True
+    return budget_graph(graph, topic_cluster_groups(browser, topic_name))
 
 
 def render_knowledge_graph():
@@ -543,6 +800,38 @@ def render_knowledge_graph():
     render_topic_mode(browser)
 
 
+def render_explorer(explorer):
+    """显示逐级展开图谱和选中节点的详情"""
+    st.caption("💡 点击节点展开下一级，再次点击收起 • 拖动节点调整位置 • 滚轮缩放")
+    if st.button("↺ 全部收起", key=f"{explorer.state_key}_reset"):
+        explorer.reset()
+    
+    selected = explorer.render(height=750)
+    detail = (selected or {}).get('_detail')
+    if not detail:
+        return
+    
+    st.markdown(f"#### {detail['type']}：{detail.get('title', '')}")
+    if detail.get('book_name'):
+        st.markdown(f"**📚 教材：** {detail['book_name']}")
+    if detail.get('year'):
+        year_text = str(detail['year'])
+        st.markdown(f"**⏰ 时间：** {year_text if '年' in year_text else year_text + '年'}")
+    if detail.get('description'):
+        st.markdown(f"**💡 描述：** {detail['description']}")
+    if detail.get('content'):
+        with st.expander("📝 课文内容"):
+            st.write(detail['content'])
+
+
+def graph_caption(graph):
+    """完整图谱的操作提示（有聚类节点时提示点击展开）"""
+    caption = "💡 拖动节点调整位置 • 滚轮缩放 • **点击节点查看详细信息卡片**"
+    if graph.get('clusters'):
+        caption += f" • 节点较多，已收拢为 {len(graph['clusters'])} 个分组，点击分组节点展开/收起"
+    return caption
+
+
 def render_textbook_mode(browser):
     """渲染按课本顺序模式"""
     st.markdown("### 📚 按课本顺序浏览")
@@ -561,6 +850,23 @@ def render_textbook_mode(browser):
     if not selected_book:
         return
     
+    view_mode = st.radio(
+        "显示方式",
+        ["逐级展开", "完整单元图谱"],
+        horizontal=True,
+        key="kg_textbook_view_mode",
+        help="逐级展开：先显示单元，点击节点再加载下一级；完整单元图谱：一次显示单元内全部课程、事件和人物"
+    )
+    if view_mode == "逐级展开":
+        explorer = GraphExplorer(
+            "kg_textbook_explorer",
+            f"textbook:{selected_book['id']}",
+            lambda: browser.explore_textbook_roots(selected_book['id']),
+            browser.expand_explore_node
+        )
+        render_explorer(explorer)
+        return
+    
     # 第二步：选择单元（必选）
     units = browser.get_units_by_book(selected_book['id'])
     if not units:
@@ -592,319 +898,21 @@ def render_textbook_mode(browser):
     
     st.markdown("---")
     
-    # 生成图谱
+    # 生成图谱（按钮只记录要显示的图谱，之后页面重跑直接复用缓存的图数据）
+    graph_key = make_graph_key("textbook", book_id=selected_book['id'], unit_id=unit_id)
     if st.button("🗺️ 生成知识图谱", type="primary", key="kg_textbook_generate", use_container_width=True):
+        st.session_state['kg_textbook_graph_key'] = graph_key
+    
+    if st.session_state.get('kg_textbook_graph_key') == graph_key:
         with st.spinner("正在生成知识图谱..."):
-            net = browser.create_textbook_graph(selected_book['id'], unit_id)
-            
-            # 准备节点数据
-            nodes_data = {}
-            for lesson in lessons:
-                lesson_id = f"lesson_{lesson.get('id')}"
-                nodes_data[lesson_id] = {
-                    "type": "课程",
-                    "title": lesson.get('title', ''),
-                    "book_name": lesson.get('book_name', ''),
-                    "content": lesson.get('content', '')
-                }
-                
-                # 事件数据
-                events = browser.get_events_by_lesson(lesson.get('id'))
-                for i, event in enumerate(events[:8]):
-                    event_id = f"event_{lesson.get('id')}_{i}"
-                    event_desc = event.get('description', '')
-                    event_year = event.get('year', '未知')
-                    event_name = extract_event_name(event_desc, event_year)
-                    nodes_data[event_id] = {
-                        "type": "事件",
-                        "name": event_name,
-                        "year": event_year,
-                        "description": event_desc
-                    }
-                
-                # 人物数据
-                figures = browser.get_figures_by_lesson(lesson.get('id'))
-                for i, figure in enumerate(figures[:5]):
-                    figure_id = f"figure_{lesson.get('id')}_{i}"
-                    nodes_data[figure_id] = {
-                        "type": "人物",
-                        "name": figure.get('name', ''),
-                        "description": figure.get('description', '')
-                    }
-            
-            # 保存并显示
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.html', encoding='utf-8') as f:
-                net.save_graph(f.name)
-                graph_path = f.name
-            
-            with open(graph_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            # 注入点击事件处理
-            import json
-            nodes_json = json.dumps(nodes_data, ensure_ascii=False)
-            
-            click_handler = f"""
-            <style>
-            html, body {{
-                height: 100%;
-                overflow: hidden;
-            }}
-            #node-detail-panel {{
-                position: absolute;
-                top: 20px;
-                right: 20px;
-                width: 400px;
-                height: 600px;
-                background: rgba(255,255,255,0.98);
-                padding: 20px;
-                z-index: 9999;
-                overflow-y: scroll !important;
-                overflow-x: hidden;
-                display: none;
-                font-family: 'Microsoft YaHei', sans-serif;
-                box-shadow: 0 4px 20px rgba(0,0,0,0.15);
-                border-radius: 12px;
-                border: 2px solid #4ECDC4;
-            }}
-            #node-detail-panel::-webkit-scrollbar {{
-                width: 10px;
-            }}
-            #node-detail-panel::-webkit-scrollbar-track {{
-                background: #f1f1f1;
-                border-radius: 5px;
-            }}
-            #node-detail-panel::-webkit-scrollbar-thumb {{
-                background: #4ECDC4;
-                border-radius: 5px;
-            }}
-            #node-detail-panel::-webkit-scrollbar-thumb:hover {{
-                background: #45B7D1;
-            }}
-            #node-detail-panel h3 {{
-                margin: 0 0 15px 0;
-                color: #1f77b4;
-                font-size: 22px;
-                padding-bottom: 12px;
-                border-bottom: 3px solid #4ECDC4;
-            }}
-            #node-detail-panel .detail-row {{
-                margin: 15px 0;
-                font-size: 15px;
-                line-height: 1.8;
-            }}
-            #node-detail-panel .detail-label {{
-                font-weight: bold;
-                color: #333;
-                display: block;
-                margin-bottom: 5px;
-            }}
-            #node-detail-panel .detail-value {{
-                color: #555;
-            }}
-            #node-detail-panel .close-btn {{
-                position: absolute;
-                top: 15px;
-                right: 20px;
-                cursor: pointer;
-                font-size: 28px;
-                color: #999;
-                font-weight: bold;
-                transition: color 0.3s;
-            }}
-            #node-detail-panel .close-btn:hover {{
-                color: #333;
-            }}
-            #node-detail-panel .type-badge {{
-                display: inline-block;
-                padding: 4px 12px;
-                border-radius: 12px;
-                font-size: 13px;
-                font-weight: bold;
-                margin-bottom: 10px;
-            }}
-            </style>
-            
-            <div id="node-detail-panel">
-                <span class="close-btn" onclick="closeDetailPanel()">✕</span>
-                <div id="detail-content"></div>
-            </div>
-            
-            <script>
-            var nodesData = {nodes_json};
-            var networkRef = null;
-            var originalColors = {{nodes: {{}}, edges: {{}}}};
-            
-            function closeDetailPanel() {{
-                document.getElementById('node-detail-panel').style.display = 'none';
-                if (networkRef) {{
-                    restoreAllColors();
-                }}
-            }}
-            
-            function restoreAllColors() {{
-                if (!networkRef) return;
-                var nodeUpdates = [];
-                var edgeUpdates = [];
-                
-                // 恢复节点颜色
-                for (var nodeId in originalColors.nodes) {{
-                    nodeUpdates.push({{id: nodeId, color: originalColors.nodes[nodeId], font: {{color: '#222222'}}}});
-                }}
-                // 恢复边颜色
-                for (var edgeId in originalColors.edges) {{
-                    edgeUpdates.push({{id: edgeId, color: originalColors.edges[edgeId]}});
-                }}
-                
-                if (nodeUpdates.length > 0) {{
-                    networkRef.body.data.nodes.update(nodeUpdates);
-                }}
-                if (edgeUpdates.length > 0) {{
-                    networkRef.body.data.edges.update(edgeUpdates);
-                }}
-                originalColors = {{nodes: {{}}, edges: {{}}}};
-            }}
-            
-            function highlightConnected(clickedNodeId) {{
-                if (!networkRef) return;
-                
-                // 先恢复之前的颜色
-                restoreAllColors();
-                
-                // 找出关联的节点和边
-                var connectedNodes = new Set([clickedNodeId]);
-                var connectedEdgeIds = new Set();
-                
-                var allEdges = networkRef.body.data.edges.get();
-                allEdges.forEach(function(edge) {{
-                    if (edge.from === clickedNodeId || edge.to === clickedNodeId) {{
-                        connectedNodes.add(edge.from);
-                        connectedNodes.add(edge.to);
-                        connectedEdgeIds.add(edge.id);
-                    }}
-                }});
-                
-                // 保存原始颜色并设置新颜色
-                var allNodes = networkRef.body.data.nodes.get();
-                var nodeUpdates = [];
-                var edgeUpdates = [];
-                
-                originalColors = {{nodes: {{}}, edges: {{}}}};
-                
-                allNodes.forEach(function(node) {{
-                    originalColors.nodes[node.id] = node.color;
-                    if (connectedNodes.has(node.id)) {{
-                        // 关联节点保持原色
-                        nodeUpdates.push({{id: node.id, font: {{color: '#222222'}}}});
-                    }} else {{
-                        // 非关联节点变灰
-                        nodeUpdates.push({{id: node.id, color: '#dddddd', font: {{color: '#bbbbbb'}}}});
-                    }}
-                }});
-                
-                allEdges.forEach(function(edge) {{
-                    originalColors.edges[edge.id] = edge.color;
-                    if (connectedEdgeIds.has(edge.id)) {{
-                        // 关联边高亮
-                        edgeUpdates.push({{id: edge.id, color: '#FF6B6B', width: 4}});
-                    }} else {{
-                        // 非关联边变灰
-                        edgeUpdates.push({{id: edge.id, color: '#eeeeee'}});
-                    }}
-                }});
-                
-                networkRef.body.data.nodes.update(nodeUpdates);
-                networkRef.body.data.edges.update(edgeUpdates);
-            }}
-            
-            window.onload = function() {{
-                var attempts = 0;
-                var maxAttempts = 20;
-                
-                function tryBindEvents() {{
-                    attempts++;
-                    var networkObj = null;
-                    
-                    if (typeof network !== 'undefined') {{
-                        networkObj = network;
-                    }} else if (typeof window.network !== 'undefined') {{
-                        networkObj = window.network;
-                    }}
-                    
-                    if (networkObj) {{
-                        networkRef = networkObj;
-                        
-                        networkObj.on('stabilized', function() {{
-                            networkObj.setOptions({{physics: {{enabled: false}}}});
-                        }});
-                        
-                        networkObj.on('click', function(params) {{
-                            if (params.nodes && params.nodes.length > 0) {{
-                                var nodeId = params.nodes[0];
-                                if (nodeId !== 'center') {{
-                                    var node = nodesData[nodeId];
-                                    if (node) {{
-                                        showNodeDetail(node);
-                                    }}
-                                }}
-                            }} else {{
-                                closeDetailPanel();
-                            }}
-                        }});
-                    }} else if (attempts < maxAttempts) {{
-                        setTimeout(tryBindEvents, 300);
-                    }}
-                }}
-                
-                function showNodeDetail(node) {{
-                    var panel = document.getElementById('node-detail-panel');
-                    var content = document.getElementById('detail-content');
-                    
-                    var typeColors = {{
-                        "课程": "#4ECDC4",
-                        "事件": "#FFA07A",
-                        "人物": "#96CEB4"
-                    }};
-                    var bgColor = typeColors[node.type] || "#999";
-                    
-                    var html = '<span class="type-badge" style="background:' + bgColor + ';color:white;">' + node.type + '</span>';
-                    
-                    if (node.type === "课程") {{
-                        html += '<h3>' + (node.title || '课程') + '</h3>';
-                        if (node.book_name) html += '<div class="detail-row"><span class="detail-label">📚 教材：</span><span class="detail-value">' + node.book_name + '</span></div>';
-                        if (node.content) html += '<div class="detail-row"><span class="detail-label">📝 内容：</span><span class="detail-value">' + node.content + '</span></div>';
-                    }} else if (node.type === "事件") {{
-                        html += '<h3>⚡ ' + (node.name || '历史事件') + '</h3>';
-                        if (node.year) {{
-                            var yearText = String(node.year);
-                            if (!yearText.includes('年')) yearText += '年';
-                            html += '<div class="detail-row"><span class="detail-label">⏰ 时间：</span><span class="detail-value">' + yearText + '</span></div>';
-                        }}
-                        if (node.description) html += '<div class="detail-row"><span class="detail-label">💡 描述：</span><span class="detail-value">' + node.description + '</span></div>';
-                    }} else if (node.type === "人物") {{
-                        html += '<h3>👤 ' + (node.name || '历史人物') + '</h3>';
-                        if (node.description) html += '<div class="detail-row"><span class="detail-label">📝 简介：</span><span class="detail-value">' + node.description + '</span></div>';
-                    }}
-                    
-                    content.innerHTML = html;
-                    panel.style.display = 'block';
-                }}
-                
-                setTimeout(tryBindEvents, 500);
-            }};
-            </script>
-            """
-            
-            html_content = html_content.replace("</body>", click_handler + "</body>")
-            
-            st.markdown("#### 📊 知识图谱可视化")
-            st.caption("💡 拖动节点调整位置 • 滚轮缩放 • **点击节点查看详细信息卡片**")
-            components.html(html_content, height=850, scrolling=False)
-            
-            try:
-                os.unlink(graph_path)
-            except:
-                pass
+            graph = get_cached_graph(
+                graph_key,
+                lambda: build_textbook_graph(browser, selected_book['id'], unit_id)
+            )
+        
+        st.markdown("#### 📊 知识图谱可视化")
+        st.caption(graph_caption(graph))
+        show_clustered_graph(graph, "kg_textbook_graph", height=800)
 
 
 def render_topic_mode(browser):
@@ -933,294 +941,41 @@ def render_topic_mode(browser):
         
         st.markdown("---")
         
-        # 生成专题图谱
+        view_mode = st.radio(
+            "显示方式",
+            ["逐级展开", "完整专题图谱"],
+            horizontal=True,
+            key="kg_topic_view_mode",
+            help="逐级展开：先显示类别，点击节点再加载下一级；完整专题图谱：一次显示全部相关知识点"
+        )
+        if view_mode == "逐级展开":
+            explorer = GraphExplorer(
+                "kg_topic_explorer",
+                f"topic:{selected_topic}",
+                lambda: browser.explore_topic_roots(selected_topic),
+                browser.expand_explore_node
+            )
+            render_explorer(explorer)
+            return
+        
+        # 生成专题图谱（按钮只记录要显示的图谱，之后页面重跑直接复用缓存的图数据）
+        graph_key = make_graph_key("topic", topic=selected_topic)
         if st.button("🗺️ 生成专题图谱", type="primary", key="kg_topic_generate", use_container_width=True):
+            st.session_state['kg_topic_graph_key'] = graph_key
+        
+        if st.session_state.get('kg_topic_graph_key') == graph_key:
             with st.spinner("正在生成专题知识图谱..."):
-                net = browser.create_topic_graph(selected_topic)
-                
-                # 准备节点数据
-                nodes_data = {}
-                for i, lesson in enumerate(results['lessons']):
-                    lesson_id = f"lessons_{i}"
-                    nodes_data[lesson_id] = {
-                        "type": "课程",
-                        "title": lesson.get('title', ''),
-                        "book_name": lesson.get('book_name', ''),
-                        "content": lesson.get('content', '')
-                    }
-                
-                for i, event in enumerate(results['events']):
-                    event_id = f"events_{i}"
-                    event_desc = event.get('description', '')
-                    event_year = event.get('year', '未知')
-                    event_name = extract_event_name(event_desc, event_year)
-                    nodes_data[event_id] = {
-                        "type": "事件",
-                        "name": event_name,
-                        "year": event_year,
-                        "description": event_desc
-                    }
-                
-                for i, figure in enumerate(results['figures']):
-                    figure_id = f"figures_{i}"
-                    nodes_data[figure_id] = {
-                        "type": "人物",
-                        "name": figure.get('name', ''),
-                        "description": figure.get('description', '')
-                    }
-                
-                # 保存并显示
-                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.html', encoding='utf-8') as f:
-                    net.save_graph(f.name)
-                    graph_path = f.name
-                
-                with open(graph_path, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
-                
-                # 注入点击事件处理
-                import json
-                nodes_json = json.dumps(nodes_data, ensure_ascii=False)
-                
-                click_handler = f"""
-                <style>
-                html, body {{
-                    height: 100%;
-                    overflow: hidden;
-                }}
-                #node-detail-panel {{
-                    position: absolute;
-                    top: 20px;
-                    right: 20px;
-                    width: 400px;
-                    height: 600px;
-                    background: rgba(255,255,255,0.98);
-                    padding: 20px;
-                    z-index: 9999;
-                    overflow-y: scroll !important;
-                    overflow-x: hidden;
-                    display: none;
-                    font-family: 'Microsoft YaHei', sans-serif;
-                    box-shadow: 0 4px 20px rgba(0,0,0,0.15);
-                    border-radius: 12px;
-                    border: 2px solid #4ECDC4;
-                }}
-                #node-detail-panel::-webkit-scrollbar {{
-                    width: 10px;
-                }}
-                #node-detail-panel::-webkit-scrollbar-track {{
-                    background: #f1f1f1;
-                    border-radius: 5px;
-                }}
-                #node-detail-panel::-webkit-scrollbar-thumb {{
-                    background: #FFA07A;
-                    border-radius: 5px;
-                }}
-                #node-detail-panel::-webkit-scrollbar-thumb:hover {{
-                    background: #FF6B6B;
-                }}
-                #node-detail-panel h3 {{
-                    margin: 0 0 15px 0;
-                    color: #1f77b4;
-                    font-size: 22px;
-                    padding-bottom: 12px;
-                    border-bottom: 3px solid #4ECDC4;
-                }}
-                #node-detail-panel .detail-row {{
-                    margin: 15px 0;
-                    font-size: 15px;
-                    line-height: 1.8;
-                }}
-                #node-detail-panel .detail-label {{
-                    font-weight: bold;
-                    color: #333;
-                    display: block;
-                    margin-bottom: 5px;
-                }}
-                #node-detail-panel .detail-value {{
-                    color: #555;
-                }}
-                #node-detail-panel .close-btn {{
-                    position: absolute;
-                    top: 15px;
-                    right: 20px;
-                    cursor: pointer;
-                    font-size: 28px;
-                    color: #999;
-                    font-weight: bold;
-                    transition: color 0.3s;
-                }}
-                #node-detail-panel .close-btn:hover {{
-                    color: #333;
-                }}
-                #node-detail-panel .type-badge {{
-                    display: inline-block;
-                    padding: 4px 12px;
-                    border-radius: 12px;
-                    font-size: 13px;
-                    font-weight: bold;
-                    margin-bottom: 10px;
-                }}
-                </style>
-                
-                <div id="node-detail-panel">
-                    <span class="close-btn" onclick="closeDetailPanel()">✕</span>
-                    <div id="detail-content"></div>
-                </div>
-                
-                <script>
-                var nodesData = {nodes_json};
-                var networkRef = null;
-                var originalColors = {{nodes: {{}}, edges: {{}}}};
-                
-                function closeDetailPanel() {{
-                    document.getElementById('node-detail-panel').style.display = 'none';
-                    if (networkRef) {{
-                        restoreAllColors();
-                    }}
-                }}
-                
-                function restoreAllColors() {{
-                    if (!networkRef) return;
-                    var nodeUpdates = [];
-                    var edgeUpdates = [];
-                    
-                    for (var nodeId in originalColors.nodes) {{
-                        nodeUpdates.push({{id: nodeId, color: originalColors.nodes[nodeId], font: {{color: '#222222'}}}});
-                    }}
-                    for (var edgeId in originalColors.edges) {{
-                        edgeUpdates.push({{id: edgeId, color: originalColors.edges[edgeId], width: 2}});
-                    }}
-                    
-                    if (nodeUpdates.length > 0) networkRef.body.data.nodes.update(nodeUpdates);
-                    if (edgeUpdates.length > 0) networkRef.body.data.edges.update(edgeUpdates);
-                    originalColors = {{nodes: {{}}, edges: {{}}}};
-                }}
-                
-                function highlightConnected(clickedNodeId) {{
-                    if (!networkRef) return;
-                    restoreAllColors();
-                    
-                    var connectedNodes = new Set([clickedNodeId]);
-                    var connectedEdgeIds = new Set();
-                    
-                    networkRef.body.data.edges.get().forEach(function(edge) {{
-                        if (edge.from === clickedNodeId || edge.to === clickedNodeId) {{
-                            connectedNodes.add(edge.from);
-                            connectedNodes.add(edge.to);
-                            connectedEdgeIds.add(edge.id);
-                        }}
-                    }});
-                    
-                    var nodeUpdates = [];
-                    var edgeUpdates = [];
-                    originalColors = {{nodes: {{}}, edges: {{}}}};
-                    
-                    networkRef.body.data.nodes.get().forEach(function(node) {{
-                        originalColors.nodes[node.id] = node.color;
-                        if (!connectedNodes.has(node.id)) {{
-                            nodeUpdates.push({{id: node.id, color: '#dddddd', font: {{color: '#bbbbbb'}}}});
-                        }}
-                    }});
-                    
-                    networkRef.body.data.edges.get().forEach(function(edge) {{
-                        originalColors.edges[edge.id] = edge.color;
-                        if (connectedEdgeIds.has(edge.id)) {{
-                            edgeUpdates.push({{id: edge.id, color: '#FF6B6B', width: 6}});
-                        }} else {{
-                            edgeUpdates.push({{id: edge.id, color: '#eeeeee', width: 1}});
-                        }}
-                    }});
-                    
-                    if (nodeUpdates.length > 0) networkRef.body.data.nodes.update(nodeUpdates);
-                    if (edgeUpdates.length > 0) networkRef.body.data.edges.update(edgeUpdates);
-                }}
-                
-                window.onload = function() {{
-                    var attempts = 0;
-                    var maxAttempts = 20;
-                    
-                    function tryBindEvents() {{
-                        attempts++;
-                        var networkObj = (typeof network !== 'undefined') ? network : (typeof window.network !== 'undefined' ? window.network : null);
-                        
-                        if (networkObj) {{
-                            networkRef = networkObj;
-                            networkObj.on('stabilized', function() {{
-                                networkObj.setOptions({{physics: {{enabled: false}}}});
-                            }});
-                            
-                            networkObj.on('click', function(params) {{
-                                if (params.nodes && params.nodes.length > 0) {{
-                                    var nodeId = params.nodes[0];
-                                    if (nodeId !== 'topic' && !nodeId.startsWith('cat_')) {{
-                                        var node = nodesData[nodeId];
-                                        if (node) {{
-                                            highlightConnected(nodeId);
-                                            var panel = document.getElementById('node-detail-panel');
-                                            var content = document.getElementById('detail-content');
-                                            
-                                            var typeColors = {{"课程": "#4ECDC4", "事件": "#FFA07A", "人物": "#96CEB4"}};
-                                            var bgColor = typeColors[node.type] || "#999";
-                                            
-                                            var html = '<span class="type-badge" style="background:' + bgColor + ';color:white;">' + node.type + '</span>';
-                                            
-                                            if (node.type === "课程") {{
-                                                html += '<h3>📖 ' + (node.title || '课程') + '</h3>';
-                                                if (node.book_name) html += '<div class="detail-row"><span class="detail-label">📚 教材：</span><span class="detail-value">' + node.book_name + '</span></div>';
-                                                if (node.content) html += '<div class="detail-row"><span class="detail-label">📝 内容：</span><span class="detail-value">' + node.content + '</span></div>';
-                                            }} else if (node.type === "事件") {{
-                                                html += '<h3>⚡ ' + (node.name || '历史事件') + '</h3>';
-                                                if (node.year) {{
-                                                    var yearText = String(node.year);
-                                                    if (!yearText.includes('年')) yearText += '年';
-                                                    html += '<div class="detail-row"><span class="detail-label">⏰ 时间：</span><span class="detail-value">' + yearText + '</span></div>';
-                                                }}
-                                                if (node.description) html += '<div class="detail-row"><span class="detail-label">💡 描述：</span><span class="detail-value">' + node.description + '</span></div>';
-                                            }} else if (node.type === "人物") {{
-                                                html += '<h3>👤 ' + (node.name || '历史人物') + '</h3>';
-                                                if (node.description) html += '<div class="detail-row"><span class="detail-label">📝 简介：</span><span class="detail-value">' + node.description + '</span></div>';
-                                            }}
-                                            
-                                            content.innerHTML = html;
-                                            panel.style.display = 'block';
-                                        }}
-                                    }}
-                                }} else {{
-                                    closeDetailPanel();
-                                }}
-                            }});
-                        }} else if (attempts < maxAttempts) {{
-                            setTimeout(tryBindEvents, 300);
-                        }}
-                    }}
-                    
-                    setTimeout(tryBindEvents, 500);
-                }};
-                </script>
-                """
-                
-                html_content = html_content.replace("</body>", click_handler + "</body>")
-                
-                st.markdown("#### 📊 知识图谱可视化")
-                st.caption("💡 拖动节点调整位置 • 滚轮缩放 • **点击节点查看详细信息卡片**")
-                components.html(html_content, height=850, scrolling=False)
-                
-                try:
-                    os.unlink(graph_path)
-                except:
-                    pass
+                graph = get_cached_graph(graph_key, lambda: build_topic_graph(browser, selected_topic))
+            
+            st.markdown("#### 📊 知识图谱可视化")
+            st.caption(graph_caption(graph))
+            show_clustered_graph(graph, "kg_topic_graph", height=900)
             
             # 显示统计
-            results = browser.search_by_topic(selected_topic)
             col1, col2, col3 = st.columns(3)
             col1.metric("📖 相关课文", len(results['lessons']))
             col2.metric("⚡ 相关事件", len(results['events']))
             col3.metric("👤  相关人物", len(results['figures']))
-            
-            try:
-                os.unlink(graph_path)
-            except:
-                pass
 
 
 if __name__ == "__main__":
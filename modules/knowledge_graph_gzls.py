@@ -6,13 +6,10 @@ GZLS = 高中历史 (GaoZhong LiShi)
 
 import streamlit as st
 from pyvis.network import Network
-import streamlit.components.v1 as components
 from neo4j import GraphDatabase
 import json
 from pathlib import Path
 import sys
-import tempfile
-import os
 
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -20,6 +17,8 @@ from config.history_config import (
     NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD,
     TEXTBOOKS, KNOWLEDGE_CATEGORIES, TIME_PERIODS
 )
+from config.settings import GRAPH_CACHE_TTL
+from modules.graph_render import network_to_data, make_graph_key, get_cached_graph, show_graph
 
 
 # GZLS 配色方案 - 历史书卷风格
@@ -552,6 +551,47 @@ def render_timeline(kg):
                 st.warning("该时间段暂无历史事件")
 
 
+def build_network_graph(kg, node_id, depth):
+    """生成以node_id为中心的知识网络图数据，节点不存在时返回None"""
+    network_data = kg.get_knowledge_network(node_id, depth)
+    if not network_data['nodes']:
+        return None
+    
+    # 使用pyvis创建网络图
+    net = Network(height="600px", width="100%", bgcolor="#fdfbf7", font_color="#333")
+    
+    # 添加节点
+    for node in network_data['nodes']:
+        color = GZLS_COLORS.get(node['type'], "#95a5a6")
+        net.add_node(
+            node['id'],
+            label=node['label'],
+            title=f"{node['type']}: {node['label']}",
+            color=color
+        )
+    
+    # 添加边
+    for edge in network_data['edges']:
+        net.add_edge(edge['from'], edge['to'], label=edge.get('label', ''))
+    
+    # 设置物理布局
+    net.set_options("""
+    {
+        "physics": {
+            "enabled": true,
+            "barnesHut": {
+                "gravitationalConstant": -8000,
+                "springLength": 150,
+                "springConstant": 0.04
+            }
+        }
+    }
+    """)
+    
+    # 只取图数据，由前端组件绘制
+    return network_to_data(net)
+
+
 def render_network_visualization(kg):
     """渲染知识网络图 (GZLS)"""
     st.markdown("### 🕸️ 知识关系网络图")
@@ -565,57 +605,30 @@ def render_network_visualization(kg):
     
     depth = st.slider("关系深度", 1, 3, 2, key="gzls_network_depth")
     
+    # 按钮只记录要显示的网络图，之后页面重跑直接复用缓存的图数据
+    graph_key = make_graph_key("gzls_network", lesson_id=node_id, depth=depth)
     if st.button("🕸️ 生成网络图", key="gzls_network_btn"):
         if node_id:
-            with st.spinner("生成知识网络..."):
-                network_data = kg.get_knowledge_network(node_id, depth)
-                
-                if network_data['nodes']:
-                    # 使用pyvis创建网络图
-                    net = Network(height="600px", width="100%", bgcolor="#fdfbf7", font_color="#333")
-                    
-                    # 添加节点
-                    for node in network_data['nodes']:
-                        color = GZLS_COLORS.get(node['type'], "#95a5a6")
-                        net.add_node(
-                            node['id'],
-                            label=node['label'],
-                            title=f"{node['type']}: {node['label']}",
-                            color=color
-                        )
-                    
-                    # 添加边
-                    for edge in network_data['edges']:
-                        net.add_edge(edge['from'], edge['to'], label=edge.get('label', ''))
-                    
-                    # 设置物理布局
-                    net.set_options("""
-                    {
-                        "physics": {
-                            "enabled": true,
-                            "barnesHut": {
-                                "gravitationalConstant": -8000,
-                                "springLength": 150,
-                                "springConstant": 0.04
-                            }
-                        }
-                    }
-                    """)
-                    
-                    # 保存并显示
-                    try:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w', encoding='utf-8') as f:
-                            net.save_graph(f.name)
-                            with open(f.name, 'r', encoding='utf-8') as html_file:
-                                source_code = html_file.read()
-                            components.html(source_code, height=620, scrolling=True)
-                            os.unlink(f.name)
-                    except Exception as e:
-                        st.error(f"生成网络图失败: {e}")
-                else:
-                    st.warning("未找到该节点或其关系")
+            st.session_state['gzls_network_graph_key'] = graph_key
         else:
             st.warning("请输入节点ID")
+    
+    if node_id and st.session_state.get('gzls_network_graph_key') == graph_key:
+        with st.spinner("生成知识网络..."):
+            try:
+                graph = get_cached_graph(
+                    graph_key,
+                    lambda: build_network_graph(kg, node_id, depth),
+                    ttl=GRAPH_CACHE_TTL
+                )
+            except Exception as e:
+                st.error(f"生成网络图失败: {e}")
+                return
+        
+        if graph:
+            show_graph(graph, height=600)
+        else:
+            st.warning("未找到该节点或其关系")
 
 
 if __name__ == "__main__":
@@ -4,48 +4,69 @@
 """
 
 import streamlit as st
-import json
 from data.knowledge_graph_graph_format import (
     get_graph_data, 
     get_node_by_id, 
+    get_nodes_by_category,
+    get_module_subgraph,
     GFZ_CATEGORY_COLORS
 )
+from config.settings import GRAPH_LAYOUT_ENABLED
+from modules.graph_layout import apply_layout
+from modules.graph_render import node_detail, make_graph_key, get_cached_graph, show_graph
 
 
-def create_knowledge_graph_html(selected_node_id=None, filter_module=None):
+# 重要程度（1~5）的显示文字
+IMPORTANCE_STARS = {i: "★" * i for i in range(1, 6)}
+
+GFZ_GRAPH_OPTIONS = {
+    "physics": {
+        "enabled": not GRAPH_LAYOUT_ENABLED,
+        "barnesHut": {
+            "gravitationalConstant": -8000,
+            "centralGravity": 0.1,
+            "springLength": 300,
+            "springConstant": 0.01,
+            "avoidOverlap": 0.8,
+            "damping": 0.5
+        },
+        "stabilization": {"enabled": True, "iterations": 300, "fit": True}
+    },
+    "interaction": {
+        "hover": True,
+        "navigationButtons": True,
+        "keyboard": True,
+        "dragNodes": True,
+        "dragView": True,
+        "zoomView": True
+    },
+    "edges": {"smooth": {"enabled": False}}
+}
+
+
+def create_knowledge_graph_data(selected_node_id=None, filter_module=None):
     """
-    生成知识图谱的 HTML 内容
-    使用 vis.js 库进行可视化
+    生成知识图谱的图数据（节点、边、选项、节点详情），由 modules/graph_render.py 的前端组件显示
     """
     try:
         graph_data = get_graph_data()
         nodes = graph_data.get("nodes", [])
         relationships = graph_data.get("relationships", [])
         
-        # 如果指定了模块筛选，只显示该模块及其子节点
+        # 如果指定了模块筛选，只显示该模块及其子节点（章节、知识点）
         if filter_module:
-            # 找到选中的模块节点
-            module_node = next((n for n in nodes if n["category"] == "模块" and n["label"] == filter_module), None)
+            module_node = next((n for n in get_nodes_by_category("模块") if n["label"] == filter_module), None)
             if module_node:
-                module_id = module_node["id"]
-                # 找出所有相关节点（模块、其章节和知识点）
-                related_node_ids = {module_id}
-                for rel in relationships:
-                    if rel["source"] == module_id:
-                        related_node_ids.add(rel["target"])
-                    # 递归添加二级关系（章节的知识点）
-                    if rel["source"] in related_node_ids:
-                        related_node_ids.add(rel["target"])
-                
-                # 筛选节点和关系
-                nodes = [n for n in nodes if n["id"] in related_node_ids]
-                relationships = [r for r in relationships if r["source"] in related_node_ids and r["target"] in related_node_ids]
+                subgraph = get_module_subgraph(module_node["id"])
+                nodes = subgraph["nodes"]
+                relationships = subgraph["relationships"]
         
         if not nodes:
             return None
         
-        # 转换节点数据格式供 vis.js 使用
+        # 转换节点数据格式供 vis-network 使用
         vis_nodes = []
+        details = {}
         for node in nodes:
             color = GFZ_CATEGORY_COLORS.get(node["category"], "#888888")
             
@@ -66,6 +87,13 @@ def create_knowledge_graph_html(selected_node_id=None, filter_module=None):
                 "borderWidth": border_width,
                 "font": {"size": 14 if node["level"] == 1 else 12}
             })
+            
+            properties = node.get("properties", {})
+            details[node["id"]] = node_detail(node["category"], node["label"], color, [
+                ("📝 描述", properties.get("description")),
+                ("⭐ 重要程度", IMPORTANCE_STARS.get(properties.get("importance"))),
+                ("📊 难度", properties.get("difficulty")),
+            ])
         
         # 转换关系数据
         vis_edges = []
@@ -79,153 +107,20 @@ def create_knowledge_graph_html(selected_node_id=None, filter_module=None):
                 "arrows": "to"
             })
         
-        # 生成 HTML
-        nodes_json = json.dumps(vis_nodes, ensure_ascii=False)
-        edges_json = json.dumps(vis_edges, ensure_ascii=False)
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <script type="text/javascript" src="https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.js"></script>
-            <link href="https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.css" rel="stylesheet" type="text/css" />
-            <style type="text/css">
-                body {{
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-                    margin: 0;
-                    padding: 0;
-                }}
-                
-                html, body {{
-                    height: 100%;
-                    margin: 0;
-                    padding: 0;
-                }}
-                
-                #network {{
-                    width: 100%;
-                    height: 1000px;
-                    border: 1px solid #ddd;
-                    background-color: #ffffff;
-                }}
-                
-                .vis-network {{
-                    border-radius: 8px;
-                }}
-                
-                .vis-tooltip {{
-                    background-color: rgba(50, 50, 50, 0.9);
-                    color: #ffffff;
-                    padding: 8px 12px;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    z-index: 9999;
-                }}
-            </style>
-        </head>
-        <body>
-            <div id="network"></div>
-            <script type="text/javascript">
-                var nodes = new vis.DataSet({nodes_json});
-                var edges = new vis.DataSet({edges_json});
-                
-                var container = document.getElementById('network');
-                var data = {{
-                    nodes: nodes,
-                    edges: edges
-                }};
-                
-                var options = {{
-                    physics: {{
-                        enabled: true,
-                        barnesHut: {{
-                            gravitationalConstant: -8000,
-                            centralGravity: 0.1,
-                            springLength: 300,
-                            springConstant: 0.01,
-                            avoidOverlap: 0.8,
-                            damping: 0.5
-                        }},
-                        stabilization: {{
-                            enabled: true,
-                            iterations: 300,
-                            fit: true
-                        }}
-                    }},
-                    interaction: {{
-                        hover: true,
-                        navigationButtons: true,
-                        keyboard: true,
-                        dragNodes: true,
-                        dragView: true,
-                        zoomView: true
-                    }},
-                    edges: {{
-                        smooth: {{
-                            enabled: false
-                        }}
-                    }}
-                }};
-                
-                var network = new vis.Network(container, data, options);
-                
-                // Handle node click events
-                network.on("click", function(params) {{
-                    if (params.nodes.length > 0) {{
-                        var nodeId = params.nodes[0];
-                        console.log("Clicked node:", nodeId);
-                        // Highlight selected node
-                        nodes.update({{id: nodeId, borderWidth: 5}});
-                        highlightRelated(nodeId);
-                    }}
-                }});
-                
-                function highlightRelated(nodeId) {{
-                    // Reset all nodes and edges to default colors
-                    nodes.forEach(function(node) {{
-                        nodes.update({{id: node.id, borderWidth: 2}});
-                    }});
-                    
-                    // Find related nodes
-                    var relatedNodeIds = new Set([nodeId]);
-                    var relatedEdgeIds = new Set();
-                    
-                    edges.forEach(function(edge) {{
-                        if (edge.from === nodeId || edge.to === nodeId) {{
-                            relatedNodeIds.add(edge.from);
-                            relatedNodeIds.add(edge.to);
-                            relatedEdgeIds.add(edge.id);
-                        }}
-                    }});
-                    
-                    // Update node colors
-                    nodes.forEach(function(node) {{
-                        if (relatedNodeIds.has(node.id)) {{
-                            nodes.update({{id: node.id, opacity: 1}});
-                        }} else {{
-                            nodes.update({{id: node.id, opacity: 0.3}});
-                        }}
-                    }});
-                    
-                    // Update edge colors
-                    edges.forEach(function(edge) {{
-                        if (relatedEdgeIds.has(edge.id)) {{
-                            edges.update({{id: edge.id, opacity: 1}});
-                        }} else {{
-                            edges.update({{id: edge.id, opacity: 0.1}});
-                        }}
-                    }});
-                }}
-            </script>
-        </body>
-        </html>
-        """
+        # 服务端计算布局坐标，浏览器不再做物理模拟
+        if GRAPH_LAYOUT_ENABLED:
+            apply_layout(vis_nodes, vis_edges)
         
-        return html_content
+        return {
+            "nodes": vis_nodes,
+            "edges": vis_edges,
+            "options": GFZ_GRAPH_OPTIONS,
+            "details": details,
+            "highlight": True,
+        }
         
     except Exception as e:
-        print(f"创建知识图谱 HTML 失败: {e}")
+        print(f"创建知识图谱数据失败: {e}")
         return None
 
 
@@ -318,11 +213,14 @@ def render_knowledge_graph_interactive():
         # 根据选择的模块筛选节点
         filter_module = None if selected_module == "全部模块" else selected_module
         
-        # 生成 HTML (传入筛选条件)
-        html_content = create_knowledge_graph_html(selected_node_id, filter_module)
+        # 生成图数据 (传入筛选条件)，静态数据的图谱不设过期时间
+        graph = get_cached_graph(
+            make_graph_key("gfz", topic=filter_module, selected=selected_node_id),
+            lambda: create_knowledge_graph_data(selected_node_id, filter_module),
+        )
         
-        if html_content:
-            st.components.v1.html(html_content, height=1100, scrolling=True)
+        if graph:
+            show_graph(graph, height=1000)
         else:
             st.error("❌ 无法生成知识图谱")
             
@@ -4,10 +4,9 @@
 """
 
 import streamlit as st
-import streamlit.components.v1 as components
 from pyvis.network import Network
-import json
-import os
+
+from modules.graph_render import network_to_data, node_detail, make_graph_key, get_cached_graph, show_graph
 
 # 知识节点分类颜色
 CATEGORY_COLORS = {
@@ -119,143 +118,38 @@ def render_knowledge_graph():
     
     st.markdown("---")
     
+    # 生成图谱数据（静态数据，同一教材单元复用缓存）
+    graph_key = make_graph_key("interactive", book_id=selected_book, unit_id=selected_chapter)
+    graph = get_cached_graph(graph_key, lambda: build_history_graph(selected_book, selected_chapter))
+    
+    # 显示图谱
+    show_graph(graph, height=900)
+
+
+def build_history_graph(book_name, chapter_name):
+    """生成所选教材单元的图谱数据（节点、边、选项和节点详情卡片），由前端组件绘制"""
     # 创建知识图谱数据（传入选择的书籍和章节）
-    graph_data = create_history_knowledge_graph(selected_book, selected_chapter)
+    graph_data = create_history_knowledge_graph(book_name, chapter_name)
     
-    # 创建并显示图谱
     net = create_interactive_graph(graph_data)
-    
-    # 保存并显示
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    graph_path = os.path.join(current_dir, "..", "temp_history_graph.html")
-    net.save_graph(graph_path)
-    
-    # 读取并注入交互脚本
-    with open(graph_path, "r", encoding="utf-8") as f:
-        html_content = f.read()
-    
-    # 添加点击事件处理
-    nodes_json = json.dumps(graph_data['nodes'], ensure_ascii=False)
-    click_handler = f"""
-    <style>
-    html, body {{
-        margin: 0 !important;
-        padding: 0 !important;
-        overflow: hidden !important;
-    }}
-    #node-detail-panel {{
-        position: fixed;
-        top: 20px;
-        right: 20px;
-        width: 350px;
-        max-height: 80vh;
-        background: rgba(255,255,255,0.95);
-        padding: 20px;
-        border-radius: 12px;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-        display: none;
-        z-index: 9999;
-        overflow-y: auto;
-    }}
-    #node-detail-panel h3 {{
-        margin: 0 0 15px 0;
-        color: #1976d2;
-        border-bottom: 2px solid #1976d2;
-        padding-bottom: 8px;
-    }}
-    #node-detail-panel .close-btn {{
-        position: absolute;
-        top: 15px;
-        right: 15px;
-        cursor: pointer;
-        font-size: 20px;
-        color: #999;
-    }}
-    #node-detail-panel .detail-item {{
-        margin: 10px 0;
-        font-size: 14px;
-        line-height: 1.6;
-    }}
-    #node-detail-panel .detail-label {{
-        font-weight: bold;
-        color: #666;
-    }}
-    </style>
-    
-    <div id="node-detail-panel">
-        <span class="close-btn" onclick="closePanel()">✕</span>
-        <h3 id="detail-title">节点详情</h3>
-        <div id="detail-content"></div>
-    </div>
-    
-    <script>
-    var nodesData = {nodes_json};
-    var nodesMap = {{}};
-    nodesData.forEach(function(node) {{
-        nodesMap[node.id] = node;
-    }});
-    
-    function closePanel() {{
-        document.getElementById('node-detail-panel').style.display = 'none';
-    }}
-    
-    function showNodeDetail(nodeId) {{
-        var node = nodesMap[nodeId];
-        if (!node) return;
-        
-        var panel = document.getElementById('node-detail-panel');
-        var title = document.getElementById('detail-title');
-        var content = document.getElementById('detail-content');
-        
-        title.innerText = '📍 ' + node.label;
-        
-        var html = '';
-        html += '<div class="detail-item"><span class="detail-label">类别：</span>' + (node.category || 'N/A') + '</div>';
-        html += '<div class="detail-item"><span class="detail-label">时期：</span>' + (node.period || 'N/A') + '</div>';
-        if (node.time) {{
-            html += '<div class="detail-item"><span class="detail-label">时间：</span>' + node.time + '</div>';
-        }}
-        if (node.description) {{
-            html += '<div class="detail-item"><span class="detail-label">说明：</span>' + node.description + '</div>';
-        }}
-        
-        content.innerHTML = html;
-        panel.style.display = 'block';
-    }}
-    
-    window.onload = function() {{
-        var attempts = 0;
-        function tryBind() {{
-            attempts++;
-            var networkObj = typeof network !== 'undefined' ? network : window.network;
-            
-            if (networkObj) {{
-                // 稳定后禁用物理引擎
-                networkObj.on('stabilized', function() {{
-                    networkObj.setOptions({{physics: {{enabled: false}}}});
-                }});
-                
-                // 点击事件
-                networkObj.on('click', function(params) {{
-                    if (params.nodes && params.nodes.length > 0) {{
-                        showNodeDetail(params.nodes[0]);
-                    }} else {{
-                        closePanel();
-                    }}
-                }});
-            }} else if (attempts < 20) {{
-                setTimeout(tryBind, 300);
-            }}
-        }}
-        setTimeout(tryBind, 500);
-    }};
-    </script>
-    """
-    
-    html_content = html_content.replace("</body>", click_handler + "</body>")
-    
-    # 显示图谱
-    components.html(html_content, height=900, scrolling=False)
+    graph = network_to_data(net)
+    
+    # 节点详情卡片
+    graph['details'] = {
+        node['id']: node_detail(
+            node.get('category', ''),
+            f"📍 {node['label']}",
+            CATEGORY_COLORS.get(node.get('category')),
+            [
+                ("类别：", node.get('category') or 'N/A'),
+                ("时期：", node.get('period') or 'N/A'),
+                ("时间：", node.get('time', '')),
+                ("说明：", node.get('description', '')),
+            ]
+        )
+        for node in graph_data['nodes']
+    }
+    return graph
 
 
 def create_history_knowledge_graph(book_name, chapter_name):
@@ -5,11 +5,9 @@
 """
 
 import streamlit as st
-import streamlit.components.v1 as components
 from pyvis.network import Network
-import os
-import tempfile
-import json
+
+from modules.graph_render import network_to_data, node_detail, make_graph_key, content_fingerprint, get_cached_graph, show_graph
 
 
 class KnowledgeGraphVisualizer:
@@ -246,6 +244,49 @@ class KnowledgeGraphVisualizer:
         
         return net
     
+    def build_graph(self, related_knowledge, core_concept=""):
+        """生成图谱数据（节点、边、选项和节点详情卡片），由前端组件绘制"""
+        net = self.create_knowledge_graph(related_knowledge, core_concept)
+        graph = network_to_data(net)
+        
+        # 节点详情卡片
+        type_colors = {"单元": "#FF6B6B", "课程": "#4ECDC4", "事件": "#45B7D1", "人物": "#96CEB4"}
+        details = {}
+        
+        for i, unit in enumerate(related_knowledge.get('units', [])[:5]):
+            details[f"unit_{i}"] = node_detail("单元", unit.get('title', '相关单元'), type_colors["单元"], [
+                ("📚 单元名称：", unit.get('title', '')),
+                ("📖 所属教材：", unit.get('book_name', '')),
+                ("📝 描述：", unit.get('description', '')),
+            ])
+        
+        for i, lesson in enumerate(related_knowledge.get('lessons', [])[:5]):
+            content = lesson.get('content', '')
+            details[f"lesson_{i}"] = node_detail("课程", lesson.get('title', '相关课程'), type_colors["课程"], [
+                ("📚 课程名称：", lesson.get('title', '')),
+                ("📖 所属教材：", lesson.get('book_name', '')),
+                ("📝 内容简介：", content[:200] + '...' if content else ''),
+            ])
+        
+        for i, event in enumerate(related_knowledge.get('events', [])[:10]):
+            event_name = event.get('event', event.get('description', '历史事件'))
+            year = event.get('year', '')
+            details[f"event_{i}"] = node_detail("事件", event_name[:12], type_colors["事件"], [
+                ("📅 事件名称：", event_name),
+                ("⏰ 时间：", f"{year}年" if year else ''),
+                ("💡 描述：", event.get('description', '')),
+            ])
+        
+        for i, figure in enumerate(related_knowledge.get('figures', [])[:10]):
+            figure_name = figure.get('figure', figure.get('name', '历史人物'))
+            details[f"figure_{i}"] = node_detail("人物", figure_name[:8], type_colors["人物"], [
+                ("👤 人物姓名：", figure_name),
+                ("📝 简介：", figure.get('introduction', figure.get('description', ''))),
+            ])
+        
+        graph['details'] = details
+        return graph
+    
     def render(self, related_knowledge, core_concept=""):
         """
         渲染知识图谱
@@ -294,235 +335,14 @@ class KnowledgeGraphVisualizer:
         
         st.markdown("---")
         
-        # 创建图谱
-        net = self.create_knowledge_graph(related_knowledge, core_concept)
-        
-        # 保存并显示HTML
+        # 生成图谱数据（相同题目的关联知识点直接复用缓存）
         try:
-            # 使用临时文件
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.html', encoding='utf-8') as f:
-                net.save_graph(f.name)
-                graph_path = f.name
-            
-            # 读取HTML内容
-            with open(graph_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            # 准备节点数据供JavaScript使用
-            nodes_data = {}
-            
-            # 添加单元节点数据
-            for i, unit in enumerate(related_knowledge.get('units', [])[:5]):
-                nodes_data[f"unit_{i}"] = {
-                    "id": f"unit_{i}",
-                    "label": unit.get('title', '相关单元'),
-                    "type": "单元",
-                    "title": unit.get('title', ''),
-                    "description": unit.get('description', ''),
-                    "book_name": unit.get('book_name', '')
-                }
-            
-            # 添加课程节点数据
-            for i, lesson in enumerate(related_knowledge.get('lessons', [])[:5]):
-                nodes_data[f"lesson_{i}"] = {
-                    "id": f"lesson_{i}",
-                    "label": lesson.get('title', '相关课程'),
-                    "type": "课程",
-                    "title": lesson.get('title', ''),
-                    "content": lesson.get('content', '')[:200] + '...' if lesson.get('content', '') else '',
-                    "book_name": lesson.get('book_name', '')
-                }
-            
-            # 添加事件节点数据
-            for i, event in enumerate(related_knowledge.get('events', [])[:10]):
-                event_name = event.get('event', event.get('description', '历史事件'))
-                nodes_data[f"event_{i}"] = {
-                    "id": f"event_{i}",
-                    "label": event_name[:12],
-                    "type": "事件",
-                    "event": event_name,
-                    "year": event.get('year', ''),
-                    "description": event.get('description', '')
-                }
-            
-            # 添加人物节点数据
-            for i, figure in enumerate(related_knowledge.get('figures', [])[:10]):
-                figure_name = figure.get('figure', figure.get('name', '历史人物'))
-                nodes_data[f"figure_{i}"] = {
-                    "id": f"figure_{i}",
-                    "label": figure_name[:8],
-                    "type": "人物",
-                    "name": figure_name,
-                    "introduction": figure.get('introduction', figure.get('description', ''))
-                }
-            
-            # 注入点击事件处理 - 显示详情卡片
-            import json
-            nodes_json = json.dumps(nodes_data, ensure_ascii=False)
-            
-            click_handler = f"""
-            <style>
-            html, body {{
-                margin: 0 !important;
-                padding: 0 !important;
-                overflow: hidden !important;
-            }}
-            #node-detail-panel {{
-                position: fixed;
-                top: 20px;
-                right: 20px;
-                width: 400px;
-                max-height: 85vh;
-                background: rgba(255,255,255,0.98);
-                padding: 25px;
-                z-index: 9999;
-                overflow-y: auto;
-                display: none;
-                font-family: 'Microsoft YaHei', sans-serif;
-                box-shadow: 0 4px 20px rgba(0,0,0,0.15);
-                border-radius: 12px;
-                border: 2px solid #4ECDC4;
-            }}
-            #node-detail-panel h3 {{
-                margin: 0 0 15px 0;
-                color: #1f77b4;
-                font-size: 22px;
-                padding-bottom: 12px;
-                border-bottom: 3px solid #4ECDC4;
-            }}
-            #node-detail-panel .detail-row {{
-                margin: 15px 0;
-                font-size: 15px;
-                line-height: 1.8;
-            }}
-            #node-detail-panel .detail-label {{
-                font-weight: bold;
-                color: #333;
-                display: inline-block;
-                min-width: 80px;
-            }}
-            #node-detail-panel .detail-value {{
-                color: #555;
-            }}
-            #node-detail-panel .close-btn {{
-                position: absolute;
-                top: 15px;
-                right: 20px;
-                cursor: pointer;
-                font-size: 28px;
-                color: #999;
-                font-weight: bold;
-                transition: color 0.3s;
-            }}
-            #node-detail-panel .close-btn:hover {{
-                color: #333;
-            }}
-            #node-detail-panel .type-badge {{
-                display: inline-block;
-                padding: 4px 12px;
-                border-radius: 12px;
-                font-size: 13px;
-                font-weight: bold;
-                margin-bottom: 10px;
-            }}
-            </style>
-            
-            <div id="node-detail-panel">
-                <span class="close-btn" onclick="closeDetailPanel()">✕</span>
-                <div id="detail-content"></div>
-            </div>
-            
-            <script>
-            var nodesData = {nodes_json};
-            var networkRef = null;
-            
-            function closeDetailPanel() {{
-                document.getElementById('node-detail-panel').style.display = 'none';
-            }}
-            
-            window.onload = function() {{
-                var attempts = 0;
-                var maxAttempts = 20;
-                
-                function tryBindEvents() {{
-                    attempts++;
-                    var networkObj = null;
-                    
-                    if (typeof network !== 'undefined') {{
-                        networkObj = network;
-                    }} else if (typeof window.network !== 'undefined') {{
-                        networkObj = window.network;
-                    }}
-                    
-                    if (networkObj) {{
-                        networkRef = networkObj;
-                        
-                        // 稳定后禁用物理引擎
-                        networkObj.on('stabilized', function() {{
-                            networkObj.setOptions({{physics: {{enabled: false}}}});
-                        }});
-                        
-                        // 点击事件
-                        networkObj.on('click', function(params) {{
-                            if (params.nodes && params.nodes.length > 0) {{
-                                var nodeId = params.nodes[0];
-                                if (nodeId !== 'center') {{
-                                    var node = nodesData[nodeId];
-                                    if (node) {{
-                                        showNodeDetail(node);
-                                    }}
-                                }}
-                            }} else {{
-                                closeDetailPanel();
-                            }}
-                        }});
-                    }} else if (attempts < maxAttempts) {{
-                        setTimeout(tryBindEvents, 300);
-                    }}
-                }}
-                
-                function showNodeDetail(node) {{
-                    var panel = document.getElementById('node-detail-panel');
-                    var content = document.getElementById('detail-content');
-                    
-                    var typeColors = {{
-                        "单元": "#FF6B6B",
-                        "课程": "#4ECDC4",
-                        "事件": "#45B7D1",
-                        "人物": "#96CEB4"
-                    }};
-                    var bgColor = typeColors[node.type] || "#999";
-                    
-                    var html = '<span class="type-badge" style="background:' + bgColor + ';color:white;">' + node.type + '</span>';
-                    html += '<h3>' + (node.label || node.id) + '</h3>';
-                    
-                    if (node.type === "单元") {{
-                        if (node.title) html += '<div class="detail-row"><span class="detail-label">📚 单元名称：</span><span class="detail-value">' + node.title + '</span></div>';
-                        if (node.book_name) html += '<div class="detail-row"><span class="detail-label">📖 所属教材：</span><span class="detail-value">' + node.book_name + '</span></div>';
-                        if (node.description) html += '<div class="detail-row"><span class="detail-label">📝 描述：</span><span class="detail-value">' + node.description + '</span></div>';
-                    }} else if (node.type === "课程") {{
-                        if (node.title) html += '<div class="detail-row"><span class="detail-label">📚 课程名称：</span><span class="detail-value">' + node.title + '</span></div>';
-                        if (node.book_name) html += '<div class="detail-row"><span class="detail-label">📖 所属教材：</span><span class="detail-value">' + node.book_name + '</span></div>';
-                        if (node.content) html += '<div class="detail-row"><span class="detail-label">📝 内容简介：</span><span class="detail-value">' + node.content + '</span></div>';
-                    }} else if (node.type === "事件") {{
-                        if (node.event) html += '<div class="detail-row"><span class="detail-label">📅 事件名称：</span><span class="detail-value">' + node.event + '</span></div>';
-                        if (node.year) html += '<div class="detail-row"><span class="detail-label">⏰ 时间：</span><span class="detail-value">' + node.year + '年</span></div>';
-                        if (node.description) html += '<div class="detail-row"><span class="detail-label">💡 描述：</span><span class="detail-value">' + node.description + '</span></div>';
-                    }} else if (node.type === "人物") {{
-                        if (node.name) html += '<div class="detail-row"><span class="detail-label">👤 人物姓名：</span><span class="detail-value">' + node.name + '</span></div>';
-                        if (node.introduction) html += '<div class="detail-row"><span class="detail-label">📝 简介：</span><span class="detail-value">' + node.introduction + '</span></div>';
-                    }}
-                    
-                    content.innerHTML = html;
-                    panel.style.display = 'block';
-                }}
-                
-                setTimeout(tryBindEvents, 500);
-            }};
-            </script>
-            """
-            
-            html_content = html_content.replace("</body>", click_handler + "</body>")
+            graph_key = make_graph_key(
+                "question",
+                topic=core_concept,
+                content=content_fingerprint(related_knowledge)
+            )
+            graph = get_cached_graph(graph_key, lambda: self.build_graph(related_knowledge, core_concept))
             
             # 添加交互说明
             instruction_html = """
@@ -538,15 +358,8 @@ class KnowledgeGraphVisualizer:
             """
             st.markdown(instruction_html, unsafe_allow_html=True)
             
-            # 嵌入HTML
-            components.html(html_content, height=750, scrolling=False)
+            show_graph(graph, height=750)
             
-            # 清理临时文件
-            try:
-                os.unlink(graph_path)
-            except:
-                pass
-                
         except Exception as e:
             st.error(f"⚠️ 图谱渲染失败：{str(e)}")
             st.info("💡 提示：可以查看下方的文本列表了解相关知识点")
@@ -1,38 +1,135 @@
 """
 学习追踪与报告模块
 追踪学生学习行为，生成个性化报告
+
+页面访问、做题、搜索、知识点查看等原始事件只保留最近 LEARNING_RECORDS_CAPACITY 条（环形缓冲区），
+次数、各专题正确率、最近活动时间在记录时累加到 learning_records['stats']，学习总结不再遍历全部记录
+
+错题本 learning_records['questions_wrong'] 是按题目哈希（question_key）索引的有序字典，
+learning_records['wrong_by_topic'] 按专题索引题目哈希，收录、去重、移除和按专题查询都不需要遍历错题本
 """
 
 import streamlit as st
 from modules.ai_service import get_ai_service
+from modules.chat_context import get_conversation_context, render_summary_error
+from modules.answer_cache import cached_answer
+from config.settings import LEARNING_RECORDS_CAPACITY
+from collections import deque
 from datetime import datetime
+import hashlib
 import json
 
+# 按条数滚动保留的原始事件
+EVENT_BUFFERS = ['page_visits', 'questions_attempted', 'questions_correct', 'search_history', 'knowledge_viewed']
+
+UNCATEGORIZED = '未分类'
+
+
+def question_key(question):
+    """题目哈希（忽略空白差异），作为错题本中题目的标识"""
+    normalized = ' '.join(str(question).split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def _topic_label(topic):
+    return topic or UNCATEGORIZED
+
+
+def _upgrade_wrong_book(records):
+    """旧版本会话中的错题本是列表（以题目前100字去重）：换成按题目哈希索引的有序字典并建立专题索引"""
+    book = {}
+    for record in records.get('questions_wrong', []):
+        record['key'] = question_key(record['question'])
+        book.setdefault(record['key'], record)
+    records['questions_wrong'] = book
+    records['wrong_by_topic'] = {}
+    for key, record in book.items():
+        records['wrong_by_topic'].setdefault(_topic_label(record.get('topic')), {})[key] = True
+
+
+def _new_stats():
+    """累计统计（不随原始事件滚动而减少）"""
+    return {
+        'page_visits': 0,
+        'searches': 0,
+        'knowledge_viewed': 0,
+        'questions_attempted': 0,
+        'questions_correct': 0,
+        'pages': {},    # 页面 -> {'count', 'last_time'}
+        'topics': {},   # 专题 -> {'attempted', 'correct', 'last_time'}
+        'last_activity': None,
+    }
+
+
+def _upgrade_records(records):
+    """旧版本会话中的记录是不限长度的列表：按已有记录补齐统计，再换成环形缓冲区"""
+    stats = _new_stats()
+    for visit in records.get('page_visits', []):
+        _count_page(stats, visit.get('page'), visit.get('time'))
+    for record in records.get('questions_attempted', []):
+        _count_question(stats, record.get('topic'), record.get('is_correct'), record.get('time'))
+    stats['searches'] = len(records.get('search_history', []))
+    stats['knowledge_viewed'] = len(records.get('knowledge_viewed', []))
+    for kind in EVENT_BUFFERS:
+        records[kind] = deque(records.get(kind, []), maxlen=LEARNING_RECORDS_CAPACITY)
+    records['stats'] = stats
+
 
 def init_learning_tracker():
     """初始化学习追踪器"""
     if 'learning_records' not in st.session_state:
         st.session_state.learning_records = {
-            'page_visits': [],        # 页面访问记录
-            'questions_attempted': [],  # 做过的题目
-            'questions_correct': [],   # 做对的题目
-            'questions_wrong': [],     # 做错的题目（错题本）
-            'search_history': [],      # 搜索历史
-            'knowledge_viewed': [],    # 查看过的知识点
+            'page_visits': deque(maxlen=LEARNING_RECORDS_CAPACITY),        # 页面访问记录（最近N条）
+            'questions_attempted': deque(maxlen=LEARNING_RECORDS_CAPACITY),  # 做过的题目（最近N条）
+            'questions_correct': deque(maxlen=LEARNING_RECORDS_CAPACITY),   # 做对的题目（最近N条）
+            'questions_wrong': {},     # 做错的题目（错题本）：题目哈希 -> 记录，按收录顺序
+            'wrong_by_topic': {},      # 专题 -> {题目哈希: True}，按收录顺序
+            'search_history': deque(maxlen=LEARNING_RECORDS_CAPACITY),      # 搜索历史（最近N条）
+            'knowledge_viewed': deque(maxlen=LEARNING_RECORDS_CAPACITY),    # 查看过的知识点（最近N条）
+            'stats': _new_stats(),     # 累计统计
             'session_start': datetime.now().isoformat()
         }
+    else:
+        if 'stats' not in st.session_state.learning_records:
+            _upgrade_records(st.session_state.learning_records)
+        if isinstance(st.session_state.learning_records.get('questions_wrong'), list):
+            _upgrade_wrong_book(st.session_state.learning_records)
     
     if 'weak_points' not in st.session_state:
         st.session_state.weak_points = {}  # 薄弱知识点统计
 
 
+def _count_page(stats, page_name, now):
+    stats['page_visits'] += 1
+    page = stats['pages'].setdefault(page_name, {'count': 0, 'last_time': None})
+    page['count'] += 1
+    page['last_time'] = now
+    stats['last_activity'] = now
+
+
+def _count_question(stats, topic, is_correct, now):
+    stats['questions_attempted'] += 1
+    if is_correct:
+        stats['questions_correct'] += 1
+    if topic:
+        topic_stats = stats['topics'].setdefault(topic, {'attempted': 0, 'correct': 0, 'last_time': None})
+        topic_stats['attempted'] += 1
+        if is_correct:
+            topic_stats['correct'] += 1
+        topic_stats['last_time'] = now
+    stats['last_activity'] = now
+
+
 def track_page_visit(page_name):
     """记录页面访问"""
     init_learning_tracker()
-    st.session_state.learning_records['page_visits'].append({
+    records = st.session_state.learning_records
+    now = datetime.now().isoformat()
+    records['page_visits'].append({
         'page': page_name,
-        'time': datetime.now().isoformat()
+        'time': now
     })
+    _count_page(records['stats'], page_name, now)
 
 
 def track_question_attempt(question, is_correct, user_answer, correct_answer, topic=None, options=None):
@@ -46,23 +143,21 @@ def track_question_attempt(question, is_correct, user_answer, correct_answer, to
         'is_correct': is_correct,
         'topic': topic,
         'options': options,  # 保存选项
-        'time': datetime.now().isoformat()
+        'time': datetime.now().isoformat(),
+        'key': question_key(question)
     }
     
     st.session_state.learning_records['questions_attempted'].append(record)
+    _count_question(st.session_state.learning_records['stats'], topic, is_correct, record['time'])
     
     if is_correct:
         st.session_state.learning_records['questions_correct'].append(record)
     else:
-        # 检查是否已经存在相同题目（去重）
-        existing = False
-        for existing_q in st.session_state.learning_records['questions_wrong']:
-            if existing_q['question'] == record['question']:
-                existing = True
-                break
-        
-        if not existing:
-            st.session_state.learning_records['questions_wrong'].append(record)
+        # 相同题目只收录一次（按题目哈希去重）
+        records = st.session_state.learning_records
+        if record['key'] not in records['questions_wrong']:
+            records['questions_wrong'][record['key']] = record
+            records['wrong_by_topic'].setdefault(_topic_label(topic), {})[record['key']] = True
         
         # 更新薄弱知识点统计
         if topic:
@@ -74,36 +169,68 @@ def track_question_attempt(question, is_correct, user_answer, correct_answer, to
 def track_search(keyword):
     """记录搜索历史"""
     init_learning_tracker()
-    st.session_state.learning_records['search_history'].append({
+    records = st.session_state.learning_records
+    now = datetime.now().isoformat()
+    records['search_history'].append({
         'keyword': keyword,
-        'time': datetime.now().isoformat()
+        'time': now
     })
+    records['stats']['searches'] += 1
+    records['stats']['last_activity'] = now
 
 
 def track_knowledge_view(knowledge_point):
     """记录知识点查看"""
     init_learning_tracker()
-    st.session_state.learning_records['knowledge_viewed'].append({
+    records = st.session_state.learning_records
+    now = datetime.now().isoformat()
+    records['knowledge_viewed'].append({
         'knowledge': knowledge_point,
-        'time': datetime.now().isoformat()
+        'time': now
     })
+    records['stats']['knowledge_viewed'] += 1
+    records['stats']['last_activity'] = now
 
 
-def get_wrong_questions():
-    """获取错题本"""
+def get_wrong_questions(topic=None):
+    """
+    获取错题本（按收录顺序）
+    
+    Args:
+        topic: 只返回该专题的错题（None为全部；未分类的错题用 "未分类"）
+    """
     init_learning_tracker()
-    return st.session_state.learning_records.get('questions_wrong', [])
+    book = st.session_state.learning_records['questions_wrong']
+    if topic is None:
+        return list(book.values())
+    return [book[key] for key in st.session_state.learning_records['wrong_by_topic'].get(topic, {})]
 
 
-def remove_wrong_question(question_text, topic=None):
-    """删除已解决的错题"""
+def get_wrong_questions_by_topic():
+    """按专题分组的错题本：{专题: [错题, ...]}"""
     init_learning_tracker()
+    book = st.session_state.learning_records['questions_wrong']
+    return {
+        topic: [book[key] for key in keys]
+        for topic, keys in st.session_state.learning_records['wrong_by_topic'].items() if keys
+    }
+
+
+def remove_wrong_question(key, topic=None):
+    """
+    删除已解决的错题
     
-    # 从错题列表中删除
-    wrong_questions = st.session_state.learning_records['questions_wrong']
-    st.session_state.learning_records['questions_wrong'] = [
-        q for q in wrong_questions if q['question'] != question_text
-    ]
+    Args:
+        key: 题目哈希（错题记录的 'key'）
+        topic: 所属专题
+    """
+    init_learning_tracker()
+    
+    # 从错题本和专题索引中删除
+    records = st.session_state.learning_records
+    record = records['questions_wrong'].pop(key, None)
+    if record is not None:
+        records['wrong_by_topic'].get(_topic_label(record.get('topic')), {}).pop(key, None)
     
     # 减少该专题的薄弱点计数
     if topic and topic in st.session_state.weak_points:
@@ -121,13 +248,24 @@ def get_weak_points():
     return sorted_weak
 
 
+def get_topic_accuracy():
+    """各专题的做题数和正确率（按做题数排序）"""
+    init_learning_tracker()
+    topics = st.session_state.learning_records['stats']['topics']
+    return sorted(
+        [(topic, s['attempted'], s['correct'] / s['attempted'] * 100) for topic, s in topics.items()],
+        key=lambda x: x[1], reverse=True
+    )
+
+
 def get_learning_summary():
-    """获取学习总结"""
+    """获取学习总结（来自累计统计，与会话时长无关）"""
     init_learning_tracker()
     records = st.session_state.learning_records
+    stats = records['stats']
     
-    total_questions = len(records['questions_attempted'])
-    correct_count = len(records['questions_correct'])
+    total_questions = stats['questions_attempted']
+    correct_count = stats['questions_correct']
     wrong_count = len(records['questions_wrong'])
     accuracy = correct_count / total_questions * 100 if total_questions > 0 else 0
     
@@ -136,10 +274,12 @@ def get_learning_summary():
         'correct_count': correct_count,
         'wrong_count': wrong_count,
         'accuracy': accuracy,
-        'pages_visited': len(records['page_visits']),
-        'searches': len(records['search_history']),
-        'knowledge_viewed': len(records['knowledge_viewed']),
-        'weak_points': get_weak_points()[:5]  # 前5个薄弱点
+        'pages_visited': stats['page_visits'],
+        'searches': stats['searches'],
+        'knowledge_viewed': stats['knowledge_viewed'],
+        'weak_points': get_weak_points()[:5],  # 前5个薄弱点
+        'topic_accuracy': get_topic_accuracy()[:5],  # 做题最多的5个专题
+        'last_activity': stats['last_activity']
     }
 
 
@@ -232,12 +372,7 @@ def render_wrong_questions():
         st.markdown("---")
     
     # 按专题分组显示
-    topics_dict = {}
-    for q in wrong_questions:
-        topic = q.get('topic', '未分类')
-        if topic not in topics_dict:
-            topics_dict[topic] = []
-        topics_dict[topic].append(q)
+    topics_dict = get_wrong_questions_by_topic()
     
     # 显示各专题错题
     for topic, questions in topics_dict.items():
@@ -273,7 +408,7 @@ def render_wrong_questions():
                 
                 with btn_col1:
                     # AI解析按钮
-                    if st.button(f"🤖 AI解析这道题", key=f"explain_{topic}_{i}"):
+                    if st.button(f"🤖 AI解析这道题", key=f"explain_{q['key']}"):
                         with st.spinner("AI正在分析..."):
                             prompt = f"""请分析这道历史题目：
 题目：{q['question']}
@@ -304,8 +439,8 @@ def render_wrong_questions():
                 
                 with btn_col2:
                     # 已学会按钮
-                    if st.button("✅ 已学会", key=f"solved_{topic}_{i}", type="primary"):
-                        remove_wrong_question(q['question'], topic)
+                    if st.button("✅ 已学会", key=f"solved_{q['key']}", type="primary"):
+                        remove_wrong_question(q['key'], q.get('topic'))
                         st.success("🎉 太棒了！该题已从错题本移除！")
                         st.rerun()
                 
@@ -404,6 +539,9 @@ def render_learning_report():
 【薄弱知识点】
 {chr(10).join([f"- {topic}：错误{count}次" for topic, count in summary['weak_points']]) if summary['weak_points'] else "暂无明显薄弱点"}
 
+【各专题正确率】
+{chr(10).join([f"- {topic}：做题{attempted}道，正确率{accuracy:.0f}%" for topic, attempted, accuracy in summary['topic_accuracy']]) if summary['topic_accuracy'] else "暂无专题做题记录"}
+
 请生成报告，包含：
 1. 学习情况总结（2-3句话）
 2. 优点分析（至少2条）
@@ -467,7 +605,7 @@ def render_focus_points():
             st.markdown(f"**错误次数：** {error_count} 次")
             
             # 获取该知识点的错题
-            wrong_in_topic = [q for q in get_wrong_questions() if q.get('topic') == topic]
+            wrong_in_topic = get_wrong_questions(topic)
             
             if wrong_in_topic:
                 st.markdown("**相关错题：**")
@@ -590,7 +728,12 @@ def render_ai_learning_assistant():
                 {"role": "system", "content": "你是一位友善、专业的高中历史老师，用通俗易懂的语言帮助学生学习历史。回答要简洁、重点突出。"},
                 {"role": "user", "content": question}
             ]
-            response = ai_service.call_api(messages)
+            # 快捷问题与对话历史无关，所有学生共享相似问题的回答
+            response = cached_answer(
+                "assistant_quick", question,
+                lambda: ai_service.call_api(messages, site="learning_tracker.quick_question"),
+                site="learning_tracker.quick_question"
+            )
             
             if response:
                 st.session_state.chat_history.append({'role': 'assistant', 'content': response})
@@ -598,6 +741,7 @@ def render_ai_learning_assistant():
         st.rerun()
     
     # 自定义输入
+    render_summary_error("learning_assistant")
     user_input = st.text_input("输入你的问题：", placeholder="例如：请帮我分析一下抗日战争胜利的原因...")
     
     col1, col2 = st.columns([1, 4])
@@ -606,21 +750,20 @@ def render_ai_learning_assistant():
     with col2:
         if st.button("🗑️ 清空对话", use_container_width=True):
             st.session_state.chat_history = []
+            get_conversation_context("learning_assistant").reset()
             st.rerun()
     
     if send_btn and user_input:
         st.session_state.chat_history.append({'role': 'user', 'content': user_input})
         
         with st.spinner("🤖 AI正在思考..."):
-            # 构建带历史的对话
-            messages = [
-                {"role": "system", "content": "你是一位友善、专业的高中历史老师，用通俗易懂的语言帮助学生学习历史。回答要简洁、重点突出。"}
-            ]
-            
-            # 添加最近的对话历史（最多5轮）
-            recent_history = st.session_state.chat_history[-10:]
-            for msg in recent_history:
-                messages.append({"role": msg['role'], "content": msg['content']})
+            # 构建带历史的对话：近期对话按token预算保留，早期对话折叠为摘要
+            messages = get_conversation_context("learning_assistant").build_messages(
+                [{"role": "system", "content": "你是一位友善、专业的高中历史老师，用通俗易懂的语言帮助学生学习历史。回答要简洁、重点突出。"}],
+                st.session_state.chat_history[:-1],
+                user_input,
+                summarizer=ai_service.summarize_conversation
+            )
             
             response = ai_service.call_api(messages)
             
@@ -637,10 +780,7 @@ def generate_printable_html(wrong_questions):
     # 按专题分组
     topics_dict = {}
     for q in wrong_questions:
-        topic = q.get('topic', '未分类')
-        if topic not in topics_dict:
-            topics_dict[topic] = []
-        topics_dict[topic].append(q)
+        topics_dict.setdefault(_topic_label(q.get('topic')), []).append(q)
     
     html = f"""
     <html>
@@ -731,10 +871,7 @@ def generate_export_text(wrong_questions):
     # 按专题分组
     topics_dict = {}
     for q in wrong_questions:
-        topic = q.get('topic', '未分类')
-        if topic not in topics_dict:
-            topics_dict[topic] = []
-        topics_dict[topic].append(q)
+        topics_dict.setdefault(_topic_label(q.get('topic')), []).append(q)
     
     lines = []
     lines.append("=" * 50)
@@ -691,11 +691,16 @@ def render_question_solver():
         with col4:
             if st.button("🚀 立即生成", type="primary", use_container_width=True):
                 with st.spinner(f"AI正在生成{count_gen}道{question_type_gen}..."):
+                    # 并发分批生成，每批完成即显示进度
+                    progress = st.empty()
                     new_questions = generate_more_questions_with_ai(
                         analysis['keywords'], 
                         question_type_gen,
                         difficulty=difficulty_gen,
-                        count=count_gen
+                        count=count_gen,
+                        on_batch=lambda batch, generated: progress.info(
+                            f"⏳ 已生成 {generated}/{count_gen} 道：{batch[0].get('question', '')[:40]}..."
+                        )
                     )
                     if new_questions:
                         st.session_state['generated_questions'] = new_questions
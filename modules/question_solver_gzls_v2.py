@@ -1,24 +1,32 @@
 """
 题目解析模块 - AI生成题目功能
 """
-from modules.ai_service import AIService
+from modules.ai_service import AIService, AIServiceError, QuestionParseError, show_question_failures
+from modules.ai_batch import split_question_slots, iter_completed
 import json
 import streamlit as st
 
 
-def generate_more_questions_with_ai(keywords, question_type, difficulty="medium", count=3):
-    """用AI生成更多类似题目"""
-    try:
-        ai_service = AIService()
-        
-        keywords_str = '、'.join(keywords[:5]) if keywords else "历史知识"
-        
-        # 构建提示词
-        prompt = f"""你是一位历史题目设计专家。请根据以下信息生成{count}道高质量的历史练习题。
+def _request_questions(ai_service, keywords_str, question_type, difficulty, count, focus_keyword=None, focus=None):
+    """
+    发送一次出题请求，返回题目列表（在工作线程中执行，不调用 st.*）
+
+    Raises:
+        AIServiceError: AI调用失败
+        QuestionParseError: 返回内容不是题目JSON
+    """
+    focus_lines = ""
+    if focus_keyword:
+        focus_lines += f"\n**重点围绕：** {focus_keyword}"
+    if focus:
+        focus_lines += f"\n**命题角度：** {focus}"
+    
+    # 构建提示词
+    prompt = f"""你是一位历史题目设计专家。请根据以下信息生成{count}道高质量的历史练习题。
 
 **关键词：** {keywords_str}
 **题型参考：** {question_type}
-**难度：** {difficulty}
+**难度：** {difficulty}{focus_lines}
 
 **要求：**
 1. **题型优先级：** 70%单选题，20%多选题，10%主观题
@@ -51,35 +59,63 @@ def generate_more_questions_with_ai(keywords, question_type, difficulty="medium"
 
 请生成{count}道题目："""
 
-        # 调用AI
-        messages = [
-            {"role": "system", "content": "你是历史题目设计专家，擅长生成高质量练习题。只返回JSON格式，不要其他文字。"},
-            {"role": "user", "content": prompt}
-        ]
+    # 调用AI
+    messages = [
+        {"role": "system", "content": "你是历史题目设计专家，擅长生成高质量练习题。只返回JSON格式，不要其他文字。"},
+        {"role": "user", "content": prompt}
+    ]
+    
+    response = ai_service.complete(messages, params={
+        "temperature": 0.8,
+        "max_tokens": 2000
+    }, site="question_solver_gzls_v2.generate_questions")
+    
+    # 解析JSON（可能包含```json```标记）
+    try:
+        json_str = response
+        if "```json" in response:
+            json_str = response.split("```json")[1].split("```")[0]
+        elif "```" in response:
+            json_str = response.split("```")[1].split("```")[0]
         
-        response = ai_service.call_api(messages, params={
-            "temperature": 0.8,
-            "max_tokens": 2000
-        })
+        return json.loads(json_str.strip())
+    except (json.JSONDecodeError, IndexError) as e:
+        raise QuestionParseError(f"解析AI生成的题目失败：{str(e)}", response) from e
+
+
+def generate_more_questions_with_ai(keywords, question_type, difficulty="medium", count=3, on_batch=None):
+    """
+    用AI生成更多类似题目
+    
+    按关键词/题目槽位拆分为多个小请求并发生成，每批完成时调用 on_batch(本批题目, 已生成总数)
+    """
+    try:
+        ai_service = AIService()
         
-        if not response:
-            return None
+        keywords_str = '、'.join(keywords[:5]) if keywords else "历史知识"
+        slots = split_question_slots(count, keywords[:5] if keywords else None)
         
-        # 解析JSON
-        try:
-            # 提取JSON部分（可能包含```json```标记）
-            json_str = response
-            if "```json" in response:
-                json_str = response.split("```json")[1].split("```")[0]
-            elif "```" in response:
-                json_str = response.split("```")[1].split("```")[0]
-            
-            questions = json.loads(json_str.strip())
-            return questions
-        except json.JSONDecodeError as e:
-            st.error(f"解析AI生成的题目失败：{str(e)}")
-            st.code(response)
-            return None
+        def generate_slot(keyword, n, focus):
+            # 工作线程中的 st.* 调用不会显示，失败原因带回页面线程统一显示
+            try:
+                return _request_questions(ai_service, keywords_str, question_type, difficulty, n, keyword, focus), None
+            except (AIServiceError, QuestionParseError) as e:
+                return None, e
+        
+        questions = []
+        failures = []
+        for _, result in iter_completed(generate_slot, slots):
+            batch, error = result or (None, None)
+            if not batch:
+                failures.append(error)
+                continue
+            questions.extend(batch)
+            if on_batch:
+                on_batch(batch, len(questions))
+        
+        show_question_failures(failures, len(questions))
+        
+        return questions or None
             
     except Exception as e:
         st.error(f"AI生成题目失败：{str(e)}")
@@ -147,7 +183,7 @@ def ai_analyze_single_question(question_data):
         response = ai_service.call_api(messages, params={
             "temperature": 0.7,
             "max_tokens": 1500
-        })
+        }, site="question_solver_gzls_v2.analyze_question")
         
         return response if response else "AI解析暂时不可用"
         
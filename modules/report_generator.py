@@ -5,7 +5,8 @@
 
 import streamlit as st
 from datetime import datetime
-from openai import OpenAI
+from modules.ai_client import create_chat_completion
+from modules.ai_jobs import submit_job, render_job, DONE
 from config.settings import *
 import pandas as pd
 
@@ -241,11 +242,6 @@ def generate_personal_report_with_ai(student_data):
         return "无法生成报告：学生数据为空"
     
     try:
-        client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url=DEEPSEEK_BASE_URL
-        )
-        
         # 构建提示词
         student_info = student_data['student_info']
         activities = student_data['activities']
@@ -292,7 +288,8 @@ def generate_personal_report_with_ai(student_data):
 - 使用 Markdown 格式输出
 """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            site="report_generator.personal_report",
             model="deepseek-chat",
             messages=[
                 {"role": "system", "content": "你是一位经验丰富的高分子物理教师，擅长分析学生的学习数据并给出专业的指导建议。"},
@@ -314,11 +311,6 @@ def generate_module_report_with_ai(module_data):
         return "无法生成报告：板块数据为空"
     
     try:
-        client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url=DEEPSEEK_BASE_URL
-        )
-        
         module_info = module_data['module_info']
         student_stats = module_data['student_stats']
         overall_stats = module_data['overall_stats']
@@ -366,7 +358,8 @@ def generate_module_report_with_ai(module_data):
 - 使用 Markdown 格式输出
 """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            site="report_generator.module_report",
             model="deepseek-chat",
             messages=[
                 {"role": "system", "content": "你是一位经验丰富的高分子物理教师，擅长分析学习系统各功能板块的使用效果并给出改进建议。"},
@@ -388,11 +381,6 @@ def generate_overall_report_with_ai(overall_data):
         return "无法生成报告：整体数据为空"
     
     try:
-        client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url=DEEPSEEK_BASE_URL
-        )
-        
         overall_stats = overall_data['overall_stats']
         module_stats = overall_data['module_stats']
         active_students = overall_data['active_students']
@@ -430,7 +418,8 @@ def generate_overall_report_with_ai(overall_data):
 - 使用 Markdown 格式输出
 """
         
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            site="report_generator.overall_report",
             model="deepseek-chat",
             messages=[
                 {"role": "system", "content": "你是一位经验丰富的高分子物理教师和教学管理专家，擅长分析整体教学数据并给出战略性的教学改进建议。"},
@@ -472,6 +461,40 @@ def render_report_generator():
     else:
         render_overall_report_generator()
 
+REPORT_FAILURE_PREFIXES = ("生成报告失败", "无法生成报告")
+
+def submit_report_job(state_key, kind, data, generate, label, file_name):
+    """把报告生成提交为后台任务（相同数据的报告只生成一次），任务ID保存在 session state"""
+    def run():
+        report = generate(data)
+        if not report or report.startswith(REPORT_FAILURE_PREFIXES):
+            raise RuntimeError(report or "AI未返回内容")
+        return report
+    
+    st.session_state[state_key] = submit_job(kind, data, run, label=label)
+    st.session_state[f"{state_key}_file"] = file_name
+
+def render_report_job(state_key, title):
+    """显示报告任务的进度或结果（页面重跑后结果仍保留）"""
+    job = render_job(state_key, running_text="正在后台生成报告，可以继续浏览其他内容")
+    if job is None or job['status'] != DONE:
+        return
+    
+    report = job['result']
+    st.markdown("---")
+    st.markdown(f"### 📄 {title}")
+    st.caption(f"生成时间：{job['finished_at'].replace('T', ' ')}")
+    st.markdown(report)
+    
+    # 下载按钮
+    st.download_button(
+        label="📥 下载报告",
+        data=report,
+        file_name=st.session_state.get(f"{state_key}_file", f"{title}.md"),
+        mime="text/markdown",
+        key=f"download_{state_key}"
+    )
+
 def render_personal_report_generator():
     """渲染个人报告生成界面"""
     st.markdown("### 👤 个人学习报告")
@@ -508,29 +531,25 @@ def render_personal_report_generator():
     
     # 生成报告按钮
     if st.button("🤖 生成个人报告", type="primary", use_container_width=True):
-        with st.spinner("正在分析学生数据并生成报告..."):
+        with st.spinner("正在读取学生数据..."):
             # 获取学生数据
             student_data = get_student_learning_data(student_id)
-            
-            if not student_data:
-                st.error("未找到该学生的学习数据")
-                return
-            
-            # 生成报告
-            report = generate_personal_report_with_ai(student_data)
-            
-            # 显示报告
-            st.markdown("---")
-            st.markdown("### 📄 学习报告")
-            st.markdown(report)
-            
-            # 下载按钮
-            st.download_button(
-                label="📥 下载报告",
-                data=report,
-                file_name=f"学习报告_{student_data['student_info']['name']}_{datetime.now().strftime('%Y%m%d')}.md",
-                mime="text/markdown"
-            )
+        
+        if not student_data:
+            st.error("未找到该学生的学习数据")
+            return
+        
+        # 报告在后台生成，页面重跑不会中断
+        submit_report_job(
+            'personal_report_job',
+            "personal_report",
+            student_data,
+            generate_personal_report_with_ai,
+            label=f"{student_data['student_info']['name']}的学习报告",
+            file_name=f"学习报告_{student_data['student_info']['name']}_{datetime.now().strftime('%Y%m%d')}.md"
+        )
+    
+    render_report_job('personal_report_job', "学习报告")
 
 def render_module_report_generator():
     """渲染板块报告生成界面"""
@@ -567,29 +586,25 @@ def render_module_report_generator():
     
     # 生成报告按钮
     if st.button("🤖 生成板块报告", type="primary", use_container_width=True):
-        with st.spinner("正在分析板块数据并生成报告..."):
+        with st.spinner("正在读取板块数据..."):
             # 获取板块数据
             module_data = get_module_learning_data(module_id)
-            
-            if not module_data:
-                st.error("未找到该板块的学习数据")
-                return
-            
-            # 生成报告
-            report = generate_module_report_with_ai(module_data)
-            
-            # 显示报告
-            st.markdown("---")
-            st.markdown("### 📄 板块学习报告")
-            st.markdown(report)
-            
-            # 下载按钮
-            st.download_button(
-                label="📥 下载报告",
-                data=report,
-                file_name=f"板块报告_{selected_module}_{datetime.now().strftime('%Y%m%d')}.md",
-                mime="text/markdown"
-            )
+        
+        if not module_data:
+            st.error("未找到该板块的学习数据")
+            return
+        
+        # 报告在后台生成，页面重跑不会中断
+        submit_report_job(
+            'module_report_job',
+            "module_report",
+            module_data,
+            generate_module_report_with_ai,
+            label=f"{selected_module}板块报告",
+            file_name=f"板块报告_{selected_module}_{datetime.now().strftime('%Y%m%d')}.md"
+        )
+    
+    render_report_job('module_report_job', "板块学习报告")
 
 def render_overall_report_generator():
     """渲染整体报告生成界面"""
@@ -617,26 +632,22 @@ def render_overall_report_generator():
     
     # 生成报告按钮
     if st.button("🤖 生成整体报告", type="primary", use_container_width=True):
-        with st.spinner("正在分析所有数据并生成整体报告，这可能需要一些时间..."):
+        with st.spinner("正在读取所有学习数据..."):
             # 获取整体数据
             overall_data = get_overall_learning_data()
-            
-            if not overall_data:
-                st.error("无法获取整体学习数据")
-                return
-            
-            # 生成报告
-            report = generate_overall_report_with_ai(overall_data)
-            
-            # 显示报告
-            st.markdown("---")
-            st.markdown("### 📄 整体学习报告")
-            st.markdown(report)
-            
-            # 下载按钮
-            st.download_button(
-                label="📥 下载报告",
-                data=report,
-                file_name=f"整体学习报告_{datetime.now().strftime('%Y%m%d')}.md",
-                mime="text/markdown"
-            )
+        
+        if not overall_data:
+            st.error("无法获取整体学习数据")
+            return
+        
+        # 报告在后台生成，页面重跑不会中断
+        submit_report_job(
+            'overall_report_job',
+            "overall_report",
+            overall_data,
+            generate_overall_report_with_ai,
+            label="整体学习报告",
+            file_name=f"整体学习报告_{datetime.now().strftime('%Y%m%d')}.md"
+        )
+    
+    render_report_job('overall_report_job', "整体学习报告")
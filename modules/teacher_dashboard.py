@@ -7,6 +7,7 @@ import json
 import random
 from datetime import datetime, timedelta
 from modules.ai_service import get_ai_service
+from modules.ai_jobs import submit_job, render_job, DONE
 
 
 # ============ 模拟学生数据（实际应用中应从数据库获取）============
@@ -233,8 +234,8 @@ def render_teacher_dashboard():
     # ========== 功能模块选择 ==========
     st.markdown("### 🎯 选择分析模块")
     
-    # 使用4列按钮代替tab
-    btn_col1, btn_col2, btn_col3, btn_col4 = st.columns(4)
+    # 使用5列按钮代替tab
+    btn_col1, btn_col2, btn_col3, btn_col4, btn_col5 = st.columns(5)
     
     if 'teacher_view' not in st.session_state:
         st.session_state.teacher_view = 'student_list'
@@ -263,6 +264,12 @@ def render_teacher_dashboard():
             st.session_state.teacher_view = 'ai_diagnosis'
             st.rerun()
     
+    with btn_col5:
+        if st.button("📡 AI调用监控", use_container_width=True,
+                     type="primary" if st.session_state.teacher_view == 'ai_telemetry' else "secondary"):
+            st.session_state.teacher_view = 'ai_telemetry'
+            st.rerun()
+    
     st.markdown("<br>", unsafe_allow_html=True)
     
     # 根据选择渲染内容
@@ -274,6 +281,8 @@ def render_teacher_dashboard():
         render_topic_analysis(students, stats)
     elif st.session_state.teacher_view == 'ai_diagnosis':
         render_ai_diagnosis(students, stats, ai_service)
+    elif st.session_state.teacher_view == 'ai_telemetry':
+        render_ai_telemetry()
 
 
 def render_student_list(students):
@@ -567,6 +576,18 @@ def render_topic_analysis(students, stats):
             """, unsafe_allow_html=True)
 
 
+def submit_diagnosis_job(analysis_type, messages, ai_service, label):
+    """把诊断分析提交为后台任务（相同数据只分析一次），任务ID按分析类型保存在 session state"""
+    def run():
+        # 在后台线程执行：失败时抛出 AIServiceError，错误信息记入任务，由 render_job 显示
+        result = ai_service.complete(messages, site="teacher_dashboard.ai_diagnosis")
+        if not result:
+            raise RuntimeError("AI未返回分析结果")
+        return result
+    
+    st.session_state[f"ai_diagnosis_job_{analysis_type}"] = submit_job("ai_diagnosis", messages, run, label=label)
+
+
 def render_ai_diagnosis(students, stats, ai_service):
     """渲染AI智能诊断"""
     st.markdown("### 🤖 AI智能诊断分析")
@@ -606,9 +627,7 @@ def render_ai_diagnosis(students, stats, ai_service):
                     {"role": "user", "content": prompt}
                 ]
                 
-                result = ai_service.call_api(messages)
-                if result:
-                    st.markdown(result)
+                submit_diagnosis_job(analysis_type, messages, ai_service, "班级整体分析")
     
     elif analysis_type == "👤 个人学情诊断":
         # 选择学生
@@ -652,9 +671,7 @@ def render_ai_diagnosis(students, stats, ai_service):
                         {"role": "user", "content": prompt}
                     ]
                     
-                    result = ai_service.call_api(messages)
-                    if result:
-                        st.markdown(result)
+                    submit_diagnosis_job(analysis_type, messages, ai_service, f"{student['name']}学情诊断")
     
     elif analysis_type == "🎯 专题教学建议":
         # 选择专题
@@ -684,9 +701,7 @@ def render_ai_diagnosis(students, stats, ai_service):
                     {"role": "user", "content": prompt}
                 ]
                 
-                result = ai_service.call_api(messages)
-                if result:
-                    st.markdown(result)
+                submit_diagnosis_job(analysis_type, messages, ai_service, f"{selected_topic}专题教学建议")
     
     elif analysis_type == "📈 学习趋势预测":
         if st.button("🔍 生成学习趋势分析", type="primary"):
@@ -717,9 +732,107 @@ def render_ai_diagnosis(students, stats, ai_service):
                     {"role": "user", "content": prompt}
                 ]
                 
-                result = ai_service.call_api(messages)
-                if result:
-                    st.markdown(result)
+                submit_diagnosis_job(analysis_type, messages, ai_service, "学习趋势预测")
+    
+    # 显示当前分析类型的后台任务进度或结果（切换控件、页面重跑都不会中断分析）
+    job = render_job(f"ai_diagnosis_job_{analysis_type}", running_text="AI正在后台分析，可以继续查看其他数据")
+    if job is not None and job['status'] == DONE:
+        st.caption(f"{job['label']} · 生成时间：{job['finished_at'].replace('T', ' ')}")
+        st.markdown(job['result'])
+
+
+def render_ai_telemetry():
+    """渲染AI调用监控（各功能的延迟、token消耗、重试、缓存命中和错误）"""
+    import pandas as pd
+    from modules.ai_telemetry import get_telemetry, bucket_label, LATENCY_BUCKETS
+    from modules.ai_limiter import get_limiter_stats
+    
+    st.markdown("### 📡 AI调用监控")
+    st.caption("统计自本次服务启动以来的AI调用，数据定期导出到 data/ai_telemetry.json")
+    
+    telemetry = get_telemetry()
+    snapshot = telemetry.snapshot()
+    sites = snapshot['sites']
+    
+    if not sites:
+        st.info("暂无AI调用记录")
+        return
+    
+    def fmt_latency(value):
+        if value is None:
+            return f">{LATENCY_BUCKETS[-1]:g}s"
+        return f"≤{value:g}s" if value else "-"
+    
+    # 汇总指标
+    total_calls = sum(v['calls'] for v in sites.values())
+    total_errors = sum(v['errors'] for v in sites.values())
+    total_hits = sum(v['cache_hits'] for v in sites.values())
+    total_tokens = sum(v['prompt_tokens'] + v['completion_tokens'] for v in sites.values())
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("调用次数", total_calls)
+    with col2:
+        st.metric("错误率", f"{total_errors / total_calls * 100:.1f}%" if total_calls else "0%")
+    with col3:
+        st.metric("缓存命中", total_hits)
+    with col4:
+        st.metric("消耗Token", f"{total_tokens:,}")
+    
+    # 按调用点明细
+    rows = []
+    for site, v in sorted(sites.items(), key=lambda item: -item[1]['latency_sum']):
+        rows.append({
+            "调用点": site,
+            "调用次数": v['calls'],
+            "上游请求": v['upstream_requests'],
+            "缓存命中": v['cache_hits'],
+            "重试": v['retries'],
+            "错误": v['errors'],
+            "平均延迟(s)": round(v['latency_avg'], 2),
+            "P50": fmt_latency(v['p50']),
+            "P95": fmt_latency(v['p95']),
+            "P99": fmt_latency(v['p99']),
+            "最大延迟(s)": round(v['latency_max'], 2),
+            "输入Token": v['prompt_tokens'],
+            "输出Token": v['completion_tokens'],
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    
+    # 延迟分布
+    selected_site = st.selectbox("查看延迟分布：", list(sites.keys()))
+    if selected_site:
+        site_stats = sites[selected_site]
+        df_hist = pd.DataFrame({
+            "延迟": [bucket_label(i) for i in range(len(site_stats['histogram']))],
+            "次数": site_stats['histogram'],
+        })
+        st.bar_chart(df_hist.set_index("延迟"))
+        if site_stats['error_types']:
+            st.markdown("**错误类型：** " + "，".join(f"{k} × {c}" for k, c in site_stats['error_types'].items()))
+            st.caption(f"最近一次错误：{site_stats['last_error']}")
+    
+    # 上游限流与请求合并
+    with st.expander("⚙️ 上游限流与请求合并"):
+        st.json(get_limiter_stats())
+    
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        if st.button("💾 立即导出", use_container_width=True):
+            telemetry.flush()
+            st.success("已导出")
+    with col_b:
+        st.download_button(
+            "📥 下载监控数据",
+            data=json.dumps(snapshot, ensure_ascii=False, indent=2),
+            file_name=f"ai_telemetry_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    with col_c:
+        if st.button("🧹 清零统计", use_container_width=True):
+            telemetry.reset()
+            st.rerun()
 
 
 # ============ 登录页面 ============
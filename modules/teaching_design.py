@@ -5,7 +5,9 @@
 
 import streamlit as st
 from datetime import datetime
-from openai import OpenAI
+from modules.ai_client import create_chat_completion
+from modules.ai_content_store import get_pregenerated, teaching_design_key
+from modules.ai_jobs import submit_job, render_job, DONE
 from config.settings import *
 
 # 教学方法列表及其描述
@@ -81,7 +83,7 @@ def get_chapter_knowledge_points(chapter_id):
         with driver.session() as session:
             result = session.run(f"""
                 MATCH (c:{NEO4J_LABEL_CHAPTER_GFZ} {{id: $chapter_id}})-[:CONTAINS]->(k:{NEO4J_LABEL_KNOWLEDGE_GFZ})
-                RETURN k.name as name, k.importance as importance
+                RETURN k.id as id, k.name as name, k.importance as importance
                 ORDER BY k.importance DESC
             """, chapter_id=chapter_id)
             knowledge_points = [dict(record) for record in result]
@@ -90,21 +92,15 @@ def get_chapter_knowledge_points(chapter_id):
         st.error(f"获取知识点失败: {e}")
         return []
 
-def generate_teaching_design(chapter_name, knowledge_points, method_key):
-    """使用 DeepSeek AI 生成教学设计方案"""
+def request_teaching_design(chapter_name, knowledge_points, method_key):
+    """调用 DeepSeek AI 生成教学设计方案（失败时抛出异常）"""
     method_info = TEACHING_METHODS.get(method_key, {})
     
-    try:
-        client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url=DEEPSEEK_BASE_URL
-        )
-        
-        # 构建知识点列表
-        kp_text = "\n".join([f"- {kp['name']}（重要性：{kp.get('importance', 80)}）" for kp in knowledge_points])
-        
-        # 构建提示词
-        prompt = f"""
+    # 构建知识点列表
+    kp_text = "\n".join([f"- {kp['name']}（重要性：{kp.get('importance', 80)}）" for kp in knowledge_points])
+    
+    # 构建提示词
+    prompt = f"""
 请作为一名资深的高分子物理教育专家，为以下教学内容设计一份详细的教学方案。
 
 # 教学内容
@@ -167,23 +163,74 @@ def generate_teaching_design(chapter_name, knowledge_points, method_key):
 - 按照上述结构用 Markdown 格式输出
 - 总字数2000-3000字
 """
-        
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": f"你是一位精通{method_key}教学法的高分子物理教育专家，擅长设计创新、有效的教学方案。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4000
-        )
-        
-        design = response.choices[0].message.content
-        return design
-        
+    
+    response = create_chat_completion(
+        site="teaching_design.request_teaching_design",
+        model="deepseek-chat",
+        messages=[
+            {"role": "system", "content": f"你是一位精通{method_key}教学法的高分子物理教育专家，擅长设计创新、有效的教学方案。"},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=4000
+    )
+    
+    return response.choices[0].message.content
+
+def generate_teaching_design(chapter_name, knowledge_points, method_key, chapter_id=None):
+    """生成教学设计方案（优先使用离线预生成的方案，没有时实时调用AI）"""
+    if chapter_id:
+        design = get_pregenerated("teaching_design", teaching_design_key(chapter_id, method_key))
+        if design:
+            return design
+    
+    try:
+        return request_teaching_design(chapter_name, knowledge_points, method_key)
     except Exception as e:
         return f"生成教学方案失败：{str(e)}"
 
+def explain_knowledge_point(kp_name, chapter_name, module_name=None):
+    """调用 DeepSeek AI 讲解单个知识点（失败时抛出异常）"""
+    prompt = f"""
+请讲解高分子物理课程中的知识点：{kp_name}
+
+- 所属章节：{chapter_name}
+{f"- 所属模块：{module_name}" if module_name else ""}
+
+请按以下结构讲解，使用 Markdown 格式，总字数600-900字：
+## 📖 基本概念
+## 🔬 物理图像与原理
+## 📐 关键公式或判据（如有）
+## 🧪 典型实例与应用
+## ⚠️ 常见误区
+## 🔗 与其他知识点的联系
+"""
+    
+    response = create_chat_completion(
+        site="teaching_design.explain_knowledge_point",
+        model="deepseek-chat",
+        messages=[
+            {"role": "system", "content": "你是一位经验丰富的高分子物理教师，讲解准确、清晰，善于联系实际材料。"},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.5,
+        max_tokens=1500
+    )
+    
+    return response.choices[0].message.content
+
+def get_knowledge_point_explanation(kp_id, kp_name, chapter_name):
+    """知识点讲解（优先使用离线预生成内容，没有时实时调用AI）"""
+    if kp_id:
+        explanation = get_pregenerated("kp_explanation", kp_id)
+        if explanation:
+            return explanation
+    
+    try:
+        return explain_knowledge_point(kp_name, chapter_name)
+    except Exception as e:
+        return f"生成知识点讲解失败：{str(e)}"
+
 def render_teaching_design():
     """渲染教学方案设计页面"""
     st.markdown("## 📐 教学方案设计")
@@ -240,6 +287,16 @@ def render_teaching_design():
                             st.markdown(f"- 🟠 {kp['name']}（重要）")
                         else:
                             st.markdown(f"- 🟢 {kp['name']}")
+                    
+                    # 知识点讲解（优先读取预生成内容）
+                    kp_by_name = {kp['name']: kp for kp in knowledge_points}
+                    explain_kp = st.selectbox("查看知识点讲解", ["（不查看）"] + list(kp_by_name.keys()))
+                    if explain_kp != "（不查看）":
+                        kp = kp_by_name[explain_kp]
+                        with st.spinner("正在准备知识点讲解..."):
+                            explanation = get_knowledge_point_explanation(kp.get('id'), kp['name'], selected_chapter_name)
+                        with st.expander(f"📖 {kp['name']}", expanded=True):
+                            st.markdown(explanation)
     
     with col2:
         st.markdown("### 🎯 选择教学方法")
@@ -270,20 +327,42 @@ def render_teaching_design():
         
         knowledge_points = get_chapter_knowledge_points(selected_chapter['chapter_id'])
         
-        with st.spinner(f"正在使用 {selected_method} 设计教学方案..."):
-            design = generate_teaching_design(
-                selected_chapter_name,
-                knowledge_points,
-                selected_method
-            )
-            
-            # 保存到 session state
+        design_info = {
+            'chapter': selected_chapter_name,
+            'method': selected_method,
+        }
+        design = get_pregenerated("teaching_design", teaching_design_key(selected_chapter['chapter_id'], selected_method))
+        if design:
             st.session_state['teaching_design'] = design
             st.session_state['teaching_design_info'] = {
-                'chapter': selected_chapter_name,
-                'method': selected_method,
+                **design_info,
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
+        else:
+            # 方案生成耗时较长，放到后台任务中执行，页面重跑不会中断
+            st.session_state['teaching_design_job'] = submit_job(
+                "teaching_design",
+                {
+                    'chapter_id': selected_chapter['chapter_id'],
+                    'chapter': selected_chapter_name,
+                    'method': selected_method,
+                    'knowledge_points': [kp['name'] for kp in knowledge_points],
+                },
+                lambda: request_teaching_design(selected_chapter_name, knowledge_points, selected_method),
+                label=f"{selected_chapter_name}（{selected_method}）教学方案"
+            )
+            st.session_state['teaching_design_job_info'] = design_info
+    
+    # 后台任务完成后转为当前方案
+    job = render_job('teaching_design_job', running_text="正在设计教学方案，可以继续浏览其他内容")
+    if job is not None:
+        st.session_state.pop('teaching_design_job', None)
+        if job['status'] == DONE:
+            st.session_state['teaching_design'] = job['result']
+            st.session_state['teaching_design_info'] = {
+                **st.session_state.pop('teaching_design_job_info', {}),
+                'timestamp': job['finished_at'].replace('T', ' ')
+            }
     
     # 显示生成的方案
     if 'teaching_design' in st.session_state and st.session_state['teaching_design']:
@@ -4,7 +4,7 @@
 """
 
 import streamlit as st
-from modules.ai_service import get_ai_service
+from modules.ai_service import get_ai_service, show_question_failures
 from data.history_questions import get_questions_by_chapter, get_questions_by_type, HISTORY_QUESTIONS
 import random
 
@@ -278,13 +278,22 @@ def render_topic_practice():
                 st.warning("请先显示预设题目，AI会基于现有题目生成相似题")
             else:
                 with st.spinner("🤔 AI正在生成题目..."):
-                    # 使用AI生成额外题目
+                    # 使用AI生成额外题目（并发分批生成，每批完成即显示）
+                    progress = st.empty()
+                    preview = st.container()
+                    
+                    def show_batch(batch, generated):
+                        progress.info(f"⏳ 已生成 {generated}/{count} 道题目...")
+                        for q in batch:
+                            preview.markdown(f"- {q.get('question', '')}")
+                    
                     ai_questions = generate_ai_questions(
                         ai_service, 
                         selected_range, 
                         question_type, 
                         difficulty,
-                        count
+                        count,
+                        on_batch=show_batch
                     )
                     if ai_questions:
                         st.session_state.generated_practice.extend(ai_questions)
@@ -339,22 +348,37 @@ def get_preset_questions(selected_range, question_type, difficulty, count):
         return filtered
 
 
-def generate_ai_questions(ai_service, selected_range, question_type, difficulty, count):
-    """使用AI生成题目"""
+def generate_ai_questions(ai_service, selected_range, question_type, difficulty, count, on_batch=None):
+    """
+    使用AI生成题目（按题目槽位并发生成）
+    
+    Args:
+        on_batch: 每批题目完成时的回调 on_batch(本批题目, 已生成总数)
+    """
     # 解析范围信息
     range_parts = selected_range.split('-')
     topic_desc = range_parts[-1] if len(range_parts) > 1 else selected_range
     
     difficulty_map = {"简单": "easy", "中等": "medium", "困难": "hard"}
     
-    questions = ai_service.generate_questions(
+    questions = []
+    failures = []
+    for batch, error in ai_service.iter_generate_questions(
         knowledge_points=[topic_desc],
         difficulty=difficulty_map.get(difficulty, 'medium'),
         count=count,
         question_type=question_type
-    )
+    ):
+        if not batch:
+            failures.append(error)
+            continue
+        questions.extend(batch)
+        if on_batch:
+            on_batch(batch, len(questions))
+    
+    show_question_failures(failures, len(questions))
     
-    return questions if questions else []
+    return questions
 
 
 def render_question_card(question, index, ai_service):
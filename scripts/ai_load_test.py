@@ -0,0 +1,291 @@
+"""
+AI功能负载测试
+模拟N个学生并发使用AI功能（对话、知识点讲解、出题、记忆技巧、教学方案、课堂总结、学习路径），
+统计吞吐量、P50/P95/P99延迟和错误率，用于调整缓存、请求合并和并发参数
+
+用法：
+    python scripts/ai_load_test.py --mock --students 30 --requests 5              # 内置模拟服务
+    python scripts/ai_load_test.py --mock --error-429 0.1 --latency uniform:500,3000
+    python scripts/ai_load_test.py --base-url http://127.0.0.1:8089/v1 --scenarios chat explain
+    python scripts/ai_load_test.py --mock --output load_test_report.json          # 同时输出JSON报告
+
+--repeat-ratio 控制学生提问的重复程度：越高越多学生问相同或相似的问题（命中缓存和请求合并）
+不加 --mock / --base-url 时会直接调用配置中的真实API，请谨慎使用
+"""
+
+import io
+import sys
+
+# 设置标准输出编码为 UTF-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.mock_llm_server import add_mock_arguments, config_from_args, start_server
+
+SCENARIOS = [
+    "chat",
+    "explain",
+    "questions",
+    "memory_tips",
+    "teaching_design",
+    "classroom_summary",
+    "learning_path",
+]
+
+# 热门问题池（重复提问时从这里取）
+POPULAR_TOPICS = ["辛亥革命", "洋务运动", "戊戌变法", "五四运动", "鸦片战争", "新文化运动"]
+# 长尾问题池
+RARE_TOPICS = [
+    "商鞅变法", "郡县制", "科举制", "丝绸之路", "贞观之治", "王安石变法", "郑和下西洋", "闭关锁国",
+    "太平天国", "甲午中日战争", "抗日战争", "改革开放", "工业革命", "文艺复兴", "启蒙运动", "美国独立战争",
+]
+# 同一问题的不同说法（检验相似问题缓存）
+QUESTION_TEMPLATES = ["{topic}的历史意义", "请问{topic}有什么历史意义？", "{topic}的意义是什么", "老师，讲讲{topic}的意义吧"]
+
+
+def percentile(sorted_values, q):
+    """精确分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def pick_topic(rng, repeat_ratio):
+    if rng.random() < repeat_ratio:
+        return rng.choice(POPULAR_TOPICS)
+    return rng.choice(RARE_TOPICS)
+
+
+def build_scenarios(ai_service):
+    """
+    各场景的调用函数 fn(rng, topic) -> 结果；返回空值视为失败
+
+    与界面中的调用方式一致：AIService 的方法，以及使用共享OpenAI客户端的模块函数
+    """
+    from modules.teaching_design import request_teaching_design, TEACHING_METHODS
+    from modules.classroom_interaction import summarize_replies_with_ai
+    from modules.ability_recommender import analyze_learning_path
+
+    def chat(rng, topic):
+        return ai_service.chat_with_teacher(rng.choice(QUESTION_TEMPLATES).format(topic=topic))
+
+    def explain(rng, topic):
+        return ai_service.explain_concept(topic, level='detailed')
+
+    def questions(rng, topic):
+        return ai_service.generate_questions(knowledge_points=[topic], count=2)
+
+    def memory_tips(rng, topic):
+        return ai_service.generate_memory_tips(topic, f"{topic}的时间和影响总是记混")
+
+    def teaching_design(rng, topic):
+        method = rng.choice(list(TEACHING_METHODS.keys()))
+        return request_teaching_design(topic, [{'name': topic, 'importance': 90}], method)
+
+    def classroom_summary(rng, topic):
+        replies = [{'content': f"我认为{topic}的意义在于推动了社会变革（学生{i + 1}）"} for i in range(rng.randint(5, 20))]
+        return summarize_replies_with_ai(f"{topic}有什么历史意义？", replies)
+
+    def learning_path(rng, topic):
+        abilities = rng.sample([f"GFZ_A{i:03d}" for i in range(1, 17)], 2)
+        return analyze_learning_path(abilities, {a: rng.random() for a in abilities})
+
+    return {
+        "chat": chat,
+        "explain": explain,
+        "questions": questions,
+        "memory_tips": memory_tips,
+        "teaching_design": teaching_design,
+        "classroom_summary": classroom_summary,
+        "learning_path": learning_path,
+    }
+
+
+def run_student(index, args, scenario_fns, results, lock, deadline):
+    """单个模拟学生：按思考时间间隔依次发起请求"""
+    rng = random.Random((args.seed or 0) * 1000 + index)
+    sent = 0
+    while True:
+        if deadline is not None:
+            if time.monotonic() >= deadline:
+                break
+        elif sent >= args.requests:
+            break
+        sent += 1
+
+        scenario = rng.choice(args.scenarios)
+        topic = pick_topic(rng, args.repeat_ratio)
+        start = time.monotonic()
+        error = None
+        try:
+            result = scenario_fns[scenario](rng, topic)
+            if not result:
+                error = "EmptyResult"
+        except Exception as e:
+            error = type(e).__name__
+        latency = time.monotonic() - start
+
+        with lock:
+            results.append((scenario, latency, error))
+        if args.think_time > 0:
+            time.sleep(rng.uniform(0, args.think_time))
+
+
+def summarize(results, elapsed):
+    """按场景汇总：请求数、吞吐量、错误率、延迟分位数"""
+    summary = {}
+    groups = {}
+    for scenario, latency, error in results:
+        groups.setdefault(scenario, []).append((latency, error))
+    groups["全部"] = [(latency, error) for _, latency, error in results]
+
+    for scenario, items in groups.items():
+        latencies = sorted(latency for latency, _ in items)
+        errors = {}
+        for _, error in items:
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+        summary[scenario] = {
+            'requests': len(items),
+            'throughput': len(items) / elapsed if elapsed else 0.0,
+            'error_rate': sum(errors.values()) / len(items) if items else 0.0,
+            'errors': errors,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else 0.0,
+        }
+    return summary
+
+
+def print_report(summary, elapsed, telemetry, limiter_stats, mock_counters):
+    print("\n" + "=" * 90)
+    print(f"📊 负载测试结果（耗时 {elapsed:.1f}s）")
+    print("=" * 90)
+    print(f"{'场景':<20}{'请求数':>8}{'吞吐(次/s)':>12}{'错误率':>9}{'P50(s)':>9}{'P95(s)':>9}{'P99(s)':>9}{'最大(s)':>9}")
+    for scenario, s in summary.items():
+        print(f"{scenario:<20}{s['requests']:>8}{s['throughput']:>12.2f}{s['error_rate'] * 100:>8.1f}%"
+              f"{s['p50']:>9.2f}{s['p95']:>9.2f}{s['p99']:>9.2f}{s['max']:>9.2f}")
+        if s['errors']:
+            print(f"{'':<20}错误: {s['errors']}")
+
+    print("\n📡 调用点统计（modules/ai_telemetry.py）")
+    print(f"{'调用点':<45}{'调用':>6}{'上游':>6}{'缓存命中':>9}{'重试':>6}{'错误':>6}{'Token':>10}")
+    for site, v in sorted(telemetry['sites'].items()):
+        print(f"{site:<45}{v['calls']:>6}{v['upstream_requests']:>6}{v['cache_hits']:>9}{v['retries']:>6}{v['errors']:>6}"
+              f"{v['prompt_tokens'] + v['completion_tokens']:>10}")
+
+    print("\n⚙️ 限流与请求合并")
+    print(f"  {limiter_stats}")
+    if mock_counters is not None:
+        print("\n🧪 模拟服务")
+        print(f"  {mock_counters}")
+    print("=" * 90)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI功能负载测试")
+    parser.add_argument("--students", type=int, default=20, help="并发模拟学生数（默认20）")
+    parser.add_argument("--requests", type=int, default=5, help="每个学生的请求数（默认5）")
+    parser.add_argument("--duration", type=float, default=None, help="按时长运行（秒），设置后忽略 --requests")
+    parser.add_argument("--think-time", type=float, default=1.0, help="学生两次请求之间的最长思考时间（秒）")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS, help="参与测试的场景（默认全部）")
+    parser.add_argument("--repeat-ratio", type=float, default=0.5, help="提问热门问题的比例（0~1，默认0.5）")
+    parser.add_argument("--mock", action="store_true", help="启动内置模拟服务")
+    parser.add_argument("--mock-port", type=int, default=0, help="内置模拟服务端口（默认随机）")
+    parser.add_argument("--base-url", default=None, help="使用已启动的OpenAI兼容服务，如 http://127.0.0.1:8089/v1")
+    parser.add_argument("--output", default=None, help="JSON报告输出路径")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚦 AI功能负载测试")
+    print("=" * 60)
+
+    mock_config = None
+    server = None
+    if args.mock:
+        try:
+            mock_config = config_from_args(args)
+        except (ValueError, OSError, json.JSONDecodeError) as e:
+            print(f"❌ 模拟服务参数错误：{e}")
+            return False
+        server = start_server(mock_config, port=args.mock_port)
+        args.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        print(f"🧪 内置模拟服务: {args.base_url}（延迟 {args.latency}，429 {args.error_429}，5xx {args.error_5xx}）")
+
+    # 配置在导入时读取，必须在导入业务模块之前设置
+    if args.base_url:
+        os.environ["DEEPSEEK_API_BASE"] = args.base_url
+        os.environ.setdefault("DEEPSEEK_API_KEY", "mock")
+
+    from modules.ai_service import AIService
+    from modules.ai_telemetry import get_telemetry
+    from modules.ai_limiter import get_limiter_stats
+
+    scenario_fns = build_scenarios(AIService())
+    results = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    plan = f"{args.duration:g}秒" if args.duration else f"每人 {args.requests} 次"
+    print(f"👥 {args.students} 名学生并发，{plan}，场景: {', '.join(args.scenarios)}，热门问题比例 {args.repeat_ratio}")
+
+    start = time.monotonic()
+    threads = [
+        threading.Thread(target=run_student, args=(i, args, scenario_fns, results, lock, deadline),
+                         name=f"student-{i}", daemon=True)
+        for i in range(args.students)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        print("\n⚠ 已中断，输出已完成部分的统计")
+    elapsed = time.monotonic() - start
+
+    with lock:
+        finished = list(results)
+    summary = summarize(finished, elapsed)
+    telemetry = get_telemetry().snapshot()
+    limiter_stats = get_limiter_stats()
+    mock_counters = dict(mock_config.counters) if mock_config else None
+    print_report(summary, elapsed, telemetry, limiter_stats, mock_counters)
+
+    if args.output:
+        report = {
+            'config': vars(args),
+            'elapsed': elapsed,
+            'scenarios': summary,
+            'telemetry': telemetry,
+            'limiter': limiter_stats,
+            'mock': mock_counters,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 报告已保存: {args.output}")
+
+    if server:
+        server.shutdown()
+    return summary.get("全部", {}).get('requests', 0) > 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
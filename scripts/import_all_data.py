@@ -1,96 +1,165 @@
 """
 高中历史学习系统 - 数据导入主脚本
-自动执行：解析教科书 -> 导入Neo4j -> 导入Elasticsearch
+自动执行：解析教科书 -> 整理解析结果 -> 导入Neo4j / 导入Elasticsearch
+
+各步骤按依赖关系组成流水线（见 scripts/import_pipeline.py）：两个导入目标互不依赖，同时导入；
+每步完成后记录断点，某一步失败后加 --resume 重新运行，只执行失败的步骤及其下游
+
+用法：
+    python scripts/import_all_data.py
+    python scripts/import_all_data.py --resume                 # 从上次失败的步骤继续
+    python scripts/import_all_data.py --skip parse             # 使用已有的解析结果
+    python scripts/import_all_data.py --skip es --full         # 只导入Neo4j，忽略增量导入清单
 """
+import io
 import sys
+
+# 设置标准输出编码为 UTF-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+import argparse
+import json
 from pathlib import Path
 
 # 添加父目录到路径
 sys.path.append(str(Path(__file__).parent.parent))
 
+from scripts.import_pipeline import ImportPipeline, Stage
+
+PARSED_DIR = Path(__file__).parent.parent / "data" / "parsed"
+
+# 整理阶段检查的引用：(文件, 引用字段, 被引用的文件)
+REFERENCES = [
+    ("lessons.json", "unit_id", "units.json"),
+    ("historical_events.json", "lesson_id", "lessons.json"),
+    ("historical_figures.json", "lesson_id", "lessons.json"),
+    ("concepts.json", "lesson_id", "lessons.json"),
+]
+
+
+def parse_textbooks(workers=None):
+    """解析教科书，结果保存到导入脚本读取的 data/parsed"""
+    from config.history_config import TEXTBOOKS
+    from scripts.parse_textbooks import TextbookParser
+
+    textbook_root = Path(__file__).parent.parent.parent
+    # 缺少教科书时不解析，以免用不完整的结果覆盖已有的解析数据
+    missing = [info['file'] for info in TEXTBOOKS.values() if not (textbook_root / info['file']).exists()]
+    if missing:
+        raise Exception(f"教科书文件不存在: {', '.join(missing)}（目录 {textbook_root}），可用 --skip parse 使用已有的解析结果")
+    parser = TextbookParser(textbook_root, output_dir=PARSED_DIR)
+    parsed_data = parser.parse_all_textbooks(workers=workers)
+    return {key: len(items) for key, items in parsed_data.items()}
+
+
+def compile_parsed_data(data_dir=PARSED_DIR):
+    """
+    整理解析结果：检查各文件存在且可读取、记录ID不重复、引用的上级记录存在
+
+    引用缺失的记录在Neo4j中会丢失与上级的关系，只给出警告；没有课文时导入没有意义，直接失败
+
+    Returns:
+        各文件的记录数
+    """
+    data = {}
+    for filename in {name for ref in REFERENCES for name in (ref[0], ref[2])}:
+        file_path = data_dir / filename
+        if not file_path.exists():
+            raise Exception(f"文件不存在 {file_path}")
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data[filename] = json.load(f)
+
+    if not data["lessons.json"]:
+        raise Exception("没有可导入的课文数据")
+
+    for filename, records in sorted(data.items()):
+        ids = [record.get('id') for record in records]
+        duplicates = len(ids) - len(set(ids))
+        print(f"{filename}: {len(records)} 条" + (f"（{duplicates} 条ID重复，以最后一条为准）" if duplicates else ""))
+
+    for filename, field, target in REFERENCES:
+        known = {record.get('id') for record in data[target]}
+        missing = [record.get('id') for record in data[filename] if record.get(field) and record.get(field) not in known]
+        if missing:
+            print(f"⚠️ {filename} 中 {len(missing)} 条记录的 {field} 在 {target} 中不存在（如 {missing[0]}）")
+
+    return {filename: len(records) for filename, records in data.items()}
+
+
+def import_neo4j(full=False, clear=False):
+    """导入Neo4j知识图谱"""
+    from scripts.import_to_neo4j import Neo4jImporter
+
+    importer = Neo4jImporter(full=full)
+    try:
+        if clear:
+            importer.clear_database()
+        importer.create_indexes()
+        importer.import_all_data()
+    finally:
+        importer.close()
+    return {name: diff.summary() for name, diff in importer.diffs}
+
+
+def import_elasticsearch(es_url=None, full=False, test_search=True):
+    """导入Elasticsearch搜索引擎"""
+    from scripts.import_to_elasticsearch import ElasticsearchImporter
+
+    importer = ElasticsearchImporter(es_url=es_url, full=full)
+    importer.create_indexes()
+    importer.import_all_data()
+    if test_search:
+        importer.test_search()
+    return {name: diff.summary() for name, diff in importer.diffs}
+
+
 def main():
+    parser = argparse.ArgumentParser(description="高中历史学习系统 - 数据导入")
+    parser.add_argument("--resume", action="store_true", help="从断点继续：跳过上次已完成且上游没有重新执行的步骤")
+    parser.add_argument("--skip", action="append", default=[], choices=["parse", "compile", "neo4j", "es"],
+                        help="跳过的步骤（可重复），下游使用已有数据")
+    parser.add_argument("--workers", type=int, default=None, help="解析教科书的并行进程数（默认为CPU核数）")
+    parser.add_argument("--full", action="store_true", help="忽略增量导入清单，全部重新写入")
+    parser.add_argument("--clear", action="store_true", help="导入前清空Neo4j数据库")
+    parser.add_argument("--es-url", default=None, help="Elasticsearch地址（如本地模拟服务），默认连接 Elastic Cloud")
+    parser.add_argument("--skip-test", action="store_true", help="导入后不测试搜索")
+    args = parser.parse_args()
+
     print("="*70)
     print(" "*15 + "高中历史学习系统 - 数据导入工具")
     print("="*70)
-    print()
-    
-    # 步骤1: 解析教科书
-    print("【步骤 1/3】 解析教科书内容...")
-    print("-"*70)
-    try:
-        from parse_textbooks import TextbookParser
-        
-        textbook_root = Path(__file__).parent.parent.parent
-        parser = TextbookParser(textbook_root)
-        parsed_data = parser.parse_all_textbooks()
-        
-        print("\n✓ 教科书解析完成")
-    except Exception as e:
-        print(f"\n✗ 教科书解析失败: {e}")
-        print("\n请确保教科书文件存在于正确的路径")
-        return
-    
+
+    pipeline = ImportPipeline([
+        Stage("parse", "解析教科书", lambda: parse_textbooks(args.workers)),
+        Stage("compile", "整理解析结果", compile_parsed_data, deps=["parse"]),
+        Stage("neo4j", "导入Neo4j", lambda: import_neo4j(args.full, args.clear), deps=["compile"]),
+        Stage("es", "导入Elasticsearch", lambda: import_elasticsearch(args.es_url, args.full, not args.skip_test),
+              deps=["compile"]),
+    ], resume=args.resume)
+    success = pipeline.run(skip=args.skip)
+
     print("\n" + "="*70)
-    
-    # 步骤2: 导入Neo4j
-    print("\n【步骤 2/3】 导入数据到 Neo4j 知识图谱...")
-    print("-"*70)
-    try:
-        from import_to_neo4j import Neo4jImporter
-        
-        neo4j_importer = Neo4jImporter()
-        
-        # 询问是否清空数据库
-        response = input("\n是否清空现有Neo4j数据？(yes/no，默认no): ").strip().lower()
-        if response == 'yes':
-            neo4j_importer.clear_database()
-        
-        neo4j_importer.create_indexes()
-        neo4j_importer.import_all_data()
-        neo4j_importer.close()
-        
-        print("\n✓ Neo4j 数据导入完成")
-    except Exception as e:
-        print(f"\n✗ Neo4j 导入失败: {e}")
-        print("\n请检查:")
-        print("  1. Neo4j 服务是否运行")
+    if success:
+        print(" "*20 + "数据导入流程完成！")
+        print("="*70)
+        print()
+        print("接下来:")
+        print("  1. 运行 streamlit run app.py 启动系统")
+        print("  2. 在浏览器中访问学习系统")
+    else:
+        print(" "*20 + "数据导入未全部完成")
+        print("="*70)
+        print()
+        print("请检查:")
+        print("  1. Neo4j / Elasticsearch 服务是否可访问")
         print("  2. config/history_config.py 中的连接配置是否正确")
-        print("  3. 是否安装了 neo4j 驱动: pip install neo4j")
-    
-    print("\n" + "="*70)
-    
-    # 步骤3: 导入Elasticsearch
-    print("\n【步骤 3/3】 导入数据到 Elasticsearch 搜索引擎...")
-    print("-"*70)
-    try:
-        from import_to_elasticsearch import ElasticsearchImporter
-        
-        es_importer = ElasticsearchImporter()
-        es_importer.create_indexes()
-        es_importer.import_all_data()
-        
-        print("\n✓ Elasticsearch 数据导入完成")
-        
-        # 测试搜索
-        print("\n正在测试搜索功能...")
-        es_importer.test_search()
-        
-    except Exception as e:
-        print(f"\n✗ Elasticsearch 导入失败: {e}")
-        print("\n请检查:")
-        print("  1. Elasticsearch 云服务是否可访问")
-        print("  2. config/history_config.py 中的连接配置是否正确")
-        print("  3. 是否安装了 elasticsearch 库: pip install elasticsearch")
-    
-    print("\n" + "="*70)
-    print(" "*20 + "数据导入流程完成！")
-    print("="*70)
-    print()
-    print("接下来:")
-    print("  1. 运行 streamlit run app.py 启动系统")
-    print("  2. 在浏览器中访问学习系统")
+        print("  3. 是否安装了依赖: pip install neo4j elasticsearch")
+        print("修复后运行 python scripts/import_all_data.py --resume 从失败的步骤继续")
     print()
+    return success
 
 
 if __name__ == "__main__":
-    main()
+    success = main()
+    sys.exit(0 if success else 1)
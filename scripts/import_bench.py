@@ -0,0 +1,196 @@
+"""
+导入脚本的演练与基准测试
+不能拿生产环境的 Neo4j / Elasticsearch 测导入速度，--dry-run / --bench 时导入脚本改为写入本地替身：
+- Neo4j：进程内的 FakeNeo4jDriver，执行导入脚本生成的全部语句，按驱动的方式序列化参数（计入编码开销），
+  可模拟每条语句的往返延迟，不保存数据，计数查询一律返回0
+- Elasticsearch：进程内启动的本地模拟服务（scripts/mock_es_server.py，随机端口）
+- 增量导入清单换成不读写文件的内存清单，全部记录视为新增
+- 输入数据可用 scale_records 按倍数合成放大
+
+--bench 时统计写入行数、每秒行数、批次延迟分位数和内存峰值（tracemalloc，会拖慢约一倍，只用于前后对比）
+"""
+
+import json
+import math
+import time
+import tracemalloc
+
+from scripts.import_manifest import ImportManifest
+from scripts.mock_llm_server import parse_latency
+
+
+def dry_run_manifest(name):
+    """演练用的增量导入清单：不读取也不保存清单文件"""
+    return ImportManifest(name, "dry-run", full=True, persist=False)
+
+
+def scale_records(records, factor, fields=('id',)):
+    """
+    合成放大数据：把记录复制 factor 份，第 i 份（i≥1）的 fields 字段加后缀 "#i"
+
+    ID字段和引用字段（如 lesson_id）一起加后缀，复制出的各份数据之间互不重复、内部的引用关系与原数据一致
+
+    Args:
+        records: 记录列表（dict），None原样返回
+        factor: 倍数，不大于1时原样返回
+        fields: 需要加后缀的字段，缺失或为None的字段保持不变
+    """
+    if not records or factor <= 1:
+        return records
+    scaled = list(records)
+    for i in range(1, factor):
+        for record in records:
+            copy = dict(record)
+            for field in fields:
+                if copy.get(field) is not None:
+                    copy[field] = f"{copy[field]}#{i}"
+            scaled.append(copy)
+    return scaled
+
+
+class _ZeroRecord(dict):
+    """任意字段都返回0的查询结果行"""
+
+    def __missing__(self, key):
+        return 0
+
+
+class _FakeResult:
+    def consume(self):
+        return None
+
+    def single(self):
+        return _ZeroRecord()
+
+    def data(self):
+        return []
+
+    def __iter__(self):
+        return iter(())
+
+
+class _FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        self.driver.record(query, params)
+        return _FakeResult()
+
+    def execute_write(self, transaction_function, *args, **kwargs):
+        return transaction_function(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+
+class FakeNeo4jDriver:
+    """
+    进程内的Neo4j替身（接口与 neo4j.Driver 的 session / run / execute_write 一致）
+
+    Args:
+        latency: 每条语句的往返延迟分布（格式同 scripts/mock_llm_server.py 的 --latency），默认无延迟
+    """
+
+    def __init__(self, latency="fixed:0"):
+        self.sample_latency = parse_latency(latency)
+        self.statements = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def session(self, **kwargs):
+        return _FakeSession(self)
+
+    def close(self):
+        pass
+
+    def record(self, query, params):
+        self.statements += 1
+        self.rows += len(params.get('rows') or ())
+        self.bytes += len(query.encode('utf-8'))
+        self.bytes += len(json.dumps(params, ensure_ascii=False, default=str).encode('utf-8'))
+        delay = self.sample_latency()
+        if delay:
+            time.sleep(delay)
+
+
+def record_es_requests(es, targets=('_bulk',)):
+    """
+    记录 Elasticsearch 客户端请求的耗时（在客户端测量，包括序列化和往返）
+
+    Args:
+        es: Elasticsearch 客户端（helpers 内部 options() 出的客户端共用同一个 transport）
+        targets: 只记录路径中包含其中之一的请求
+
+    Returns:
+        耗时列表（秒），请求完成后追加
+    """
+    latencies = []
+    perform_request = es.transport.perform_request
+
+    def timed(method, target, **kwargs):
+        began = time.perf_counter()
+        try:
+            return perform_request(method, target, **kwargs)
+        finally:
+            if any(part in target for part in targets):
+                latencies.append(time.perf_counter() - began)
+
+    es.transport.perform_request = timed
+    return latencies
+
+
+def percentile(values, q):
+    """最近秩百分位数，values为空时返回0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class Bench:
+    """
+    一次基准测试：with 块内统计墙钟时间和内存峰值，结束后用 report 打印结果
+
+    Args:
+        scale: 数据放大倍数（只用于显示）
+    """
+
+    def __init__(self, scale=1):
+        self.scale = scale
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+    def __enter__(self):
+        tracemalloc.start()
+        self._began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._began
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def report(self, rows, latencies):
+        """
+        Args:
+            rows: 写入的行数（文档数）
+            latencies: 各批次（请求）的耗时列表（秒）
+        """
+        rate = rows / self.seconds if self.seconds else 0.0
+        print("\n基准测试结果" + (f"（数据放大 ×{self.scale}）" if self.scale > 1 else "") + ":")
+        print("-" * 50)
+        print(f"写入行数: {rows}    总耗时: {self.seconds:.2f}s    吞吐量: {rate:.0f} 行/秒")
+        print(f"批次数: {len(latencies)}    批次延迟 p50 / p95 / 最大: "
+              f"{percentile(latencies, 50) * 1000:.1f} / {percentile(latencies, 95) * 1000:.1f} / "
+              f"{max(latencies, default=0) * 1000:.1f} ms")
+        print(f"内存峰值: {self.peak_bytes / 1024 / 1024:.1f} MB")
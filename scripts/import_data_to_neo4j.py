@@ -1,6 +1,11 @@
 """
 导入本地数据到 Neo4j 数据库
 将 cases.json 和 knowledge_graph 中的数据导入到 Neo4j
+节点和关系按批用 UNWIND 写入（见 scripts/neo4j_batch.py）
+
+用法：
+    python scripts/import_data_to_neo4j.py
+    python scripts/import_data_to_neo4j.py --bench --scale 50   # 写入进程内替身，测吞吐量（见 scripts/import_bench.py）
 """
 
 import io
@@ -10,6 +15,8 @@ import sys
 if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+import argparse
+import contextlib
 import json
 import os
 import sys
@@ -19,14 +26,22 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from neo4j import GraphDatabase
-from config.settings import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from config.settings import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_IMPORT_BATCH_SIZE
 from data.cases_gfz import CASES_GFZ
 from data.knowledge_graph_gfz import GFZ_KNOWLEDGE_GRAPH
+from scripts.neo4j_batch import BatchWriter
 
 class DataImporter:
-    def __init__(self, uri, username, password):
-        """初始化数据导入器"""
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
+    def __init__(self, uri, username, password, batch_size=NEO4J_IMPORT_BATCH_SIZE, dry_run=False, latency="fixed:0",
+                 scale=1):
+        """初始化数据导入器（dry_run 时写入进程内替身，scale 为数据放大倍数）"""
+        if dry_run:
+            from scripts.import_bench import FakeNeo4jDriver
+            self.driver = FakeNeo4jDriver(latency)
+        else:
+            self.driver = GraphDatabase.driver(uri, auth=(username, password))
+        self.scale = scale
+        self.writer = BatchWriter(self.driver, batch_size)
         
     def close(self):
         """关闭数据库连接"""
@@ -35,164 +50,115 @@ class DataImporter:
     def clear_data(self):
         """清空所有数据（谨慎使用！）"""
         with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+            session.run("""
+                MATCH (n)
+                CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF $batch_size ROWS
+            """, batch_size=self.writer.batch_size).consume()
             print("✓ 已清空所有数据")
     
     def import_cases(self):
-        """导入案例数据"""
+        """导入案例数据（同时关联相关章节和知识点）"""
         print("\n📚 开始导入案例数据...")
-        with self.driver.session() as session:
-            for case in CASES_GFZ:
-                try:
-                    # 创建案例节点
-                    session.run("""
-                        MERGE (c:gfz_Case {id: $case_id})
-                        SET c.title = $title,
-                            c.category = $category,
-                            c.difficulty = $difficulty,
-                            c.content = $content,
-                            c.timestamp = datetime()
-                        RETURN c
-                    """, {
-                        "case_id": case.get("id"),
-                        "title": case.get("title", ""),
-                        "category": case.get("category", ""),
-                        "difficulty": case.get("difficulty", 2),
-                        "content": case.get("content", "")
-                    })
-                    
-                    # 关联相关章节
-                    if "related_chapters" in case:
-                        for chapter_name in case["related_chapters"]:
-                            session.run("""
-                                MERGE (c:gfz_Case {id: $case_id})
-                                MERGE (ch:gfz_Chapter {name: $chapter_name})
-                                MERGE (c)-[:RELATED_TO_CHAPTER]->(ch)
-                            """, {
-                                "case_id": case.get("id"),
-                                "chapter_name": chapter_name
-                            })
-                    
-                    # 关联相关知识点
-                    if "related_kps" in case:
-                        for kp_id in case["related_kps"]:
-                            session.run("""
-                                MERGE (c:gfz_Case {id: $case_id})
-                                MERGE (kp:gfz_KnowledgePoint {id: $kp_id})
-                                MERGE (c)-[:RELATED_TO_KP]->(kp)
-                            """, {
-                                "case_id": case.get("id"),
-                                "kp_id": kp_id
-                            })
-                    
-                    print(f"  ✓ 导入案例: {case.get('title')}")
-                except Exception as e:
-                    print(f"  ✗ 导入失败 {case.get('id')}: {e}")
+        rows = [{
+            "case_id": case.get("id"),
+            "title": case.get("title", ""),
+            "category": case.get("category", ""),
+            "difficulty": case.get("difficulty", 2),
+            "content": case.get("content", ""),
+            "related_chapters": case.get("related_chapters", []),
+            "related_kps": case.get("related_kps", []),
+        } for case in CASES_GFZ]
+        if self.scale > 1:
+            from scripts.import_bench import scale_records
+            rows = scale_records(rows, self.scale, ("case_id",))
+        count = self.writer.write("案例", """
+            UNWIND $rows AS row
+            MERGE (c:gfz_Case {id: row.case_id})
+            SET c.title = row.title,
+                c.category = row.category,
+                c.difficulty = row.difficulty,
+                c.content = row.content,
+                c.timestamp = datetime()
+            FOREACH (chapter_name IN row.related_chapters |
+                MERGE (ch:gfz_Chapter {name: chapter_name})
+                MERGE (c)-[:RELATED_TO_CHAPTER]->(ch))
+            FOREACH (kp_id IN row.related_kps |
+                MERGE (kp:gfz_KnowledgePoint {id: kp_id})
+                MERGE (c)-[:RELATED_TO_KP]->(kp))
+        """, rows)
+        print(f"  ✓ 导入案例 {count}/{len(rows)} 个")
     
     def import_knowledge_graph(self):
-        """导入知识图谱数据"""
+        """导入知识图谱数据（模块 → 章节 → 知识点，逐层批量写入）"""
         print("\n🧠 开始导入知识图谱...")
         
-        def process_module(session, module):
-            """处理知识模块"""
-            try:
-                module_id = module.get("id")
-                session.run("""
-                    MERGE (m:gfz_Module {id: $module_id})
-                    SET m.name = $name,
-                        m.description = $description,
-                        m.timestamp = datetime()
-                """, {
-                    "module_id": module_id,
-                    "name": module.get("name", ""),
-                    "description": module.get("description", "")
-                })
-                
-                print(f"  ✓ 创建模块: {module.get('name')}")
-                
-                # 处理章节
-                if "chapters" in module:
-                    for chapter in module["chapters"]:
-                        process_chapter(session, module_id, chapter)
-            except Exception as e:
-                print(f"  ✗ 处理模块失败 {module.get('name')}: {e}")
-        
-        def process_chapter(session, module_id, chapter):
-            """处理章节"""
-            try:
-                chapter_id = chapter.get("id")
-                session.run("""
-                    MERGE (c:gfz_Chapter {id: $chapter_id})
-                    SET c.name = $name,
-                        c.timestamp = datetime()
-                """, {
-                    "chapter_id": chapter_id,
-                    "name": chapter.get("name", "")
+        module_rows, chapter_rows, kp_rows = [], [], []
+        for module in GFZ_KNOWLEDGE_GRAPH.get("modules", []):
+            module_rows.append({
+                "module_id": module.get("id"),
+                "name": module.get("name", ""),
+                "description": module.get("description", ""),
+            })
+            for chapter in module.get("chapters", []):
+                chapter_rows.append({
+                    "module_id": module.get("id"),
+                    "chapter_id": chapter.get("id"),
+                    "name": chapter.get("name", ""),
                 })
-                
-                # 创建与模块的关系
-                session.run("""
-                    MATCH (m:gfz_Module {id: $module_id})
-                    MATCH (c:gfz_Chapter {id: $chapter_id})
-                    MERGE (m)-[:CONTAINS]->(c)
-                """, {
-                    "module_id": module_id,
-                    "chapter_id": chapter_id
-                })
-                
-                # 处理知识点
-                if "knowledge_points" in chapter:
-                    for kp in chapter["knowledge_points"]:
-                        process_knowledge_point(session, chapter_id, kp)
-            except Exception as e:
-                print(f"  ✗ 处理章节失败 {chapter.get('name')}: {e}")
+                for kp in chapter.get("knowledge_points", []):
+                    kp_rows.append({
+                        "chapter_id": chapter.get("id"),
+                        "kp_id": kp.get("id"),
+                        "name": kp.get("name", ""),
+                        "importance": kp.get("importance", 3),
+                    })
         
-        def process_knowledge_point(session, chapter_id, kp):
-            """处理知识点"""
-            try:
-                kp_id = kp.get("id")
-                session.run("""
-                    MERGE (k:gfz_KnowledgePoint {id: $kp_id})
-                    SET k.name = $name,
-                        k.importance = $importance,
-                        k.timestamp = datetime()
-                """, {
-                    "kp_id": kp_id,
-                    "name": kp.get("name", ""),
-                    "importance": kp.get("importance", 3)
-                })
-                
-                # 创建与章节的关系
-                session.run("""
-                    MATCH (c:gfz_Chapter {id: $chapter_id})
-                    MATCH (k:gfz_KnowledgePoint {id: $kp_id})
-                    MERGE (c)-[:CONTAINS]->(k)
-                """, {
-                    "chapter_id": chapter_id,
-                    "kp_id": kp_id
-                })
-            except Exception as e:
-                print(f"  ✗ 处理知识点失败 {kp.get('name')}: {e}")
+        if self.scale > 1:
+            from scripts.import_bench import scale_records
+            module_rows = scale_records(module_rows, self.scale, ("module_id",))
+            chapter_rows = scale_records(chapter_rows, self.scale, ("module_id", "chapter_id"))
+            kp_rows = scale_records(kp_rows, self.scale, ("chapter_id", "kp_id"))
         
-        with self.driver.session() as session:
-            try:
-                # 处理所有模块
-                if "modules" in GFZ_KNOWLEDGE_GRAPH:
-                    for module in GFZ_KNOWLEDGE_GRAPH["modules"]:
-                        process_module(session, module)
-                
-                print(f"  ✓ 知识图谱导入完成")
-            except Exception as e:
-                print(f"  ✗ 知识图谱导入失败: {e}")
+        modules = self.writer.write("模块", """
+            UNWIND $rows AS row
+            MERGE (m:gfz_Module {id: row.module_id})
+            SET m.name = row.name,
+                m.description = row.description,
+                m.timestamp = datetime()
+        """, module_rows)
+        chapters = self.writer.write("章节", """
+            UNWIND $rows AS row
+            MERGE (c:gfz_Chapter {id: row.chapter_id})
+            SET c.name = row.name,
+                c.timestamp = datetime()
+            WITH c, row
+            MATCH (m:gfz_Module {id: row.module_id})
+            MERGE (m)-[:CONTAINS]->(c)
+        """, chapter_rows)
+        kps = self.writer.write("知识点", """
+            UNWIND $rows AS row
+            MERGE (k:gfz_KnowledgePoint {id: row.kp_id})
+            SET k.name = row.name,
+                k.importance = row.importance,
+                k.timestamp = datetime()
+            WITH k, row
+            MATCH (c:gfz_Chapter {id: row.chapter_id})
+            MERGE (c)-[:CONTAINS]->(k)
+        """, kp_rows)
+        print(f"  ✓ 知识图谱导入完成：模块 {modules}，章节 {chapters}，知识点 {kps}")
     
     def create_indexes(self):
         """创建数据库索引以提高查询性能"""
         print("\n⚡ 创建数据库索引...")
         with self.driver.session() as session:
             try:
-                # 为案例创建索引
+                # 导入时按 id / name MERGE，先建索引避免每行全表扫描
                 session.run("CREATE INDEX IF NOT EXISTS FOR (c:gfz_Case) ON (c.id)")
-                print("  ✓ 创建案例索引")
+                session.run("CREATE INDEX IF NOT EXISTS FOR (m:gfz_Module) ON (m.id)")
+                session.run("CREATE INDEX IF NOT EXISTS FOR (c:gfz_Chapter) ON (c.id)")
+                session.run("CREATE INDEX IF NOT EXISTS FOR (c:gfz_Chapter) ON (c.name)")
+                session.run("CREATE INDEX IF NOT EXISTS FOR (k:gfz_KnowledgePoint) ON (k.id)")
+                print("  ✓ 创建案例和知识图谱索引")
                 
                 # 为知识节点创建索引
                 session.run("CREATE INDEX IF NOT EXISTS FOR (k:gfz_KnowledgeNode) ON (k.id)")
@@ -223,12 +189,25 @@ class DataImporter:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="导入本地案例和知识图谱数据到Neo4j")
+    parser.add_argument("--batch-size", type=int, default=NEO4J_IMPORT_BATCH_SIZE,
+                        help=f"每批写入的行数（默认{NEO4J_IMPORT_BATCH_SIZE}）")
+    parser.add_argument("--dry-run", action="store_true", help="写入进程内替身，不连接数据库")
+    parser.add_argument("--bench", action="store_true", help="演练并统计吞吐量、批次延迟和内存峰值（包含 --dry-run）")
+    parser.add_argument("--scale", type=int, default=1, help="演练时把数据放大的倍数（默认1）")
+    parser.add_argument("--latency", default="fixed:0", help="演练时每条语句的模拟往返延迟（如 fixed:5，单位毫秒）")
+    args = parser.parse_args()
+    
+    dry_run = args.dry_run or args.bench
+    if args.scale > 1 and not dry_run:
+        parser.error("--scale 只能用于 --dry-run / --bench")
+    
     print("=" * 60)
-    print("🚀 Neo4j 数据导入工具")
+    print("🚀 Neo4j 数据导入工具" + ("（演练）" if dry_run else ""))
     print("=" * 60)
     
     # 检查配置
-    if not all([NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD]):
+    if not dry_run and not all([NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD]):
         print("❌ 错误：NEO4J 配置不完整")
         print("请在 .streamlit/secrets.toml 中配置以下内容:")
         print("  NEO4J_URI = 'bolt://...'")
@@ -236,19 +215,33 @@ def main():
         print("  NEO4J_PASSWORD = '...'")
         return False
     
-    print(f"\n连接信息:")
-    print(f"  URI: {NEO4J_URI}")
-    print(f"  Username: {NEO4J_USERNAME}")
+    if not dry_run:
+        print(f"\n连接信息:")
+        print(f"  URI: {NEO4J_URI}")
+        print(f"  Username: {NEO4J_USERNAME}")
     
     try:
-        importer = DataImporter(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD)
-        
-        # 导入数据
-        importer.import_cases()
-        importer.import_knowledge_graph()
+        importer = DataImporter(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, batch_size=args.batch_size,
+                                dry_run=dry_run, latency=args.latency, scale=args.scale)
         
-        # 创建索引
-        importer.create_indexes()
+        # 基准测试的辅助代码只在 --dry-run / --bench 时导入，正常导入（包括在导入流水线中）不加载
+        if args.bench:
+            from scripts.import_bench import Bench
+            bench = Bench(args.scale)
+        else:
+            bench = contextlib.nullcontext()
+        with bench:
+            # 先创建索引，批量 MERGE 才能按索引查找
+            importer.create_indexes()
+            
+            # 导入数据
+            importer.import_cases()
+            importer.import_knowledge_graph()
+        importer.writer.report()
+        if args.bench:
+            stats = importer.writer.stats.values()
+            bench.report(sum(stat['rows'] for stat in stats),
+                         [latency for stat in stats for latency in stat['latencies']])
         
         # 验证结果
         importer.verify_import()
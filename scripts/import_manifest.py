@@ -0,0 +1,120 @@
+"""
+增量导入清单
+记录每个导入目标（某个Neo4j库、某个ES集群）中每条记录写入时的内容哈希。
+再次导入时只写入新增或内容变化的记录，删除数据源中已经不存在的记录，未变化的记录直接跳过；
+解析器修正后重新导入只需写入少量记录，导入过程中数据库也不会被清空
+
+清单文件为JSON：{目标: {类别: {记录ID: 内容哈希}}}
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_DIR = Path(__file__).parent.parent / "data" / "parsed"
+
+
+def record_hash(record):
+    """记录内容哈希（与字段顺序无关）"""
+    raw = json.dumps(record, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ManifestDiff:
+    """一个类别的差异：待写入的记录（新增+修改）和待删除的记录ID"""
+
+    def __init__(self, kind, upserts, deletes, added, changed, unchanged):
+        self.kind = kind
+        self.upserts = upserts
+        self.deletes = deletes
+        self.added = added
+        self.changed = changed
+        self.unchanged = unchanged
+
+    def summary(self):
+        return f"新增 {self.added}，修改 {self.changed}，删除 {len(self.deletes)}，未变 {self.unchanged}"
+
+
+class ImportManifest:
+    """
+    增量导入清单
+
+    Args:
+        name: 清单文件名（不含扩展名），如 "import_manifest_neo4j"
+        target: 导入目标标识（如数据库地址），不同目标的清单互不影响
+        full: 为True时忽略已有记录（全部视为新增），导入完成后重建清单
+        persist: 为False时不读取也不保存清单文件（演练时使用）
+    """
+
+    def __init__(self, name, target, full=False, persist=True):
+        self.path = MANIFEST_DIR / f"{name}.json"
+        self.target = target
+        self.persist = persist
+        self._data = {}
+        if persist and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        if full:
+            self._data[target] = {}
+        self._hashes = self._data.setdefault(target, {})
+
+    def known(self, kind):
+        """已记录的该类别记录数"""
+        return len(self._hashes.get(kind, {}))
+
+    def reset(self, kind):
+        """清空该类别的记录（目标中的数据已不存在时，如索引被重建）"""
+        self._hashes[kind] = {}
+
+    def diff(self, kind, records, key='id'):
+        """
+        比较记录与清单
+
+        Args:
+            kind: 类别（如 "Lesson"）
+            records: 待导入的全部记录（写入目标的行数据）
+            key: 记录ID字段
+
+        Returns:
+            ManifestDiff
+        """
+        old = self._hashes.get(kind, {})
+        # 同一ID出现多次时以最后一条为准（与依次写入目标的结果一致）
+        latest = {record[key]: record for record in records}
+        upserts = []
+        added = changed = 0
+        for record_id, record in latest.items():
+            digest = record_hash(record)
+            if old.get(record_id) == digest:
+                continue
+            if record_id in old:
+                changed += 1
+            else:
+                added += 1
+            upserts.append(record)
+        deletes = [record_id for record_id in old if record_id not in latest]
+        unchanged = len(latest) - added - changed
+        return ManifestDiff(kind, upserts, deletes, added, changed, unchanged)
+
+    def mark_written(self, kind, records, key='id'):
+        """记录已成功写入的记录"""
+        hashes = self._hashes.setdefault(kind, {})
+        for record in records:
+            hashes[record[key]] = record_hash(record)
+
+    def mark_deleted(self, kind, record_ids):
+        """记录已成功删除的记录"""
+        hashes = self._hashes.setdefault(kind, {})
+        for record_id in record_ids:
+            hashes.pop(record_id, None)
+
+    def save(self):
+        """写入清单文件（先写临时文件再替换，中断时不会留下损坏的清单）"""
+        if not self.persist:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,235 @@
+"""
+数据导入流水线
+把导入过程建模为有向无环图（解析 → 整理 → Neo4j导入 / ES导入），依赖都完成的阶段立即开始，
+互不依赖的阶段（两个导入目标）并行执行；每个阶段完成后写入断点文件，失败后用 resume 从失败的阶段继续，
+已完成且上游没有重新执行的阶段直接跳过。结束时打印各阶段耗时
+
+断点文件为JSON：{"stages": {阶段名: {"status", "seconds", "finished_at", "result"}}}；
+按参数跳过的阶段同样记入断点，从断点继续时不需要重复指定
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+
+CHECKPOINT_PATH = Path(__file__).parent.parent / "data" / "parsed" / "import_checkpoint.json"
+
+# 阶段状态
+DONE = "done"            # 本次执行完成
+RESUMED = "resumed"      # 断点中已完成，本次跳过
+SKIPPED = "skipped"      # 按参数跳过（视为已满足，使用已有数据）
+FAILED = "failed"        # 执行出错
+BLOCKED = "blocked"      # 上游阶段失败，未执行
+
+STATUS_NAMES = {
+    DONE: "✓ 完成",
+    RESUMED: "↷ 断点跳过",
+    SKIPPED: "- 跳过",
+    FAILED: "✗ 失败",
+    BLOCKED: "✗ 未执行",
+}
+
+
+class Stage:
+    """
+    流水线阶段
+
+    Args:
+        name: 阶段名（断点文件中的键，也是输出前缀）
+        title: 显示名称
+        func: 无参数的执行函数，返回可JSON序列化的结果摘要（或None），出错时抛出异常
+        deps: 依赖的阶段名
+    """
+
+    def __init__(self, name, title, func, deps=()):
+        self.name = name
+        self.title = title
+        self.func = func
+        self.deps = tuple(deps)
+
+
+class _StageOutput(io.TextIOBase):
+    """按线程给并行阶段的输出加上阶段名前缀，逐行写出，避免两个阶段的输出混在同一行"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def begin(self, prefix):
+        self._local.prefix = prefix
+        self._local.buffer = ''
+
+    def end(self):
+        if getattr(self._local, 'buffer', ''):
+            self.write('\n')
+        self._local.prefix = None
+
+    def write(self, text):
+        prefix = getattr(self._local, 'prefix', None)
+        if prefix is None:
+            with self._lock:
+                self.stream.write(text)
+            return len(text)
+        *lines, self._local.buffer = (self._local.buffer + text).split('\n')
+        if lines:
+            with self._lock:
+                self.stream.write(''.join(f"{prefix}{line}\n" for line in lines))
+                self.stream.flush()
+        return len(text)
+
+    @property
+    def encoding(self):
+        # 各脚本导入时按 sys.stdout.encoding 判断是否需要改用UTF-8输出
+        return getattr(self.stream, 'encoding', 'utf-8')
+
+    def flush(self):
+        self.stream.flush()
+
+
+class ImportPipeline:
+    """
+    导入流水线
+
+    Args:
+        stages: Stage 列表（依赖的阶段必须在列表中）
+        checkpoint_path: 断点文件路径
+        resume: 为True时从断点继续，否则忽略已有断点重新执行全部阶段
+    """
+
+    def __init__(self, stages, checkpoint_path=CHECKPOINT_PATH, resume=False):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"阶段 {stage.name} 依赖的阶段 {dep} 不存在")
+        self.checkpoint_path = Path(checkpoint_path)
+        self.checkpoint = {"stages": {}}
+        if resume and self.checkpoint_path.exists():
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                self.checkpoint = json.load(f)
+        self.resume = resume
+        self.results = {}  # 阶段名 -> {'status', 'seconds', 'error'}
+        self.seconds = 0.0
+
+    def run(self, skip=()):
+        """
+        执行流水线
+
+        Args:
+            skip: 跳过的阶段名（视为已完成，下游使用已有数据）
+
+        Returns:
+            全部阶段成功（完成、断点跳过或按参数跳过）时返回True
+        """
+        if not self.resume:
+            self.checkpoint = {"stages": {}}
+            self._save_checkpoint()
+
+        started = time.perf_counter()
+        pending = dict(self.stages)
+        executed = set()
+        running = {}
+        output = _StageOutput(sys.stdout)
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=len(self.stages)) as pool:
+                while pending or running:
+                    for name, stage in list(pending.items()):
+                        if any(dep not in self.results for dep in stage.deps):
+                            continue
+                        del pending[name]
+                        if any(self.results[dep]['status'] in (FAILED, BLOCKED) for dep in stage.deps):
+                            self._finish(stage, BLOCKED)
+                        elif name in skip:
+                            self._finish(stage, SKIPPED)
+                        elif self._resumable(stage, executed):
+                            self._finish(stage, RESUMED)
+                        else:
+                            executed.add(name)
+                            print(f"\n▶ 开始: {stage.title}")
+                            running[pool.submit(self._run_stage, output, stage)] = stage
+                    if not running:
+                        if pending:
+                            raise ValueError(f"阶段依赖存在环: {', '.join(pending)}")
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        status, seconds, result, error = future.result()
+                        self._finish(stage, status, seconds, result, error)
+        finally:
+            sys.stdout = output.stream
+        self.seconds = time.perf_counter() - started
+        self.report()
+        return all(r['status'] in (DONE, RESUMED, SKIPPED) for r in self.results.values())
+
+    def _resumable(self, stage, executed):
+        """断点中已完成，且上游阶段本次都没有重新执行"""
+        if not self.resume:
+            return False
+        record = self.checkpoint['stages'].get(stage.name)
+        return bool(record) and record.get('status') in (DONE, SKIPPED) and not executed.intersection(stage.deps)
+
+    def _run_stage(self, output, stage):
+        """在线程中执行一个阶段，返回 (状态, 耗时, 结果摘要, 错误)"""
+        output.begin(f"[{stage.name}] ")
+        began = time.perf_counter()
+        try:
+            result = stage.func()
+            return DONE, time.perf_counter() - began, result, None
+        except Exception as e:
+            traceback.print_exc(file=sys.stdout)
+            return FAILED, time.perf_counter() - began, None, str(e) or type(e).__name__
+        finally:
+            output.end()
+
+    def _finish(self, stage, status, seconds=0.0, result=None, error=None):
+        if status == RESUMED:
+            seconds = 0.0
+        self.results[stage.name] = {'status': status, 'seconds': seconds, 'error': error}
+        message = f"{STATUS_NAMES[status]}: {stage.title}"
+        if status == DONE:
+            message += f"（{seconds:.2f}s）"
+        elif error:
+            message += f" - {error}"
+        print(message)
+        if status in (DONE, SKIPPED):
+            self.checkpoint['stages'][stage.name] = {
+                'status': status,
+                'seconds': round(seconds, 3),
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+                'result': result,
+            }
+        elif status in (FAILED, BLOCKED):
+            self.checkpoint['stages'].pop(stage.name, None)
+        self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        """写入断点文件（先写临时文件再替换）"""
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def report(self):
+        """打印各阶段状态和耗时"""
+        print("\n阶段耗时:")
+        print("-" * 50)
+        print(f"{'阶段':<20}{'状态':<14}{'耗时(s)':>10}")
+        total = 0.0
+        for name, stage in self.stages.items():
+            result = self.results.get(name)
+            if not result:
+                continue
+            total += result['seconds']
+            print(f"{stage.title:<20}{STATUS_NAMES[result['status']]:<14}{result['seconds']:>10.2f}")
+        print(f"{'总耗时':<20}{'':<14}{self.seconds:>10.2f}  （各阶段合计 {total:.2f}s）")
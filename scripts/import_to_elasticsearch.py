@@ -1,10 +1,25 @@
 """
 将解析后的历史数据导入Elasticsearch
+
+默认用 _bulk 批量写入（多线程并行发送，每批 ES_BULK_CHUNK_SIZE 条），导入期间关闭自动刷新和副本，
+结束后恢复；写入失败的文档逐条报告。--mode single 为原来的逐条写入，用于对比耗时。
+默认增量导入（见 scripts/import_manifest.py）：只写入内容有变化的文档，删除数据源中已不存在的文档
+
+用法：
+    python scripts/import_to_elasticsearch.py
+    python scripts/import_to_elasticsearch.py --chunk-size 1000 --threads 8
+    python scripts/import_to_elasticsearch.py --full                          # 忽略清单，全部重新写入
+    python scripts/import_to_elasticsearch.py --es-url http://127.0.0.1:9201 --mode single   # 本地模拟服务，见 scripts/mock_es_server.py
+    python scripts/import_to_elasticsearch.py --bench --scale 20   # 写入进程内启动的模拟服务，测吞吐量（见 scripts/import_bench.py）
 """
+import argparse
+import contextlib
+import itertools
 import json
+import time
 from pathlib import Path
 import sys
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
 
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -12,16 +27,50 @@ from config.history_config import (
     ES_CLOUD_ID, ES_USERNAME, ES_PASSWORD,
     ES_INDEX_KNOWLEDGE, ES_INDEX_LESSONS, ES_INDEX_QUESTIONS, ES_INDEX_EVENTS
 )
+from config.settings import ES_BULK_CHUNK_SIZE, ES_BULK_THREADS
+from scripts.import_manifest import ImportManifest
+
+MANIFEST_NAME = "import_manifest_es"
+
+# 数据放大时加后缀的ID字段和引用字段
+SCALE_FIELDS = ('id', 'unit_id', 'lesson_id')
 
 
 class ElasticsearchImporter:
-    """Elasticsearch数据导入器"""
+    """
+    Elasticsearch数据导入器
     
-    def __init__(self):
-        self.es = Elasticsearch(
-            cloud_id=ES_CLOUD_ID,
-            basic_auth=(ES_USERNAME, ES_PASSWORD)
-        )
+    Args:
+        es_url: 直接连接的地址（如本地模拟服务），None时连接配置中的 Elastic Cloud
+        mode: "bulk" 批量写入，"single" 逐条写入
+        chunk_size: 每个 _bulk 请求的文档数
+        threads: 并行发送 _bulk 请求的线程数，1为单线程流式写入
+        full: 为True时忽略增量导入清单，全部重新写入
+        dry_run: 为True时不读写增量导入清单文件（演练，es_url 应指向本地模拟服务）
+        scale: 读取的解析结果放大的倍数（基准测试用）
+    """
+    
+    def __init__(self, es_url=None, mode="bulk", chunk_size=ES_BULK_CHUNK_SIZE, threads=ES_BULK_THREADS, full=False,
+                 dry_run=False, scale=1):
+        if es_url:
+            self.es = Elasticsearch(es_url)
+        else:
+            self.es = Elasticsearch(
+                cloud_id=ES_CLOUD_ID,
+                basic_auth=(ES_USERNAME, ES_PASSWORD)
+            )
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.threads = threads
+        self.stats = {}  # 统计名称 -> {'docs', 'deleted', 'errors': [(文档ID, 错误)], 'seconds'}
+        if dry_run:
+            from scripts.import_bench import dry_run_manifest
+            self.manifest = dry_run_manifest(MANIFEST_NAME)
+        else:
+            self.manifest = ImportManifest(MANIFEST_NAME, es_url or ES_CLOUD_ID, full=full)
+        self.scale = scale
+        self.diffs = []
+        self.created_indexes = set()
         self.data_dir = Path(__file__).parent.parent / "data" / "parsed"
         
         # 检查连接
@@ -51,6 +100,7 @@ class ElasticsearchImporter:
                     }
                 }
             )
+            self.created_indexes.add(ES_INDEX_KNOWLEDGE)
             print(f"  创建索引: {ES_INDEX_KNOWLEDGE}")
         
         # 2. 课文内容索引
@@ -71,6 +121,7 @@ class ElasticsearchImporter:
                     }
                 }
             )
+            self.created_indexes.add(ES_INDEX_LESSONS)
             print(f"  创建索引: {ES_INDEX_LESSONS}")
         
         # 3. 历史事件索引
@@ -91,6 +142,7 @@ class ElasticsearchImporter:
                     }
                 }
             )
+            self.created_indexes.add(ES_INDEX_EVENTS)
             print(f"  创建索引: {ES_INDEX_EVENTS}")
     
     def import_all_data(self):
@@ -99,55 +151,149 @@ class ElasticsearchImporter:
         print("开始导入数据到Elasticsearch...")
         print("="*50)
         
-        # 1. 导入课文内容
-        self._import_lessons()
-        
-        # 2. 导入历史事件
-        self._import_events()
-        
-        # 3. 导入概念（作为知识点）
-        self._import_concepts()
-        
-        # 4. 导入历史人物（作为知识点）
-        self._import_figures()
+        # 批量模式下导入期间关闭自动刷新和副本，结束后恢复
+        indexes = [ES_INDEX_LESSONS, ES_INDEX_EVENTS, ES_INDEX_KNOWLEDGE]
+        with self._bulk_load_settings(indexes) if self.mode == "bulk" else contextlib.nullcontext():
+            # 1. 导入课文内容
+            self._import_lessons()
+            
+            # 2. 导入历史事件
+            self._import_events()
+            
+            # 3. 导入概念（作为知识点）
+            self._import_concepts()
+            
+            # 4. 导入历史人物（作为知识点）
+            self._import_figures()
         
         print("\n" + "="*50)
         print("数据导入完成！")
         print("="*50)
         
-        # 显示统计信息
+        # 显示变化汇总、写入耗时、错误和统计信息
+        self._show_diff_summary()
+        self._show_load_report()
         self._show_statistics()
     
+    @contextlib.contextmanager
+    def _bulk_load_settings(self, indexes):
+        """导入期间 refresh_interval=-1、number_of_replicas=0，结束（包括出错）后恢复原设置并刷新一次"""
+        original = {}
+        for index in indexes:
+            if not self.es.indices.exists(index=index):
+                continue
+            settings = self.es.indices.get_settings(index=index)[index]['settings']['index']
+            original[index] = {
+                "refresh_interval": settings.get("refresh_interval"),  # None表示恢复默认值
+                "number_of_replicas": settings.get("number_of_replicas", "1"),
+            }
+            self.es.indices.put_settings(index=index, settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+        try:
+            yield
+        finally:
+            for index, settings in original.items():
+                try:
+                    self.es.indices.put_settings(index=index, settings={"index": settings})
+                    self.es.indices.refresh(index=index)
+                except Exception as e:
+                    print(f"  警告: 恢复 {index} 的索引设置失败，请手动检查: {e}")
+    
+    def _load_json(self, filename):
+        """读取解析结果，文件不存在时返回None"""
+        file_path = self.data_dir / filename
+        if not file_path.exists():
+            print(f"  警告: {filename} 不存在")
+            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        if self.scale > 1:
+            from scripts.import_bench import scale_records
+            records = scale_records(records, self.scale, SCALE_FIELDS)
+        return records
+    
+    def _index_documents(self, name, index, docs):
+        """
+        增量写入文档：只写入新增或内容变化的文档，删除数据源中已不存在的文档（见 scripts/import_manifest.py）
+        
+        Args:
+            name: 统计名称（也用于区分同一索引中的不同类别）
+            index: 索引名
+            docs: 文档（每个文档含 id 字段，作为 _id）
+        
+        Returns:
+            成功写入的文档数
+        """
+        kind = f"{index}:{name}"
+        if index in self.created_indexes:
+            # 索引是本次新建的，清单中的记录作废
+            self.manifest.reset(kind)
+        diff = self.manifest.diff(kind, list(docs))
+        self.diffs.append((name, diff))
+        print(f"  {name}: {diff.summary()}")
+        
+        stat = self.stats.setdefault(name, {'docs': 0, 'deleted': 0, 'errors': [], 'seconds': 0.0})
+        began = time.perf_counter()
+        
+        if self.mode == "single":
+            # 逐条写入（旧方式，保留用于对比耗时）
+            for doc in diff.upserts:
+                try:
+                    self.es.index(index=index, id=doc['id'], document=doc)
+                    self.manifest.mark_written(kind, [doc])
+                    stat['docs'] += 1
+                except Exception as e:
+                    stat['errors'].append((doc['id'], str(e)))
+            for doc_id in diff.deletes:
+                try:
+                    self.es.options(ignore_status=404).delete(index=index, id=doc_id)
+                    self.manifest.mark_deleted(kind, [doc_id])
+                    stat['deleted'] += 1
+                except Exception as e:
+                    stat['errors'].append((doc_id, str(e)))
+        else:
+            by_id = {doc['id']: doc for doc in diff.upserts}
+            actions = itertools.chain(
+                ({"_index": index, "_id": doc['id'], "_source": doc} for doc in diff.upserts),
+                ({"_op_type": "delete", "_index": index, "_id": doc_id} for doc_id in diff.deletes),
+            )
+            options = {"chunk_size": self.chunk_size, "raise_on_error": False, "raise_on_exception": False}
+            if self.threads > 1:
+                results = helpers.parallel_bulk(self.es, actions, thread_count=self.threads, **options)
+            else:
+                results = helpers.streaming_bulk(self.es, actions, **options)
+            for ok, item in results:
+                op, info = next(iter(item.items()))
+                if op == 'delete' and (ok or info.get('status') == 404):
+                    # 要删除的文档已不存在，同样视为删除成功
+                    self.manifest.mark_deleted(kind, [info.get('_id')])
+                    stat['deleted'] += 1
+                elif ok:
+                    self.manifest.mark_written(kind, [by_id[info.get('_id')]])
+                    stat['docs'] += 1
+                else:
+                    stat['errors'].append((info.get('_id'), info.get('error') or info.get('exception')))
+        
+        stat['seconds'] += time.perf_counter() - began
+        self.manifest.save()
+        return stat['docs']
+    
     def _import_lessons(self):
         """导入课文内容"""
         print("\n[1/4] 导入课文内容...")
         
-        lessons_file = self.data_dir / "lessons.json"
-        if not lessons_file.exists():
-            print("  警告: lessons.json 不存在")
+        lessons = self._load_json("lessons.json")
+        if lessons is None:
             return
         
-        with open(lessons_file, 'r', encoding='utf-8') as f:
-            lessons = json.load(f)
-        
-        count = 0
-        for lesson in lessons:
-            doc = {
-                "id": lesson['id'],
-                "title": lesson['title'],
-                "content": lesson.get('content', ''),
-                "book_id": lesson['book_id'],
-                "book_name": lesson['book_name'],
-                "unit_id": lesson.get('unit_id'),
-                "lesson_number": lesson['lesson_number']
-            }
-            
-            self.es.index(
-                index=ES_INDEX_LESSONS,
-                id=lesson['id'],
-                document=doc
-            )
-            count += 1
+        count = self._index_documents("课文", ES_INDEX_LESSONS, ({
+            "id": lesson['id'],
+            "title": lesson['title'],
+            "content": lesson.get('content', ''),
+            "book_id": lesson['book_id'],
+            "book_name": lesson['book_name'],
+            "unit_id": lesson.get('unit_id'),
+            "lesson_number": lesson['lesson_number']
+        } for lesson in lessons))
         
         print(f"  导入了 {count} 课内容")
     
@@ -155,30 +301,17 @@ class ElasticsearchImporter:
         """导入历史事件"""
         print("\n[2/4] 导入历史事件...")
         
-        events_file = self.data_dir / "historical_events.json"
-        if not events_file.exists():
-            print("  警告: historical_events.json 不存在")
+        events = self._load_json("historical_events.json")
+        if events is None:
             return
         
-        with open(events_file, 'r', encoding='utf-8') as f:
-            events = json.load(f)
-        
-        count = 0
-        for event in events:
-            doc = {
-                "id": event['id'],
-                "year": event['year'],
-                "description": event['description'],
-                "lesson_id": event['lesson_id'],
-                "book_id": event['book_id']
-            }
-            
-            self.es.index(
-                index=ES_INDEX_EVENTS,
-                id=event['id'],
-                document=doc
-            )
-            count += 1
+        count = self._index_documents("历史事件", ES_INDEX_EVENTS, ({
+            "id": event['id'],
+            "year": event['year'],
+            "description": event['description'],
+            "lesson_id": event['lesson_id'],
+            "book_id": event['book_id']
+        } for event in events))
         
         print(f"  导入了 {count} 个历史事件")
     
@@ -186,31 +319,18 @@ class ElasticsearchImporter:
         """导入概念"""
         print("\n[3/4] 导入概念...")
         
-        concepts_file = self.data_dir / "concepts.json"
-        if not concepts_file.exists():
-            print("  警告: concepts.json 不存在")
+        concepts = self._load_json("concepts.json")
+        if concepts is None:
             return
         
-        with open(concepts_file, 'r', encoding='utf-8') as f:
-            concepts = json.load(f)
-        
-        count = 0
-        for concept in concepts:
-            doc = {
-                "id": concept['id'],
-                "term": concept['term'],
-                "description": "",
-                "category": "概念",
-                "lesson_id": concept['lesson_id'],
-                "book_id": concept['book_id']
-            }
-            
-            self.es.index(
-                index=ES_INDEX_KNOWLEDGE,
-                id=concept['id'],
-                document=doc
-            )
-            count += 1
+        count = self._index_documents("概念", ES_INDEX_KNOWLEDGE, ({
+            "id": concept['id'],
+            "term": concept['term'],
+            "description": "",
+            "category": "概念",
+            "lesson_id": concept['lesson_id'],
+            "book_id": concept['book_id']
+        } for concept in concepts))
         
         print(f"  导入了 {count} 个概念")
     
@@ -218,34 +338,47 @@ class ElasticsearchImporter:
         """导入历史人物"""
         print("\n[4/4] 导入历史人物...")
         
-        figures_file = self.data_dir / "historical_figures.json"
-        if not figures_file.exists():
-            print("  警告: historical_figures.json 不存在")
+        figures = self._load_json("historical_figures.json")
+        if figures is None:
             return
         
-        with open(figures_file, 'r', encoding='utf-8') as f:
-            figures = json.load(f)
-        
-        count = 0
-        for figure in figures:
-            doc = {
-                "id": figure['id'],
-                "term": figure['name'],
-                "description": figure['description'],
-                "category": "历史人物",
-                "lesson_id": figure['lesson_id'],
-                "book_id": figure['book_id']
-            }
-            
-            self.es.index(
-                index=ES_INDEX_KNOWLEDGE,
-                id=figure['id'],
-                document=doc
-            )
-            count += 1
+        count = self._index_documents("历史人物", ES_INDEX_KNOWLEDGE, ({
+            "id": figure['id'],
+            "term": figure['name'],
+            "description": figure['description'],
+            "category": "历史人物",
+            "lesson_id": figure['lesson_id'],
+            "book_id": figure['book_id']
+        } for figure in figures))
         
         print(f"  导入了 {count} 个历史人物")
     
+    def _show_diff_summary(self):
+        """显示各类文档的变化"""
+        print("\n变化汇总:")
+        print("-"*50)
+        for name, diff in self.diffs:
+            print(f"{name}: {diff.summary()}")
+    
+    def _show_load_report(self, max_errors=10):
+        """显示各类文档的写入数量、耗时、吞吐量和失败的文档"""
+        print(f"\n写入统计（{'批量' if self.mode == 'bulk' else '逐条'}写入）:")
+        print("-"*50)
+        total_docs = 0
+        total_seconds = 0.0
+        for name, stat in self.stats.items():
+            rate = stat['docs'] / stat['seconds'] if stat['seconds'] else 0.0
+            print(f"{name}: 写入 {stat['docs']} 条，删除 {stat['deleted']} 条，失败 {len(stat['errors'])} 条，"
+                  f"耗时 {stat['seconds']:.2f}s，{rate:.0f} 条/秒")
+            for doc_id, error in stat['errors'][:max_errors]:
+                print(f"    ✗ {doc_id}: {error}")
+            if len(stat['errors']) > max_errors:
+                print(f"    ... 另有 {len(stat['errors']) - max_errors} 条失败")
+            total_docs += stat['docs']
+            total_seconds += stat['seconds']
+        rate = total_docs / total_seconds if total_seconds else 0.0
+        print(f"合计: {total_docs} 条，耗时 {total_seconds:.2f}s，{rate:.0f} 条/秒")
+    
     def _show_statistics(self):
         """显示索引统计信息"""
         print("\nElasticsearch索引统计:")
@@ -308,16 +441,59 @@ class ElasticsearchImporter:
 
 
 def main():
-    importer = ElasticsearchImporter()
+    parser = argparse.ArgumentParser(description="将解析后的历史数据导入Elasticsearch")
+    parser.add_argument("--es-url", default=None, help="直接连接的地址（如本地模拟服务 http://127.0.0.1:9201），默认连接 Elastic Cloud")
+    parser.add_argument("--mode", choices=["bulk", "single"], default="bulk", help="bulk 批量写入（默认），single 逐条写入")
+    parser.add_argument("--chunk-size", type=int, default=ES_BULK_CHUNK_SIZE, help=f"每个 _bulk 请求的文档数（默认{ES_BULK_CHUNK_SIZE}）")
+    parser.add_argument("--threads", type=int, default=ES_BULK_THREADS, help=f"并行写入线程数（默认{ES_BULK_THREADS}）")
+    parser.add_argument("--full", action="store_true", help="忽略增量导入清单，全部重新写入")
+    parser.add_argument("--skip-test", action="store_true", help="导入后不测试搜索")
+    parser.add_argument("--dry-run", action="store_true", help="写入进程内启动的模拟服务（未指定 --es-url 时），不读写增量导入清单")
+    parser.add_argument("--bench", action="store_true", help="演练并统计吞吐量、请求延迟和内存峰值（包含 --dry-run）")
+    parser.add_argument("--scale", type=int, default=1, help="演练时把解析结果放大的倍数（默认1）")
+    parser.add_argument("--latency", default="fixed:0", help="演练时模拟服务每个请求的延迟（如 fixed:20，单位毫秒）")
+    args = parser.parse_args()
     
-    # 创建索引
-    importer.create_indexes()
+    dry_run = args.dry_run or args.bench
+    if args.scale > 1 and not dry_run:
+        parser.error("--scale 只能用于 --dry-run / --bench")
     
-    # 导入所有数据
-    importer.import_all_data()
+    es_url = args.es_url
+    server = None
+    if dry_run and not es_url:
+        from scripts.mock_es_server import MockIndices, start_server
+        
+        server = start_server(MockIndices(latency=args.latency, per_doc=0, refresh_cost=0, keep_source=False), port=0)
+        es_url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"演练：写入本地模拟服务 {es_url}")
     
-    # 测试搜索
-    importer.test_search()
+    try:
+        importer = ElasticsearchImporter(es_url=es_url, mode=args.mode, chunk_size=args.chunk_size, threads=args.threads,
+                                         full=args.full, dry_run=dry_run, scale=args.scale)
+        
+        # 基准测试的辅助代码只在 --dry-run / --bench 时导入，正常导入（包括在导入流水线中）不加载
+        if args.bench:
+            from scripts.import_bench import Bench, record_es_requests
+            latencies = record_es_requests(importer.es, ('_bulk',) if args.mode == "bulk" else ('/_doc/',))
+            bench = Bench(args.scale)
+        else:
+            bench = contextlib.nullcontext()
+        with bench:
+            # 创建索引
+            importer.create_indexes()
+            
+            # 导入所有数据
+            importer.import_all_data()
+        
+        if args.bench:
+            bench.report(sum(stat['docs'] + stat['deleted'] for stat in importer.stats.values()), latencies)
+        
+        # 测试搜索
+        if not args.skip_test:
+            importer.test_search()
+    finally:
+        if server:
+            server.shutdown()
 
 
 if __name__ == "__main__":
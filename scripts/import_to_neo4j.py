@@ -1,6 +1,19 @@
 """
 将解析后的历史数据导入Neo4j知识图谱
+
+节点按批用 UNWIND 写入（见 scripts/neo4j_batch.py），节点与其上级的关系在同一条语句中创建；
+节点按 id MERGE，重复导入不会产生重复节点。
+默认增量导入（见 scripts/import_manifest.py）：只写入内容有变化的节点，删除数据源中已不存在的节点，
+导入过程中数据库不会被清空
+
+用法：
+    python scripts/import_to_neo4j.py                     # 增量导入
+    python scripts/import_to_neo4j.py --full              # 忽略清单，全部重新写入
+    python scripts/import_to_neo4j.py --batch-size 5000 --clear
+    python scripts/import_to_neo4j.py --bench --scale 20   # 写入进程内替身，测吞吐量（见 scripts/import_bench.py）
 """
+import argparse
+import contextlib
 import json
 from pathlib import Path
 import sys
@@ -9,16 +22,43 @@ from neo4j import GraphDatabase
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config.history_config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from config.settings import NEO4J_IMPORT_BATCH_SIZE
+from scripts.neo4j_batch import BatchWriter
+from scripts.import_manifest import ImportManifest
+
+MANIFEST_NAME = "import_manifest_neo4j"
+
+# 数据放大时加后缀的ID字段和引用字段
+SCALE_FIELDS = ('id', 'unit_id', 'lesson_id')
 
 
 class Neo4jImporter:
-    """Neo4j数据导入器"""
+    """
+    Neo4j数据导入器
+    
+    Args:
+        batch_size: 每批写入的行数
+        full: 为True时忽略增量导入清单，全部重新写入
+        dry_run: 为True时写入进程内替身 FakeNeo4jDriver，不连接数据库、不读写清单文件
+        latency: 演练时每条语句的模拟往返延迟
+        scale: 读取的解析结果放大的倍数（基准测试用）
+    """
     
-    def __init__(self):
-        self.driver = GraphDatabase.driver(
-            NEO4J_URI,
-            auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
-        )
+    def __init__(self, batch_size=NEO4J_IMPORT_BATCH_SIZE, full=False, dry_run=False, latency="fixed:0", scale=1):
+        self.dry_run = dry_run
+        self.scale = scale
+        if dry_run:
+            from scripts.import_bench import FakeNeo4jDriver, dry_run_manifest
+            self.driver = FakeNeo4jDriver(latency)
+            self.manifest = dry_run_manifest(MANIFEST_NAME)
+        else:
+            self.driver = GraphDatabase.driver(
+                NEO4J_URI,
+                auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
+            )
+            self.manifest = ImportManifest(MANIFEST_NAME, NEO4J_URI, full=full)
+        self.writer = BatchWriter(self.driver, batch_size)
+        self.diffs = []
         self.data_dir = Path(__file__).parent.parent / "data" / "parsed"
     
     def close(self):
@@ -28,8 +68,18 @@ class Neo4jImporter:
         """清空数据库"""
         with self.driver.session() as session:
             print("清空现有数据...")
-            session.run("MATCH (n) DETACH DELETE n")
+            # 分批删除，避免大库一次删除占满事务内存
+            session.run("""
+                MATCH (n)
+                CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF $batch_size ROWS
+            """, batch_size=self.writer.batch_size).consume()
             print("数据库已清空")
+        # 数据库已空，清单中的记录全部作废
+        if self.dry_run:
+            from scripts.import_bench import dry_run_manifest
+            self.manifest = dry_run_manifest(MANIFEST_NAME)
+        else:
+            self.manifest = ImportManifest(MANIFEST_NAME, NEO4J_URI, full=True)
     
     def create_indexes(self):
         """创建索引以提升查询性能"""
@@ -69,7 +119,7 @@ class Neo4jImporter:
         self._import_lessons()
         
         # 4. 导入历史事件
-        self._import_events()
+        events_diff = self._import_events()
         
         # 5. 导入历史人物
         self._import_figures()
@@ -77,219 +127,203 @@ class Neo4jImporter:
         # 6. 导入概念
         self._import_concepts()
         
-        # 7. 创建时间线关系
-        self._create_timeline_relationships()
+        # 7. 创建时间线关系（事件有变化时重建）
+        if events_diff is None or events_diff.upserts or events_diff.deletes:
+            self._create_timeline_relationships()
+        else:
+            print("\n[7/7] 事件没有变化，跳过时间线关系")
         
         print("\n" + "="*50)
         print("数据导入完成！")
         print("="*50)
         
-        # 显示统计信息
+        # 显示变化汇总、写入吞吐量和统计信息
+        self._show_diff_summary()
+        self.writer.report()
         self._show_statistics()
     
+    def _sync(self, name, label, rows, upsert_query):
+        """
+        增量写入一类节点：只写入新增或内容变化的行，删除数据源中已不存在的节点
+        
+        Args:
+            name: 显示名称
+            label: 节点标签（也是清单中的类别）
+            rows: 全部行数据（含 id）
+            upsert_query: 写入语句（UNWIND $rows AS row ...）
+        
+        Returns:
+            ManifestDiff
+        """
+        if self.manifest.known(label) and self._count_label(label) == 0:
+            # 数据库中已没有该类节点（被清空过），清单中的记录作废
+            self.manifest.reset(label)
+        diff = self.manifest.diff(label, rows)
+        print(f"  {name}: {diff.summary()}")
+        
+        self.writer.write(name, upsert_query, diff.upserts,
+                          on_batch=lambda batch: self.manifest.mark_written(label, batch))
+        self.writer.write(f"{name}(删除)", f"""
+            UNWIND $rows AS row
+            MATCH (n:{label} {{id: row.id}})
+            DETACH DELETE n
+        """, [{'id': record_id} for record_id in diff.deletes],
+                          on_batch=lambda batch: self.manifest.mark_deleted(label, [row['id'] for row in batch]))
+        self.manifest.save()
+        self.diffs.append((name, diff))
+        return diff
+    
+    def _count_label(self, label):
+        with self.driver.session() as session:
+            return session.run(f"MATCH (n:{label}) RETURN count(n) AS count").single()['count']
+    
+    def _show_diff_summary(self):
+        """显示各类节点的变化"""
+        print("\n变化汇总:")
+        print("-"*50)
+        for name, diff in self.diffs:
+            print(f"{name}: {diff.summary()}")
+    
+    def _load_json(self, filename):
+        """读取解析结果，文件不存在时返回None"""
+        file_path = self.data_dir / filename
+        if not file_path.exists():
+            print(f"  警告: {filename} 不存在")
+            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        if self.scale > 1:
+            from scripts.import_bench import scale_records
+            records = scale_records(records, self.scale, SCALE_FIELDS)
+        return records
+    
     def _import_textbooks(self):
         """导入教科书节点"""
         from config.history_config import TEXTBOOKS
         
         print("\n[1/7] 导入教科书...")
         
-        with self.driver.session() as session:
-            for book_id, book_info in TEXTBOOKS.items():
-                session.run("""
-                    CREATE (b:Textbook {
-                        id: $id,
-                        name: $name,
-                        type: $type,
-                        description: $description
-                    })
-                """, id=book_id, **book_info)
-        
-        print(f"  导入了 {len(TEXTBOOKS)} 本教科书")
+        rows = [{'id': book_id, 'props': dict(book_info, id=book_id)} for book_id, book_info in TEXTBOOKS.items()]
+        self._sync("教科书", "Textbook", rows, """
+            UNWIND $rows AS row
+            MERGE (b:Textbook {id: row.id})
+            SET b = row.props
+        """)
     
     def _import_units(self):
-        """导入单元"""
+        """导入单元（同时创建教科书与单元的关系）"""
         print("\n[2/7] 导入单元...")
         
-        units_file = self.data_dir / "units.json"
-        if not units_file.exists():
-            print("  警告: units.json 不存在")
+        units = self._load_json("units.json")
+        if units is None:
             return
         
-        with open(units_file, 'r', encoding='utf-8') as f:
-            units = json.load(f)
-        
-        with self.driver.session() as session:
-            for unit in units:
-                # 创建单元节点
-                session.run("""
-                    CREATE (u:Unit {
-                        id: $id,
-                        book_id: $book_id,
-                        book_name: $book_name,
-                        unit_number: $unit_number,
-                        title: $title
-                    })
-                """, **unit)
-                
-                # 创建教科书与单元的关系
-                session.run("""
-                    MATCH (b:Textbook {id: $book_id})
-                    MATCH (u:Unit {id: $unit_id})
-                    CREATE (b)-[:HAS_UNIT]->(u)
-                """, book_id=unit['book_id'], unit_id=unit['id'])
-        
-        print(f"  导入了 {len(units)} 个单元")
+        rows = [{
+            'id': unit['id'],
+            'book_id': unit['book_id'],
+            'props': {
+                'id': unit['id'],
+                'book_id': unit['book_id'],
+                'book_name': unit.get('book_name'),
+                'unit_number': unit.get('unit_number'),
+                'title': unit.get('title'),
+            }
+        } for unit in units]
+        # 内容变化的单元可能换了所属教材，先删除原来的关系
+        self._sync("单元", "Unit", rows, """
+            UNWIND $rows AS row
+            MERGE (u:Unit {id: row.id})
+            SET u = row.props
+            WITH u, row
+            OPTIONAL MATCH (:Textbook)-[old:HAS_UNIT]->(u)
+            DELETE old
+            WITH DISTINCT u, row
+            MATCH (b:Textbook {id: row.book_id})
+            MERGE (b)-[:HAS_UNIT]->(u)
+        """)
     
     def _import_lessons(self):
-        """导入课文"""
+        """导入课文（同时创建单元与课文的关系）"""
         print("\n[3/7] 导入课文...")
         
-        lessons_file = self.data_dir / "lessons.json"
-        if not lessons_file.exists():
-            print("  警告: lessons.json 不存在")
+        lessons = self._load_json("lessons.json")
+        if lessons is None:
             return
         
-        with open(lessons_file, 'r', encoding='utf-8') as f:
-            lessons = json.load(f)
+        # 课文节点不包含完整内容（太大），只保存前200字
+        rows = [{
+            'id': lesson['id'],
+            'unit_id': lesson.get('unit_id'),
+            'props': {
+                'id': lesson['id'],
+                'book_id': lesson['book_id'],
+                'book_name': lesson['book_name'],
+                'unit_id': lesson.get('unit_id'),
+                'lesson_number': lesson['lesson_number'],
+                'title': lesson['title'],
+                'content_preview': lesson['content'][:200] if lesson.get('content') else "",
+            }
+        } for lesson in lessons]
+        self._sync("课文", "Lesson", rows, """
+            UNWIND $rows AS row
+            MERGE (l:Lesson {id: row.id})
+            SET l = row.props
+            WITH l, row
+            OPTIONAL MATCH (:Unit)-[old:HAS_LESSON]->(l)
+            DELETE old
+            WITH DISTINCT l, row
+            WHERE row.unit_id IS NOT NULL
+            MATCH (u:Unit {id: row.unit_id})
+            MERGE (u)-[:HAS_LESSON]->(l)
+        """)
+    
+    def _import_lesson_items(self, step, name, filename, label, rel_type, fields):
+        """导入挂在课文下的节点（事件、人物、概念），同时创建课文到节点的关系"""
+        print(f"\n[{step}/7] 导入{name}...")
         
-        with self.driver.session() as session:
-            for lesson in lessons:
-                # 创建课文节点（不包含完整内容，太大）
-                session.run("""
-                    CREATE (l:Lesson {
-                        id: $id,
-                        book_id: $book_id,
-                        book_name: $book_name,
-                        unit_id: $unit_id,
-                        lesson_number: $lesson_number,
-                        title: $title,
-                        content_preview: $content_preview
-                    })
-                """, 
-                    id=lesson['id'],
-                    book_id=lesson['book_id'],
-                    book_name=lesson['book_name'],
-                    unit_id=lesson.get('unit_id'),
-                    lesson_number=lesson['lesson_number'],
-                    title=lesson['title'],
-                    content_preview=lesson['content'][:200] if lesson.get('content') else ""
-                )
-                
-                # 创建单元与课文的关系
-                if lesson.get('unit_id'):
-                    session.run("""
-                        MATCH (u:Unit {id: $unit_id})
-                        MATCH (l:Lesson {id: $lesson_id})
-                        CREATE (u)-[:HAS_LESSON]->(l)
-                    """, unit_id=lesson['unit_id'], lesson_id=lesson['id'])
+        items = self._load_json(filename)
+        if items is None:
+            return
         
-        print(f"  导入了 {len(lessons)} 课")
+        rows = [{
+            'id': item['id'],
+            'lesson_id': item.get('lesson_id'),
+            'props': {field: item.get(field) for field in fields},
+        } for item in items]
+        return self._sync(name, label, rows, f"""
+            UNWIND $rows AS row
+            MERGE (n:{label} {{id: row.id}})
+            SET n = row.props
+            WITH n, row
+            OPTIONAL MATCH (:Lesson)-[old:{rel_type}]->(n)
+            DELETE old
+            WITH DISTINCT n, row
+            MATCH (l:Lesson {{id: row.lesson_id}})
+            MERGE (l)-[:{rel_type}]->(n)
+        """)
     
     def _import_events(self):
         """导入历史事件"""
-        print("\n[4/7] 导入历史事件...")
-        
-        events_file = self.data_dir / "historical_events.json"
-        if not events_file.exists():
-            print("  警告: historical_events.json 不存在")
-            return
-        
-        with open(events_file, 'r', encoding='utf-8') as f:
-            events = json.load(f)
-        
-        with self.driver.session() as session:
-            for event in events:
-                # 创建事件节点
-                session.run("""
-                    CREATE (e:HistoricalEvent {
-                        id: $id,
-                        year: $year,
-                        description: $description,
-                        lesson_id: $lesson_id,
-                        book_id: $book_id
-                    })
-                """, **event)
-                
-                # 创建课文与事件的关系
-                session.run("""
-                    MATCH (l:Lesson {id: $lesson_id})
-                    MATCH (e:HistoricalEvent {id: $event_id})
-                    CREATE (l)-[:MENTIONS_EVENT]->(e)
-                """, lesson_id=event['lesson_id'], event_id=event['id'])
-        
-        print(f"  导入了 {len(events)} 个历史事件")
+        return self._import_lesson_items(4, "历史事件", "historical_events.json", "HistoricalEvent", "MENTIONS_EVENT",
+                                         ['id', 'year', 'description', 'lesson_id', 'book_id'])
     
     def _import_figures(self):
         """导入历史人物"""
-        print("\n[5/7] 导入历史人物...")
-        
-        figures_file = self.data_dir / "historical_figures.json"
-        if not figures_file.exists():
-            print("  警告: historical_figures.json 不存在")
-            return
-        
-        with open(figures_file, 'r', encoding='utf-8') as f:
-            figures = json.load(f)
-        
-        with self.driver.session() as session:
-            for figure in figures:
-                # 创建人物节点
-                session.run("""
-                    MERGE (f:HistoricalFigure {id: $id})
-                    SET f.name = $name,
-                        f.description = $description,
-                        f.lesson_id = $lesson_id,
-                        f.book_id = $book_id
-                """, **figure)
-                
-                # 创建课文与人物的关系
-                session.run("""
-                    MATCH (l:Lesson {id: $lesson_id})
-                    MATCH (f:HistoricalFigure {id: $figure_id})
-                    MERGE (l)-[:MENTIONS_FIGURE]->(f)
-                """, lesson_id=figure['lesson_id'], figure_id=figure['id'])
-        
-        print(f"  导入了 {len(figures)} 个历史人物")
+        self._import_lesson_items(5, "历史人物", "historical_figures.json", "HistoricalFigure", "MENTIONS_FIGURE",
+                                  ['id', 'name', 'description', 'lesson_id', 'book_id'])
     
     def _import_concepts(self):
         """导入概念"""
-        print("\n[6/7] 导入概念...")
-        
-        concepts_file = self.data_dir / "concepts.json"
-        if not concepts_file.exists():
-            print("  警告: concepts.json 不存在")
-            return
-        
-        with open(concepts_file, 'r', encoding='utf-8') as f:
-            concepts = json.load(f)
-        
-        with self.driver.session() as session:
-            for concept in concepts:
-                # 创建概念节点
-                session.run("""
-                    CREATE (c:Concept {
-                        id: $id,
-                        term: $term,
-                        lesson_id: $lesson_id,
-                        book_id: $book_id
-                    })
-                """, **concept)
-                
-                # 创建课文与概念的关系
-                session.run("""
-                    MATCH (l:Lesson {id: $lesson_id})
-                    MATCH (c:Concept {id: $concept_id})
-                    CREATE (l)-[:DEFINES_CONCEPT]->(c)
-                """, lesson_id=concept['lesson_id'], concept_id=concept['id'])
-        
-        print(f"  导入了 {len(concepts)} 个概念")
+        self._import_lesson_items(6, "概念", "concepts.json", "Concept", "DEFINES_CONCEPT",
+                                  ['id', 'term', 'lesson_id', 'book_id'])
     
     def _create_timeline_relationships(self):
         """创建时间线关系（事件之间的先后顺序）"""
         print("\n[7/7] 创建时间线关系...")
         
         with self.driver.session() as session:
-            # 根据年份排序，创建NEXT关系
+            # 先删除原有的NEXT关系（事件增删改后顺序会变化），再根据年份排序重建
+            session.run("MATCH ()-[r:NEXT]->() DELETE r").consume()
             result = session.run("""
                 MATCH (e:HistoricalEvent)
                 WHERE e.year IS NOT NULL
@@ -329,20 +363,46 @@ class Neo4jImporter:
 
 
 def main():
-    importer = Neo4jImporter()
+    parser = argparse.ArgumentParser(description="将解析后的历史数据导入Neo4j")
+    parser.add_argument("--batch-size", type=int, default=NEO4J_IMPORT_BATCH_SIZE,
+                        help=f"每批写入的行数（默认{NEO4J_IMPORT_BATCH_SIZE}）")
+    parser.add_argument("--full", action="store_true", help="忽略增量导入清单，全部重新写入")
+    parser.add_argument("--clear", action="store_true", help="导入前清空数据库（导入期间数据库为空，一般不需要）")
+    parser.add_argument("--dry-run", action="store_true", help="写入进程内替身，不连接数据库")
+    parser.add_argument("--bench", action="store_true", help="演练并统计吞吐量、批次延迟和内存峰值（包含 --dry-run）")
+    parser.add_argument("--scale", type=int, default=1, help="演练时把解析结果放大的倍数（默认1）")
+    parser.add_argument("--latency", default="fixed:0", help="演练时每条语句的模拟往返延迟（如 fixed:5，单位毫秒）")
+    args = parser.parse_args()
+    
+    dry_run = args.dry_run or args.bench
+    if args.scale > 1 and not dry_run:
+        parser.error("--scale 只能用于 --dry-run / --bench")
+    
+    importer = Neo4jImporter(batch_size=args.batch_size, full=args.full, dry_run=dry_run, latency=args.latency,
+                             scale=args.scale)
     
     try:
-        # 清空数据库
-        response = input("是否清空现有数据库？(yes/no): ")
-        if response.lower() == 'yes':
-            importer.clear_database()
-        
-        # 创建索引
-        importer.create_indexes()
-        
-        # 导入所有数据
-        importer.import_all_data()
+        # 基准测试的辅助代码只在 --dry-run / --bench 时导入，正常导入（包括在导入流水线中）不加载
+        if args.bench:
+            from scripts.import_bench import Bench
+            bench = Bench(args.scale)
+        else:
+            bench = contextlib.nullcontext()
+        with bench:
+            # 清空数据库
+            if args.clear:
+                importer.clear_database()
+            
+            # 创建索引
+            importer.create_indexes()
+            
+            # 导入所有数据
+            importer.import_all_data()
         
+        if args.bench:
+            stats = importer.writer.stats.values()
+            bench.report(sum(stat['rows'] for stat in stats),
+                         [latency for stat in stats for latency in stat['latencies']])
     finally:
         importer.close()
 
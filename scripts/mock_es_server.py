@@ -0,0 +1,283 @@
+"""
+本地模拟 Elasticsearch 服务
+用于在不连接 Elastic Cloud 的情况下测试和对比数据导入脚本（逐条写入 vs 批量写入）的耗时
+
+支持：
+- HEAD / 与 GET /（连接检查）
+- 索引的创建、存在检查、_settings 读取与修改、_refresh、_count、_search（返回空结果）
+- 单条写入和删除 PUT/POST/DELETE /<索引>/_doc/<ID>
+- 批量写入 POST /_bulk 与 POST /<索引>/_bulk（NDJSON，index/create/delete，逐条返回结果）
+- 可配置的请求延迟（模拟网络往返）和每条文档的写入开销；按比例注入单条文档写入错误
+- refresh_interval 不为 -1 时，每次写入额外计入一次刷新开销
+
+用法：
+    python scripts/mock_es_server.py --port 9201 --latency fixed:20 --per-doc 0.2
+    python scripts/import_to_elasticsearch.py --es-url http://127.0.0.1:9201 --mode single
+    python scripts/import_to_elasticsearch.py --es-url http://127.0.0.1:9201
+
+    --latency 格式同 scripts/mock_llm_server.py
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.mock_llm_server import parse_latency
+
+# elasticsearch-py 8.x 校验响应头中的产品标识
+PRODUCT_HEADERS = {"X-Elastic-Product": "Elasticsearch"}
+
+
+class MockIndices:
+    """模拟服务的索引数据和行为参数"""
+
+    def __init__(self, latency="fixed:20", per_doc=0.2, refresh_cost=5.0, doc_error=0.0, seed=None, keep_source=True):
+        self.sample_latency = parse_latency(latency)
+        self.keep_source = keep_source  # 为False时只记录文档ID（进程内基准测试时不让模拟服务的存储计入内存峰值）
+        self.per_doc = per_doc / 1000
+        self.refresh_cost = refresh_cost / 1000
+        self.doc_error = doc_error
+        self._lock = threading.Lock()
+        self.indices = {}  # 索引名 -> {'settings': {...}, 'docs': {ID: 文档}}
+        self.counters = {'requests': 0, 'bulk_requests': 0, 'docs': 0, 'doc_errors': 0, 'refreshes': 0}
+        if seed is not None:
+            random.seed(seed)
+
+    def count(self, key, delta=1):
+        with self._lock:
+            self.counters[key] += delta
+
+    def create(self, name, body=None):
+        with self._lock:
+            if name in self.indices:
+                return False
+            settings = {"refresh_interval": "1s", "number_of_replicas": "1", "number_of_shards": "1"}
+            settings.update(((body or {}).get('settings') or {}).get('index', {}))
+            self.indices[name] = {'settings': settings, 'docs': {}}
+            return True
+
+    def index_doc(self, name, doc_id, source):
+        """写入一条文档，返回 (状态码, 错误或None)；索引不存在时自动创建"""
+        if random.random() < self.doc_error:
+            self.count('doc_errors')
+            return 400, {"type": "mapper_parsing_exception", "reason": "failed to parse (mock)"}
+        self.create(name)
+        with self._lock:
+            docs = self.indices[name]['docs']
+            status = 200 if doc_id in docs else 201
+            docs[doc_id] = source if self.keep_source else None
+            self.counters['docs'] += 1
+        return status, None
+
+    def delete_doc(self, name, doc_id):
+        """删除一条文档，返回状态码（不存在时为404）"""
+        with self._lock:
+            docs = self.indices.get(name, {}).get('docs', {})
+            if doc_id not in docs:
+                return 404
+            del docs[doc_id]
+            return 200
+
+    def write_cost(self, name, docs):
+        """写入开销：每条文档的开销，加上未关闭自动刷新时的刷新开销"""
+        cost = self.per_doc * docs
+        with self._lock:
+            index = self.indices.get(name)
+            if index is not None and str(index['settings'].get('refresh_interval')) != "-1":
+                self.counters['refreshes'] += 1
+                cost += self.refresh_cost
+        return cost
+
+
+def make_handler(state):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头和响应体分两次写出，保持连接时 Nagle 算法与客户端的延迟确认叠加，每个请求多等约40毫秒
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body=None):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in PRODUCT_HEADERS.items():
+                self.send_header(key, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(data)
+
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+
+        def _parts(self):
+            return [unquote(p) for p in urlparse(self.path).path.split('/') if p]
+
+        def _handle(self):
+            state.count('requests')
+            time.sleep(state.sample_latency())
+            parts = self._parts()
+            body = self._read_body()
+
+            if not parts:
+                self._send_json(200, {
+                    "name": "mock-es",
+                    "cluster_name": "mock",
+                    "version": {"number": "8.11.0", "build_flavor": "default"},
+                    "tagline": "You Know, for Search",
+                })
+            elif parts[-1] == '_bulk':
+                self._bulk(parts[0] if len(parts) == 2 else None, body)
+            elif parts[0] == '_stats':
+                self._send_json(200, state.counters)
+            elif len(parts) == 1:
+                self._index_level(parts[0], body)
+            elif parts[1] == '_doc' and len(parts) == 3 and self.command in ('PUT', 'POST'):
+                status, error = state.index_doc(parts[0], parts[2], json.loads(body or b'{}'))
+                time.sleep(state.write_cost(parts[0], 1))
+                if error:
+                    self._send_json(status, {"error": error, "status": status})
+                else:
+                    self._send_json(status, {"_index": parts[0], "_id": parts[2],
+                                             "result": "created" if status == 201 else "updated"})
+            elif parts[1] == '_doc' and len(parts) == 3 and self.command == 'DELETE':
+                status = state.delete_doc(parts[0], parts[2])
+                self._send_json(status, {"_index": parts[0], "_id": parts[2],
+                                         "result": "deleted" if status == 200 else "not_found"})
+            elif parts[1] == '_settings':
+                self._settings(parts[0], body)
+            elif parts[1] == '_refresh':
+                self._send_json(200, {"_shards": {"total": 1, "successful": 1, "failed": 0}})
+            elif parts[1] == '_count':
+                index = state.indices.get(parts[0])
+                self._send_json(200 if index else 404, {"count": len(index['docs']) if index else 0})
+            elif parts[1] == '_search':
+                self._send_json(200, {"hits": {"total": {"value": 0, "relation": "eq"}, "hits": []}})
+            else:
+                self._send_json(404, {"error": {"type": "mock_not_supported", "reason": self.path}, "status": 404})
+
+        def _index_level(self, name, body):
+            if self.command == 'HEAD':
+                self._send_json(200 if name in state.indices else 404)
+            elif self.command == 'PUT':
+                if state.create(name, json.loads(body or b'{}')):
+                    self._send_json(200, {"acknowledged": True, "index": name})
+                else:
+                    self._send_json(400, {"error": {"type": "resource_already_exists_exception"}, "status": 400})
+            else:
+                self._send_json(404, {"error": {"type": "mock_not_supported", "reason": self.path}, "status": 404})
+
+        def _settings(self, name, body):
+            index = state.indices.get(name)
+            if index is None:
+                self._send_json(404, {"error": {"type": "index_not_found_exception"}, "status": 404})
+            elif self.command == 'PUT':
+                updates = json.loads(body or b'{}')
+                updates = updates.get('index', updates.get('settings', {}).get('index', updates))
+                index['settings'].update({k: str(v) for k, v in updates.items()})
+                self._send_json(200, {"acknowledged": True})
+            else:
+                self._send_json(200, {name: {"settings": {"index": dict(index['settings'])}}})
+
+        def _bulk(self, default_index, body):
+            """NDJSON：每条操作一行元数据，index/create 再跟一行文档"""
+            state.count('bulk_requests')
+            lines = [line for line in body.decode('utf-8').split('\n') if line.strip()]
+            items = []
+            errors = False
+            written = {}
+            i = 0
+            while i < len(lines):
+                action = json.loads(lines[i])
+                op, meta = next(iter(action.items()))
+                source = json.loads(lines[i + 1]) if op in ('index', 'create', 'update') else None
+                i += 2 if source is not None else 1
+                name = meta.get('_index', default_index)
+                if op == 'delete':
+                    status = state.delete_doc(name, meta.get('_id'))
+                    items.append({op: {"_index": name, "_id": meta.get('_id'), "status": status,
+                                       "result": "deleted" if status == 200 else "not_found"}})
+                    errors = errors or status != 200
+                    continue
+                status, error = state.index_doc(name, meta.get('_id'), source)
+                item = {"_index": name, "_id": meta.get('_id'), "status": status}
+                if error:
+                    item["error"] = error
+                    errors = True
+                else:
+                    item["result"] = "created" if status == 201 else "updated"
+                    written[name] = written.get(name, 0) + 1
+                items.append({op: item})
+            time.sleep(sum(state.write_cost(name, count) for name, count in written.items()))
+            self._send_json(200, {"took": 1, "errors": errors, "items": items})
+
+        do_GET = do_POST = do_PUT = do_HEAD = do_DELETE = _handle
+
+    return MockHandler
+
+
+def start_server(state, host="127.0.0.1", port=9201):
+    """
+    在后台线程启动模拟服务
+
+    Returns:
+        ThreadingHTTPServer（调用 shutdown() 停止；port为0时实际端口见 server.server_address）
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-es", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟Elasticsearch服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9201)
+    parser.add_argument("--latency", default="fixed:20", help="每个请求的延迟分布（默认 fixed:20，模拟网络往返）")
+    parser.add_argument("--per-doc", type=float, default=0.2, help="每条文档的写入开销（毫秒，默认0.2）")
+    parser.add_argument("--refresh-cost", type=float, default=5.0, help="未关闭自动刷新时每次写入的刷新开销（毫秒）")
+    parser.add_argument("--doc-error", type=float, default=0.0, help="单条文档写入失败的比例（0~1）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（便于复现）")
+    args = parser.parse_args()
+
+    try:
+        state = MockIndices(args.latency, args.per_doc, args.refresh_cost, args.doc_error, args.seed)
+    except ValueError as e:
+        print(f"❌ 参数错误：{e}")
+        return False
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print("=" * 60)
+    print("🧪 模拟Elasticsearch服务已启动")
+    print(f"   地址: http://{args.host}:{args.port}")
+    print(f"   延迟: {args.latency}  每条文档: {args.per_doc}ms  文档错误比例: {args.doc_error}")
+    print("=" * 60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 请求统计: {state.counters}")
+    finally:
+        server.server_close()
+    return True
+
+
+if __name__ == "__main__":
+    # 设置标准输出编码为 UTF-8（只在作为脚本运行时设置：本模块也被导入脚本和压测脚本导入，导入时不能替换调用方的标准输出）
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    success = main()
+    sys.exit(0 if success else 1)
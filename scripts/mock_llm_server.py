@@ -0,0 +1,335 @@
+"""
+本地模拟大模型服务（OpenAI兼容接口）
+用于在不调用 DeepSeek API 的情况下复现AI功能的负载，调试缓存、请求合并和并发参数
+
+支持：
+- POST /v1/chat/completions（以及 /chat/completions），含 stream=true 的SSE流式输出
+- GET  /v1/models
+- 可配置的延迟分布（固定 / 均匀 / 正态 / 对数正态），流式输出时按token速率逐块发送
+- 按比例注入429（带Retry-After）和5xx错误
+- 预置回复：按提示词关键字匹配，出题类请求返回可解析的JSON题目
+
+用法：
+    python scripts/mock_llm_server.py --port 8089 --latency lognormal:1200,0.5 --error-429 0.05 --error-5xx 0.02
+    然后设置环境变量 DEEPSEEK_API_BASE=http://127.0.0.1:8089/v1 DEEPSEEK_API_KEY=mock 启动系统
+
+    --latency 格式：
+        fixed:800            固定800毫秒
+        uniform:300,2000     300~2000毫秒均匀分布
+        normal:1000,200      均值1000毫秒、标准差200毫秒
+        lognormal:1200,0.5   中位数1200毫秒、对数标准差0.5（长尾，最接近真实大模型）
+    --responses 预置回复文件（JSON数组）：[{"match": "辛亥革命", "content": "..."}, ...]
+"""
+
+import argparse
+import io
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = """## 📖 讲解
+
+这是模拟服务返回的回答，用于负载测试。
+
+1. **要点一**：背景与原因
+2. **要点二**：主要过程
+3. **要点三**：历史影响与意义
+
+## 💭 思考延伸
+这一事件与其他事件有什么联系？"""
+
+QUESTION_TEMPLATE = {
+    "type": "选择题",
+    "question": "（模拟题目）下列关于该知识点的说法正确的是",
+    "options": {"A": "选项一", "B": "选项二", "C": "选项三", "D": "选项四"},
+    "answer": "A",
+    "explanation": "模拟解析：A项符合史实。",
+    "knowledge_point": "模拟知识点",
+    "difficulty": "medium",
+}
+
+_QUESTION_COUNT_PATTERN = re.compile(r'生成(\d+)道')
+
+
+def parse_latency(spec):
+    """
+    解析延迟分布，返回采样函数（单位：秒）
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    if kind == 'fixed' and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == 'uniform' and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'normal' and len(values) == 2:
+        return lambda: max(0.0, random.gauss(values[0], values[1])) / 1000
+    if kind == 'lognormal' and len(values) == 2:
+        mu = math.log(max(values[0], 1e-3))
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"无法解析延迟分布：{spec}")
+
+
+class MockConfig:
+    """模拟服务的行为参数（运行中可修改）"""
+
+    def __init__(self, latency="lognormal:1200,0.5", ttft="fixed:300", tokens_per_second=40.0,
+                 error_429=0.0, error_5xx=0.0, retry_after=1.0, responses=None, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.sample_ttft = parse_latency(ttft)
+        self.tokens_per_second = tokens_per_second
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.retry_after = retry_after
+        self.responses = responses or []
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'streams': 0, '429': 0, '5xx': 0, 'in_flight': 0, 'max_in_flight': 0}
+        if seed is not None:
+            random.seed(seed)
+
+    def count(self, key, delta=1):
+        with self._lock:
+            self.counters[key] += delta
+            if key == 'in_flight':
+                self.counters['max_in_flight'] = max(self.counters['max_in_flight'], self.counters['in_flight'])
+
+    def pick_response(self, messages):
+        """按最后一条用户消息选择预置回复"""
+        prompt = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+        for item in self.responses:
+            if item.get('match') and item['match'] in prompt:
+                return item['content']
+        match = _QUESTION_COUNT_PATTERN.search(prompt)
+        if match and 'JSON' in prompt:
+            count = int(match.group(1))
+            questions = [dict(QUESTION_TEMPLATE, question=f"{QUESTION_TEMPLATE['question']}（第{i + 1}题）") for i in range(count)]
+            return "```json\n" + json.dumps(questions, ensure_ascii=False, indent=2) + "\n```"
+        return DEFAULT_RESPONSE
+
+
+def estimate_tokens(text):
+    """粗略估计token数（中文每字1个，其余每4个字符1个）"""
+    cjk = sum(1 for ch in text if '一' <= ch <= '鿿')
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def make_handler(config):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头和响应体分两次写出，保持连接时 Nagle 算法与客户端的延迟确认叠加，每个请求多等约40毫秒
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/models'):
+                self._send_json(200, {"object": "list", "data": [{"id": "deepseek-chat", "object": "model"}]})
+            elif self.path.rstrip('/') in ('', '/stats'):
+                self._send_json(200, config.counters)
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": {"message": "invalid json", "type": "invalid_request_error"}})
+                return
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            config.count('requests')
+            config.count('in_flight')
+            try:
+                self._handle_completion(payload)
+            finally:
+                config.count('in_flight', -1)
+
+        def _handle_completion(self, payload):
+            # 错误注入
+            roll = random.random()
+            if roll < config.error_429:
+                config.count('429')
+                time.sleep(config.sample_ttft())
+                self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                                headers={"Retry-After": f"{config.retry_after:g}"})
+                return
+            if roll < config.error_429 + config.error_5xx:
+                config.count('5xx')
+                time.sleep(config.sample_ttft())
+                self._send_json(random.choice([500, 502, 503]),
+                                {"error": {"message": "Upstream error (mock)", "type": "server_error"}})
+                return
+
+            messages = payload.get('messages') or []
+            content = config.pick_response(messages)
+            max_tokens = payload.get('max_tokens')
+            if max_tokens and estimate_tokens(content) > max_tokens:
+                content = content[:max_tokens]
+            prompt_tokens = sum(estimate_tokens(str(m.get('content', ''))) for m in messages)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": estimate_tokens(content),
+                "total_tokens": prompt_tokens + estimate_tokens(content),
+            }
+            completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+            model = payload.get('model', 'deepseek-chat')
+
+            if payload.get('stream'):
+                self._stream(completion_id, model, content, usage)
+                return
+
+            time.sleep(config.sample_latency())
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def _stream(self, completion_id, model, content, usage):
+            """SSE流式输出：首token延迟后按token速率逐块发送"""
+            config.count('streams')
+            time.sleep(config.sample_ttft())
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(delta, finish_reason=None, extra=None):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                if extra:
+                    chunk.update(extra)
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+            chunk_size = 4
+            delay = chunk_size / config.tokens_per_second if config.tokens_per_second > 0 else 0
+            try:
+                event({"role": "assistant", "content": ""})
+                for start in range(0, len(content), chunk_size):
+                    event({"content": content[start:start + chunk_size]})
+                    if delay:
+                        time.sleep(delay)
+                event({}, finish_reason="stop", extra={"usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return MockHandler
+
+
+def start_server(config, host="127.0.0.1", port=8089):
+    """
+    在后台线程启动模拟服务
+
+    Returns:
+        ThreadingHTTPServer（调用 shutdown() 停止；port为0时实际端口见 server.server_address）
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def add_mock_arguments(parser):
+    """模拟服务的命令行参数（负载测试脚本复用）"""
+    parser.add_argument("--latency", default="lognormal:1200,0.5", help="非流式响应延迟分布（默认 lognormal:1200,0.5）")
+    parser.add_argument("--ttft", default="fixed:300", help="流式首token延迟分布（默认 fixed:300）")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="流式输出速率（默认40 token/s）")
+    parser.add_argument("--error-429", type=float, default=0.0, help="429错误比例（0~1）")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="5xx错误比例（0~1）")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429响应的Retry-After秒数")
+    parser.add_argument("--responses", default=None, help="预置回复JSON文件")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（便于复现）")
+
+
+def config_from_args(args):
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+    return MockConfig(
+        latency=args.latency,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        error_429=args.error_429,
+        error_5xx=args.error_5xx,
+        retry_after=args.retry_after,
+        responses=responses,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟大模型服务（OpenAI兼容）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        config = config_from_args(args)
+    except (ValueError, OSError, json.JSONDecodeError) as e:
+        print(f"❌ 参数错误：{e}")
+        return False
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print("=" * 60)
+    print("🧪 模拟大模型服务已启动")
+    print(f"   地址: http://{args.host}:{args.port}/v1")
+    print(f"   延迟: {args.latency}  429比例: {args.error_429}  5xx比例: {args.error_5xx}")
+    print(f"   使用: DEEPSEEK_API_BASE=http://{args.host}:{args.port}/v1 DEEPSEEK_API_KEY=mock")
+    print("=" * 60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 请求统计: {config.counters}")
+    finally:
+        server.server_close()
+    return True
+
+
+if __name__ == "__main__":
+    # 设置标准输出编码为 UTF-8（只在作为脚本运行时设置：本模块也被导入脚本和压测脚本导入，导入时不能替换调用方的标准输出）
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,8 +1,23 @@
 """
 解析高中历史教科书，提取结构化数据
+
+各教科书互相独立，默认用进程池并行解析（每个进程一本书），结果按 TEXTBOOKS 的顺序合并。
+事件、概念的ID按本书内的出现顺序编号（如 event_<教材ID>_<序号>），与其他书的解析顺序无关，
+串行和并行解析得到完全相同的结果
+
+教科书文件按行流式读取、逐页处理，内存占用只与单课篇幅有关；正则表达式在模块加载时编译，
+人物句子一次扫描课文提取所有关键词，解析时间与教材篇幅成线性关系
+
+用法：
+    python scripts/parse_textbooks.py               # 并行解析（进程数默认为CPU核数）
+    python scripts/parse_textbooks.py --workers 1   # 串行解析
 """
+import argparse
+import os
 import re
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 
@@ -11,12 +26,86 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from config.history_config import TEXTBOOKS, KNOWLEDGE_CATEGORIES, TIME_PERIODS
 
+PAGE_SEPARATOR = re.compile(r'--- 第 \d+ 页 ---')
+UNIT_PATTERN = re.compile(r'第([一二三四五六七八九十]+)单元\s+(.+)')
+LESSON_PATTERN = re.compile(r'第(\d+)课\s+(.+)')
+
+# 匹配年份 + 事件描述
+EVENT_PATTERNS = [
+    re.compile(r'(\d{4})年\s*([^。，；！？\n]{4,30})'),
+    re.compile(r'公元前?(\d+)年\s*([^。，；！？\n]{4,30})'),
+]
+
+# 历史人物名单（简单规则，暂时用简单匹配）
+FIGURE_KEYWORDS = [
+    '秦始皇', '汉武帝', '唐太宗', '康熙', '乾隆', '慈禧',
+    '孙中山', '毛泽东', '邓小平', '马克思', '恩格斯', '列宁',
+    '华盛顿', '拿破仑', '林肯', '罗斯福', '丘吉尔', '斯大林'
+]
+# 长的名字在前，名字互相包含时优先匹配完整的名字
+FIGURE_PATTERN = re.compile('|'.join(re.escape(k) for k in sorted(FIGURE_KEYWORDS, key=len, reverse=True)))
+# 以句号、分号、感叹号、问号结尾的句子
+SENTENCE_PATTERN = re.compile(r'[^。；！？]*[。；！？]')
+
+# 概念（匹配特殊标记或关键词）
+CONCEPT_PATTERNS = [
+    re.compile(r'【([^】]{2,10})】'),  # 方括号标记
+    re.compile(r'"([^"]{3,15})"'),  # 双引号标记
+]
+
+
+def iter_pages(file_path):
+    """
+    按行流式读取教科书文件，逐页返回页面文本（与对全文按分页标记 re.split 的结果相同）
+    """
+    buffer = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = PAGE_SEPARATOR.split(line)
+            buffer.append(parts[0])
+            for part in parts[1:]:
+                yield ''.join(buffer)
+                buffer = [part]
+    yield ''.join(buffer)
+
+
+def first_sentences(content, pattern=FIGURE_PATTERN):
+    """
+    一次扫描文本，返回每个关键词第一次出现的句子
+
+    Returns:
+        {关键词: 句子}
+    """
+    found = {}
+    for sentence in SENTENCE_PATTERN.finditer(content):
+        for keyword in pattern.findall(sentence.group()):
+            found.setdefault(keyword, sentence.group())
+    return found
+
+
+def _parse_book_worker(textbook_root, book_id, book_info):
+    """进程池任务：解析一本教科书，返回 (解析结果, 日志)"""
+    parser = TextbookParser(textbook_root, verbose=False)
+    parser.parse_book(book_id, book_info)
+    return parser.parsed_data, parser.logs
+
 
 class TextbookParser:
-    """教科书解析器"""
+    """
+    教科书解析器
     
-    def __init__(self, textbook_root):
+    Args:
+        textbook_root: 教科书文件所在目录
+        verbose: 是否立即打印解析过程（进程池中为False，日志记录在 logs 中由主进程按顺序打印）
+        output_dir: 解析结果的保存目录，默认为 <教科书目录>/初中历史自适应学习系统/data/parsed
+    """
+    
+    def __init__(self, textbook_root, verbose=True, output_dir=None):
         self.textbook_root = Path(textbook_root)
+        self.output_dir = Path(output_dir) if output_dir else self.textbook_root / "初中历史自适应学习系统" / "data" / "parsed"
+        self.verbose = verbose
+        self.logs = []
+        self._figure_ids = set()
         self.parsed_data = {
             "units": [],
             "lessons": [],
@@ -26,35 +115,72 @@ class TextbookParser:
             "concepts": []
         }
     
-    def parse_all_textbooks(self):
-        """解析所有教科书"""
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+        else:
+            self.logs.append(message)
+    
+    def parse_all_textbooks(self, workers=None):
+        """
+        解析所有教科书
+        
+        Args:
+            workers: 并行进程数，默认为CPU核数（不超过教科书数），1为串行解析
+        """
         print("开始解析教科书...")
+        books = list(TEXTBOOKS.items())
+        workers = max(1, min(workers or os.cpu_count() or 1, len(books)))
+        started = time.perf_counter()
+        
+        if workers == 1:
+            results = [_parse_book_worker(self.textbook_root, book_id, book_info) for book_id, book_info in books]
+        else:
+            print(f"使用 {workers} 个进程并行解析")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_parse_book_worker, self.textbook_root, book_id, book_info)
+                           for book_id, book_info in books]
+                results = [future.result() for future in futures]
         
-        for book_id, book_info in TEXTBOOKS.items():
+        # 按 TEXTBOOKS 的顺序合并，与各进程完成的先后无关
+        for (book_id, book_info), (book_data, logs) in zip(books, results):
             print(f"\n正在解析: {book_info['name']}")
-            file_path = self.textbook_root / book_info['file']
-            
-            if not file_path.exists():
-                print(f"警告: 文件不存在 {file_path}")
-                continue
-            
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 解析内容
-            self._parse_textbook(content, book_id, book_info)
+            for line in logs:
+                print(line)
+            for key, items in book_data.items():
+                self.parsed_data[key].extend(items)
+        
+        print(f"\n解析耗时: {time.perf_counter() - started:.2f}s（{workers} 个进程）")
         
         # 保存解析结果
         self._save_parsed_data()
         
         return self.parsed_data
     
-    def _parse_textbook(self, content, book_id, book_info):
-        """解析单个教科书"""
-        # 按页分割
-        pages = re.split(r'--- 第 \d+ 页 ---', content)
+    def parse_book(self, book_id, book_info):
+        """
+        解析单本教科书，结果追加到 self.parsed_data
+        
+        Returns:
+            文件不存在时返回False
+        """
+        file_path = self.textbook_root / book_info['file']
+        
+        if not file_path.exists():
+            self._log(f"警告: 文件不存在 {file_path}")
+            return False
+        
+        # 逐页读取并解析
+        self._parse_textbook(iter_pages(file_path), book_id, book_info)
+        return True
+    
+    def _parse_textbook(self, pages, book_id, book_info):
+        """
+        解析单个教科书
         
+        Args:
+            pages: 页面文本的可迭代对象（如 iter_pages(文件路径)）
+        """
         current_unit = None
         current_lesson = None
         lesson_content = []
@@ -65,7 +191,7 @@ class TextbookParser:
                 continue
             
             # 检测单元标题
-            unit_match = re.search(r'第([一二三四五六七八九十]+)单元\s+(.+)', page)
+            unit_match = UNIT_PATTERN.search(page)
             if unit_match:
                 # 保存上一课的内容
                 if current_lesson and lesson_content:
@@ -86,11 +212,11 @@ class TextbookParser:
                     "lessons": []
                 }
                 self.parsed_data["units"].append(current_unit)
-                print(f"  发现单元: 第{unit_number}单元 {unit_title}")
+                self._log(f"  发现单元: 第{unit_number}单元 {unit_title}")
                 continue
             
             # 检测课标题
-            lesson_match = re.search(r'第(\d+)课\s+(.+)', page)
+            lesson_match = LESSON_PATTERN.search(page)
             if lesson_match:
                 # 保存上一课的内容
                 if current_lesson and lesson_content:
@@ -117,7 +243,7 @@ class TextbookParser:
                     current_unit['lessons'].append(current_lesson['id'])
                 
                 self.parsed_data["lessons"].append(current_lesson)
-                print(f"    发现课文: 第{lesson_number}课 {lesson_title}")
+                self._log(f"    发现课文: 第{lesson_number}课 {lesson_title}")
             
             # 累积课文内容
             if current_lesson:
@@ -134,14 +260,8 @@ class TextbookParser:
         lesson['content'] = content
         
         # 提取历史事件（简单规则）
-        # 匹配年份 + 事件描述
-        event_patterns = [
-            r'(\d{4})年\s*([^。，；！？\n]{4,30})',
-            r'公元前?(\d+)年\s*([^。，；！？\n]{4,30})',
-        ]
-        
-        for pattern in event_patterns:
-            matches = re.findall(pattern, content)
+        for pattern in EVENT_PATTERNS:
+            matches = pattern.findall(content)
             for match in matches:
                 year = match[0]
                 description = match[1].strip()
@@ -150,6 +270,7 @@ class TextbookParser:
                 if len(description) < 4 or '第' in description[:2]:
                     continue
                 
+                # 每本书单独解析，序号只取决于本书内容
                 event = {
                     "id": f"event_{book_id}_{len(self.parsed_data['historical_events'])}",
                     "lesson_id": lesson['id'],
@@ -160,40 +281,27 @@ class TextbookParser:
                 self.parsed_data['historical_events'].append(event)
                 lesson['knowledge_points'].append(event['id'])
         
-        # 提取历史人物（简单规则 - 查找常见历史人物名）
-        # 这里需要一个历史人物名单，暂时用简单匹配
-        figure_keywords = [
-            '秦始皇', '汉武帝', '唐太宗', '康熙', '乾隆', '慈禧',
-            '孙中山', '毛泽东', '邓小平', '马克思', '恩格斯', '列宁',
-            '华盛顿', '拿破仑', '林肯', '罗斯福', '丘吉尔', '斯大林'
-        ]
-        
-        for keyword in figure_keywords:
-            if keyword in content:
-                # 提取相关句子
-                sentences = re.findall(f'[^。；！？]*{keyword}[^。；！？]*[。；！？]', content)
-                if sentences:
-                    figure = {
-                        "id": f"figure_{book_id}_{keyword}",
-                        "name": keyword,
-                        "lesson_id": lesson['id'],
-                        "description": sentences[0][:100],
-                        "book_id": book_id
-                    }
-                    
-                    # 避免重复
-                    if not any(f['id'] == figure['id'] for f in self.parsed_data['historical_figures']):
-                        self.parsed_data['historical_figures'].append(figure)
-                        lesson['knowledge_points'].append(figure['id'])
+        # 提取历史人物（简单规则 - 按名单查找，取人物第一次出现的句子）
+        sentences = first_sentences(content)
+        for keyword in FIGURE_KEYWORDS:
+            if keyword in sentences:
+                figure = {
+                    "id": f"figure_{book_id}_{keyword}",
+                    "name": keyword,
+                    "lesson_id": lesson['id'],
+                    "description": sentences[keyword][:100],
+                    "book_id": book_id
+                }
+                
+                # 避免重复
+                if figure['id'] not in self._figure_ids:
+                    self._figure_ids.add(figure['id'])
+                    self.parsed_data['historical_figures'].append(figure)
+                    lesson['knowledge_points'].append(figure['id'])
         
         # 提取概念（匹配特殊标记或关键词）
-        concept_patterns = [
-            r'【([^】]{2,10})】',  # 方括号标记
-            r'"([^"]{3,15})"',  # 双引号标记
-        ]
-        
-        for pattern in concept_patterns:
-            matches = re.findall(pattern, content)
+        for pattern in CONCEPT_PATTERNS:
+            matches = pattern.findall(content)
             for match in matches[:5]:  # 限制每课提取数量
                 concept = {
                     "id": f"concept_{book_id}_{len(self.parsed_data['concepts'])}",
@@ -214,7 +322,7 @@ class TextbookParser:
     
     def _save_parsed_data(self):
         """保存解析后的数据"""
-        output_dir = self.textbook_root / "初中历史自适应学习系统" / "data" / "parsed"
+        output_dir = self.output_dir
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # 保存各类数据
@@ -246,11 +354,15 @@ class TextbookParser:
 
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="解析高中历史教科书")
+    arg_parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认为CPU核数，1为串行）")
+    args = arg_parser.parse_args()
+    
     # 设置教科书根目录
     textbook_root = Path(__file__).parent.parent.parent
     
     parser = TextbookParser(textbook_root)
-    parser.parse_all_textbooks()
+    parser.parse_all_textbooks(workers=args.workers)
 
 
 if __name__ == "__main__":
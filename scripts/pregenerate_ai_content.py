@@ -0,0 +1,160 @@
+"""
+离线预生成AI内容
+只依赖静态数据的AI内容（闪卡讲解与记忆技巧、知识点讲解、章节教学方案）提前批量生成，
+写入 data/ai_content/<版本>/，界面优先读取，课堂高峰期不再实时调用大模型
+
+用法：
+    python scripts/pregenerate_ai_content.py                       # 生成全部内容
+    python scripts/pregenerate_ai_content.py --kinds kp_explanation --concurrency 8
+    python scripts/pregenerate_ai_content.py --methods BOPPPS 5E教学法
+    python scripts/pregenerate_ai_content.py --dry-run             # 只统计待生成数量
+
+中途失败或中断后直接重新运行即可：已生成的内容会被跳过（--force 强制重新生成）
+"""
+
+import io
+import sys
+
+# 设置标准输出编码为 UTF-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+import argparse
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.ai_config import AI_CONTENT_VERSION, DEEPSEEK_API_KEY, DEEPSEEK_MODEL
+from data.history_flashcards import get_all_flashcards
+from data.knowledge_graph_gfz import get_gfz_modules
+from modules.ai_batch import iter_completed
+from modules.ai_content_store import ContentStore, CONTENT_KINDS, teaching_design_key
+
+
+def build_tasks(kinds, methods):
+    """
+    构建生成任务列表
+
+    Returns:
+        [(kind, key, 生成函数), ...]
+    """
+    from modules.ai_service import AIService
+    from modules.teaching_design import TEACHING_METHODS, request_teaching_design, explain_knowledge_point
+
+    ai_service = AIService()
+    tasks = []
+
+    # 闪卡：与 flashcard_review_dual 中的实时调用参数一致
+    for card in get_all_flashcards():
+        if "flashcard_explanation" in kinds:
+            tasks.append(("flashcard_explanation", card['id'], lambda card=card: ai_service.explain_concept(
+                f"知识点：{card['title']}\n问题：{card['question']}\n答案：{card['answer']}",
+                level='detailed'
+            )))
+        if "flashcard_memory_tips" in kinds:
+            tasks.append(("flashcard_memory_tips", card['id'], lambda card=card: ai_service.generate_memory_tips(
+                card['title'],
+                card['answer']
+            )))
+
+    # 高分子物理知识点与章节
+    method_keys = methods or list(TEACHING_METHODS.keys())
+    for module in get_gfz_modules():
+        for chapter in module.get("chapters", []):
+            if "kp_explanation" in kinds:
+                for kp in chapter.get("knowledge_points", []):
+                    tasks.append(("kp_explanation", kp['id'], lambda kp=kp, chapter=chapter, module=module: explain_knowledge_point(
+                        kp['name'], chapter['name'], module['name']
+                    )))
+            if "teaching_design" in kinds:
+                for method_key in method_keys:
+                    tasks.append(("teaching_design", teaching_design_key(chapter['id'], method_key),
+                                  lambda chapter=chapter, method_key=method_key: request_teaching_design(
+                                      chapter['name'], chapter.get("knowledge_points", []), method_key
+                                  )))
+
+    return tasks
+
+
+def run_task(kind, key, generate):
+    """执行单个任务，返回 (内容, 错误信息, 耗时)"""
+    start = time.time()
+    try:
+        content = generate()
+        error = None if content else "AI未返回内容"
+    except Exception as e:
+        content, error = None, str(e)
+    return content, error, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线预生成AI内容")
+    parser.add_argument("--kinds", nargs="+", choices=CONTENT_KINDS, default=CONTENT_KINDS,
+                        help="要生成的内容种类（默认全部）")
+    parser.add_argument("--methods", nargs="+", default=None,
+                        help="教学方案使用的教学方法（默认全部）")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发请求数（默认4）")
+    parser.add_argument("--version", default=AI_CONTENT_VERSION, help=f"内容版本（默认 {AI_CONTENT_VERSION}）")
+    parser.add_argument("--force", action="store_true", help="忽略已生成内容，全部重新生成")
+    parser.add_argument("--limit", type=int, default=None, help="最多生成多少条（调试用）")
+    parser.add_argument("--dry-run", action="store_true", help="只统计待生成数量，不调用AI")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🤖 AI内容离线预生成")
+    print("=" * 60)
+
+    store = ContentStore(version=args.version)
+    tasks = build_tasks(set(args.kinds), args.methods)
+
+    # 断点续跑：跳过已生成的内容
+    if not args.force:
+        done = {kind: store.keys(kind) for kind in args.kinds}
+        tasks = [t for t in tasks if t[1] not in done.get(t[0], set())]
+    if args.limit:
+        tasks = tasks[:args.limit]
+
+    print(f"\n📦 内容版本: {args.version}（{store.path}）")
+    for kind in args.kinds:
+        pending = sum(1 for t in tasks if t[0] == kind)
+        print(f"  {kind}: 待生成 {pending} 条")
+
+    if args.dry_run or not tasks:
+        print("\n✅ 无需生成" if not tasks else "\n（dry-run，未调用AI）")
+        return True
+
+    if not DEEPSEEK_API_KEY:
+        print("\n❌ 错误：未配置 DEEPSEEK_API_KEY")
+        return False
+
+    print(f"\n🚀 开始生成（并发 {args.concurrency}）...")
+    start = time.time()
+    succeeded = 0
+    failed = []
+
+    for index, ((kind, key, _), (content, error, elapsed)) in enumerate(
+            iter_completed(run_task, tasks, max_workers=args.concurrency), 1):
+        if content:
+            store.put(kind, key, content, model=DEEPSEEK_MODEL)
+            succeeded += 1
+            print(f"  [{index}/{len(tasks)}] ✓ {kind} {key} ({elapsed:.1f}s)")
+        else:
+            failed.append((kind, key, error))
+            print(f"  [{index}/{len(tasks)}] ✗ {kind} {key}: {error}")
+
+    manifest = store.write_manifest(model=DEEPSEEK_MODEL)
+
+    print("\n" + "=" * 60)
+    print(f"✅ 成功 {succeeded} 条，✗ 失败 {len(failed)} 条，耗时 {time.time() - start:.1f}s")
+    print(f"📊 内容库现有: {manifest['counts']}")
+    if failed:
+        print("⚠ 存在失败项，重新运行本脚本即可只补生成失败的部分")
+    print("=" * 60)
+    return not failed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,46 @@
+"""
+相似问题答案缓存的命中规则（modules/answer_cache.py）：同一问题的不同说法命中，问不同事情的相似问题不命中
+"""
+
+import pytest
+
+from config.ai_config import AI_ANSWER_CACHE_THRESHOLD
+from modules.answer_cache import AnswerCache, normalize_question
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(threshold=AI_ANSWER_CACHE_THRESHOLD, max_size=100, ttl=0)
+
+
+@pytest.mark.parametrize("scope, stored, asked", [
+    ("chat|", "辛亥革命的意义", "辛亥革命有什么历史意义？"),
+    ("chat|", "请问辛亥革命的意义是什么？", "辛亥革命的意义吧"),
+    ("explain|detailed|", "洋务运动", "请介绍一下洋务运动"),
+])
+def test_paraphrase_hits(cache, scope, stored, asked):
+    cache.store(scope, stored, "答案")
+    assert cache.lookup(scope, asked)[0] == "答案"
+
+
+@pytest.mark.parametrize("scope, stored, asked", [
+    ("chat|", "第一次世界大战爆发的根本原因", "第二次世界大战爆发的根本原因"),
+    ("explain|detailed|", "秦朝灭亡的原因", "隋朝灭亡的原因"),
+    ("chat|", "1840年发生了什么", "1856年发生了什么"),
+    ("chat|", "什么是历史唯物主义", "什么是唯物主义"),
+    ("chat|", "洋务运动的目的", "洋务运动"),
+    ("chat|", "美国对中国的影响", "中国对美国的影响"),
+])
+def test_different_subject_misses(cache, scope, stored, asked):
+    cache.store(scope, stored, "答案")
+    assert cache.lookup(scope, asked)[0] is None
+
+
+def test_scopes_do_not_share_answers(cache):
+    cache.store("chat|相关知识点：辛亥革命", "辛亥革命的意义", "答案")
+    assert cache.lookup("chat|", "辛亥革命的意义")[0] is None
+
+
+def test_normalize_keeps_words_intact():
+    assert normalize_question("什么是历史唯物主义") == "历史唯物主义"
+    assert normalize_question("洋务运动的目的") == "洋务运动目的"